@@ -1,5 +1,6 @@
 from django.contrib import admin
 from users.models import Order, OrderItem, ShippingAddress
+from users.models import ArchivedOrder, ArchivedOrderItem, ArchivedShippingAddress
 from .models import Product, AdminRegister
 
 # Inline for Order Items
@@ -26,6 +27,32 @@ class OrderAdmin(admin.ModelAdmin):
     inlines = [OrderItemInline, ShippingAddressInline]
     list_editable = ('status', 'payment_status')
 
+# Archived orders are read-only history
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    readonly_fields = ('product_name', 'quantity', 'unit_price', 'total_price', 'image_url')
+    can_delete = False
+
+class ArchivedShippingAddressInline(admin.TabularInline):
+    model = ArchivedShippingAddress
+    extra = 0
+    readonly_fields = ('full_name', 'address_line1', 'address_line2', 'city', 'state', 'postal_code', 'country', 'phone', 'is_default')
+    can_delete = False
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('order_number', 'user', 'status', 'grand_total', 'payment_status', 'order_date', 'archived_at')
+    list_filter = ('status', 'payment_status', 'order_date')
+    search_fields = ('order_number', 'user__username', 'user__email')
+    inlines = [ArchivedOrderItemInline, ArchivedShippingAddressInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 # Product Admin
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -0,0 +1,154 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Max, PositiveIntegerField, Value, When
+from django.db.models.functions import Greatest, Round
+from django.utils import timezone
+
+from .models import Product
+from .product_cache import deferred_invalidation, invalidate_products
+from .search import bump_search_generation
+
+
+BULK_BATCH_SIZE = 500
+MIN_PRICE = Decimal('0.01')
+# Largest values the columns hold: price is max_digits=10, decimal_places=2; stock a signed 32-bit int
+MAX_PRICE = Decimal('99999999.99')
+MAX_STOCK = 2147483647
+CATEGORIES = {key for key, _ in Product.CATEGORY_CHOICES}
+
+ACTIONS = {
+    'price_percent': "Change price by %",
+    'price_delta': "Change price by amount",
+    'stock_set': "Set stock to",
+    'stock_adjust': "Adjust stock by",
+    'category': "Move to category",
+    'delete': "Delete",
+}
+
+
+class BulkActionError(ValueError):
+    pass
+
+
+# =======================
+# Parsing
+# =======================
+
+def parse_value(action, raw):
+    raw = (raw or '').strip()
+    if action not in ACTIONS:
+        raise BulkActionError("Choose a bulk action.")
+    if action == 'delete':
+        return None
+    if action == 'category':
+        if raw not in CATEGORIES:
+            raise BulkActionError("Choose a valid category.")
+        return raw
+    if action.startswith('price'):
+        try:
+            value = Decimal(raw)
+        except InvalidOperation:
+            raise BulkActionError("Enter a number.")
+        if not value.is_finite() or (action == 'price_percent' and not -100 < value <= 1000):
+            raise BulkActionError("Percentage must be between -100 and 1000.")
+        if action == 'price_delta' and abs(value) > MAX_PRICE:
+            raise BulkActionError(f"Amount must be between -{MAX_PRICE} and {MAX_PRICE}.")
+        return value
+    try:
+        value = int(raw)
+    except ValueError:
+        raise BulkActionError("Enter a whole number.")
+    if action == 'stock_set' and value < 0:
+        raise BulkActionError("Stock cannot be negative.")
+    if abs(value) > MAX_STOCK:
+        raise BulkActionError(f"Stock cannot exceed {MAX_STOCK}.")
+    return value
+
+
+def check_range(action, queryset, value):
+    # Increases are checked against the current maximum up front, so an
+    # overflowing UPDATE never reaches the database half-way through the batches
+    if action == 'price_percent' and value > 0:
+        highest = queryset.aggregate(highest=Max('price'))['highest']
+        if highest is not None and round(highest * (100 + value) / 100, 2) > MAX_PRICE:
+            raise BulkActionError(f"That would raise {highest} above the maximum price of {MAX_PRICE}.")
+    elif action == 'price_delta' and value > 0:
+        highest = queryset.aggregate(highest=Max('price'))['highest']
+        if highest is not None and highest + value > MAX_PRICE:
+            raise BulkActionError(f"That would raise {highest} above the maximum price of {MAX_PRICE}.")
+    elif action == 'stock_adjust' and value > 0:
+        highest = queryset.aggregate(highest=Max('stock'))['highest']
+        if highest is not None and highest + value > MAX_STOCK:
+            raise BulkActionError(f"That would raise stock of {highest} above the maximum of {MAX_STOCK}.")
+
+
+# =======================
+# Set-based updates
+# =======================
+
+def _price(expression):
+    # Rounded to cents and never below the model's MinValueValidator
+    return Greatest(
+        Round(expression, 2), Value(MIN_PRICE),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def _changes(action, value):
+    if action == 'price_percent':
+        return {'price': _price(F('price') * Value((100 + value) / 100))}
+    if action == 'price_delta':
+        return {'price': _price(F('price') + Value(value))}
+    if action == 'stock_set':
+        return {'stock': Value(value)}
+    if action == 'stock_adjust':
+        if value >= 0:
+            return {'stock': F('stock') + value}
+        # Never underflow the unsigned column
+        return {'stock': Case(
+            When(stock__gte=-value, then=F('stock') + value),
+            default=Value(0),
+            output_field=PositiveIntegerField(),
+        )}
+    return {'category': Value(value)}
+
+
+def _id_batches(queryset, batch_size):
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        if len(ids) < batch_size:
+            return
+        last_id = ids[-1]
+
+
+def _invalidate_on_commit(product_ids):
+    def invalidate():
+        invalidate_products(product_ids)
+        bump_search_generation()
+
+    transaction.on_commit(invalidate)
+
+
+def apply_bulk_action(action, queryset, value=None, batch_size=BULK_BATCH_SIZE):
+    # One UPDATE (or cascading delete) per batch of ids; returns the number of products affected
+    check_range(action, queryset, value)
+    affected = 0
+    for ids in _id_batches(queryset, batch_size):
+        with transaction.atomic():
+            if action == 'delete':
+                # The delete still cascades through the collector (carts, wishlists, holds)
+                with deferred_invalidation():
+                    deleted = Product.objects.filter(id__in=ids).delete()[1].get(Product._meta.label, 0)
+                affected += deleted
+            else:
+                # update() skips auto_now, and the catalog ETags are built from updated_at
+                affected += Product.objects.filter(id__in=ids).update(
+                    updated_at=timezone.now(), **_changes(action, value)
+                )
+            _invalidate_on_commit(ids)
+    return affected
@@ -0,0 +1,82 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Lower
+
+from users.catalog import decode_cursor, encode_cursor
+from users.models import ArchivedOrder, Order
+
+
+CUSTOMER_PAGE_SIZE = 50
+# Orders that never turned into revenue
+EXCLUDED_STATUSES = ['cancelled', 'refunded']
+
+
+# =======================
+# Customer directory
+# =======================
+
+def _prefix(key, term):
+    # Matched against the LOWER(column) indexes from users 0009. SQLite only optimizes
+    # LIKE on plain columns, so it gets the equivalent range; elsewhere LIKE 'term%'.
+    if connection.vendor == 'sqlite':
+        upper = term[:-1] + chr(min(ord(term[-1]) + 1, sys.maxunicode))
+        return Q(**{f'{key}__gte': term, f'{key}__lt': upper})
+    return Q(**{f'{key}__startswith': term})
+
+
+def _search(queryset, query):
+    term = query.lower()
+    queryset = queryset.alias(username_key=Lower('username'), email_key=Lower('email'))
+    if '@' in query:
+        return queryset.filter(_prefix('email_key', term))
+    return queryset.filter(_prefix('username_key', term) | _prefix('email_key', term))
+
+
+def order_stats(user_ids):
+    # {user_id: (orders, lifetime value)} for one page: hot and archived orders grouped in one UNION ALL
+    grouped = [
+        model.objects.filter(user_id__in=user_ids).exclude(status__in=EXCLUDED_STATUSES)
+        .values('user_id').annotate(orders=Count('id'), value=Sum('grand_total'))
+        .values_list('user_id', 'orders', 'value').order_by()
+        for model in (Order, ArchivedOrder)
+    ]
+    stats = {}
+    for user_id, orders, value in grouped[0].union(grouped[1], all=True):
+        count, total = stats.get(user_id, (0, 0))
+        stats[user_id] = (count + orders, total + (value or 0))
+    return stats
+
+
+def _decorate(customer, stats):
+    try:
+        profile = customer.usersregister
+    except get_user_model().usersregister.RelatedObjectDoesNotExist:
+        profile = None
+    customer.contact = profile.contact if profile else ''
+    customer.created_at = profile.created_at if profile else customer.date_joined
+    customer.order_count, customer.lifetime_value = stats.get(customer.id, (0, 0))
+    return customer
+
+
+def get_customer_page(query='', cursor=None, page_size=CUSTOMER_PAGE_SIZE):
+    # Two queries at any depth: the keyset page (profile LEFT JOINed) and the grouped order stats
+    queryset = get_user_model().objects.select_related('usersregister').defer('password')
+    query = query.strip()
+    if query:
+        queryset = _search(queryset, query)
+    cursor = decode_cursor(cursor)
+    if cursor:
+        date_joined, user_id = cursor
+        queryset = queryset.filter(Q(date_joined__lt=date_joined) | Q(date_joined=date_joined, id__lt=user_id))
+
+    customers = list(queryset.order_by('-date_joined', '-id')[:page_size + 1])
+    next_cursor = None
+    if len(customers) > page_size:
+        customers = customers[:page_size]
+        next_cursor = encode_cursor(customers[-1].date_joined, customers[-1].id)
+
+    stats = order_stats([customer.id for customer in customers]) if customers else {}
+    return [_decorate(customer, stats) for customer in customers], next_cursor
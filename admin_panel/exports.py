@@ -0,0 +1,187 @@
+import csv
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from users.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .models import Product
+
+
+EXPORT_BATCH_SIZE = 2000
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+STATUSES = {key for key, _ in Order.STATUS_CHOICES}
+
+
+# =======================
+# Filters (same as the admin order list)
+# =======================
+
+def _parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_order_filters(params):
+    date_from = _parse_day(params.get('date_from'))
+    date_to = _parse_day(params.get('date_to'))
+    status = params.get('status', '')
+    return {
+        'status': status if status in STATUSES else '',
+        'date_from': date_from,
+        'date_to': date_to,
+    }
+
+
+def order_date_range(filters):
+    # date_to is inclusive: everything before the next midnight
+    start = end = None
+    if filters['date_from']:
+        start = timezone.make_aware(datetime.combine(filters['date_from'], time.min))
+    if filters['date_to']:
+        end = timezone.make_aware(datetime.combine(filters['date_to'] + timedelta(days=1), time.min))
+    return start, end
+
+
+# =======================
+# Row sources (keyset batches, values_list only)
+# =======================
+
+ORDER_COLUMNS = [
+    'order_id', 'order_number', 'order_date', 'status', 'payment_status', 'payment_method',
+    'user_id', 'username', 'email', 'subtotal', 'tax_amount', 'shipping_cost', 'grand_total',
+    'product_id', 'product_name', 'quantity', 'unit_price', 'total_price', 'archived',
+]
+ORDER_FIELDS = [
+    'id', 'order_number', 'order_date', 'status', 'payment_status', 'payment_method',
+    'user_id', 'user__username', 'user__email', 'subtotal', 'tax_amount', 'shipping_cost', 'grand_total',
+]
+ITEM_FIELDS = ['order_id', 'product_id', 'product_name', 'quantity', 'unit_price', 'total_price']
+
+CUSTOMER_COLUMNS = ['id', 'username', 'email', 'first_name', 'last_name', 'date_joined', 'last_login', 'is_active']
+PRODUCT_COLUMNS = ['id', 'sku', 'name', 'category', 'price', 'stock', 'reserved', 'created_at', 'updated_at']
+
+
+def _keyset(queryset, fields, batch_size):
+    # WHERE id > last ORDER BY id LIMIT n: every batch is an index range scan, memory stays flat
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values_list(*fields)[:batch_size])
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1][0]
+
+
+def order_rows(filters, batch_size=EXPORT_BATCH_SIZE):
+    # One row per order line; hot orders first, then the archive
+    start, end = order_date_range(filters)
+    for order_model, item_model, archived in ((Order, OrderItem, False), (ArchivedOrder, ArchivedOrderItem, True)):
+        orders = order_model.objects.all()
+        if filters['status']:
+            orders = orders.filter(status=filters['status'])
+        if start:
+            orders = orders.filter(order_date__gte=start)
+        if end:
+            orders = orders.filter(order_date__lt=end)
+
+        for batch in _keyset(orders, ORDER_FIELDS, batch_size):
+            items = {}
+            for item in (
+                item_model.objects.filter(order_id__in=[row[0] for row in batch])
+                .order_by('order_id', 'id').values_list(*ITEM_FIELDS)
+            ):
+                items.setdefault(item[0], []).append(item[1:])
+            for order in batch:
+                for item in items.get(order[0], [(None, '', 0, None, None)]):
+                    yield order + item + (archived,)
+
+
+def customer_rows(filters, batch_size=EXPORT_BATCH_SIZE):
+    for batch in _keyset(get_user_model().objects.all(), CUSTOMER_COLUMNS, batch_size):
+        yield from batch
+
+
+def product_rows(filters, batch_size=EXPORT_BATCH_SIZE):
+    for batch in _keyset(Product.objects.all(), PRODUCT_COLUMNS, batch_size):
+        yield from batch
+
+
+DATASETS = {
+    'orders': (ORDER_COLUMNS, order_rows),
+    'customers': (CUSTOMER_COLUMNS, customer_rows),
+    'products': (PRODUCT_COLUMNS, product_rows),
+}
+
+
+# =======================
+# Encoding
+# =======================
+
+class _Echo:
+    # csv.writer target that hands each encoded line straight back
+    def write(self, value):
+        return value
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_value(value) for value in row])
+
+
+def _jsonl_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=str) + '\n'
+
+
+def _chunks(lines, size=64 * 1024):
+    # Group small lines into larger writes
+    buffer, length = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(dataset, fmt, filters=None, compress=False, batch_size=EXPORT_BATCH_SIZE):
+    columns, source = DATASETS[dataset]
+    rows = source(filters or parse_order_filters({}), batch_size)
+    lines = _csv_lines(columns, rows) if fmt == 'csv' else _jsonl_lines(columns, rows)
+    chunks = _chunks(lines)
+    return _gzip(chunks) if compress else chunks
+
+
+def export_filename(dataset, fmt, compress=False):
+    stamp = timezone.localtime().strftime('%Y%m%d-%H%M%S')
+    return f"{dataset}-{stamp}.{FORMATS[fmt][1]}{'.gz' if compress else ''}"
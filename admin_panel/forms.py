@@ -4,4 +4,8 @@ from .models import Product  # Import your Product model
 class ProductForm(forms.ModelForm):
     class Meta:
         model = Product
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+    def clean_sku(self):
+        # Blank SKUs are stored as NULL so they don't collide on the unique index
+        return self.cleaned_data.get('sku') or None
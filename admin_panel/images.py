@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import PurePosixPath
+
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+
+DERIVATIVE_WIDTHS = tuple(getattr(settings, 'PRODUCT_IMAGE_WIDTHS', (240, 480, 960)))
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+DERIVATIVE_DIR = 'derivatives'
+IMAGE_WORKERS = getattr(settings, 'PRODUCT_IMAGE_WORKERS', 2)
+# Derivatives only ever appear, so a hit is kept long; a miss is rechecked soon
+DERIVATIVES_READY_TIMEOUT = 60 * 60 * 24
+DERIVATIVES_MISSING_TIMEOUT = 60
+
+
+# =======================
+# Naming
+# =======================
+
+def derivative_name(image_name, width, ext):
+    # products/phone.jpg -> products/derivatives/phone_480w.webp
+    path = PurePosixPath(image_name)
+    return str(path.parent / DERIVATIVE_DIR / f"{path.stem}_{width}w.{ext}")
+
+
+# =======================
+# Worker (runs in the process pool, so only plain paths cross the boundary)
+# =======================
+
+def render_derivatives(source_path, targets):
+    source_mtime = os.path.getmtime(source_path)
+    pending = [
+        (target, width, ext) for target, width, ext in targets
+        if not os.path.exists(target) or os.path.getmtime(target) < source_mtime
+    ]
+    if not pending:
+        return 0
+
+    with Image.open(source_path) as original:
+        original = ImageOps.exif_transpose(original)
+        for target, width, ext in pending:
+            image_format, options = DERIVATIVE_FORMATS[ext]
+            image = original.copy()
+            if image.width > width:
+                image.thumbnail((width, width * 10), Image.LANCZOS)
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f"{target}.tmp"
+            image.save(tmp_path, image_format, **options)
+            os.replace(tmp_path, target)
+    return len(pending)
+
+
+def derivative_job(image_name):
+    targets = [
+        (default_storage.path(derivative_name(image_name, width, ext)), width, ext)
+        for width in DERIVATIVE_WIDTHS
+        for ext in DERIVATIVE_FORMATS
+    ]
+    return default_storage.path(image_name), targets
+
+
+# =======================
+# Scheduling
+# =======================
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers=None):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a threaded web worker is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers or IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def _on_done(image_name):
+    def callback(future):
+        if future.exception() is not None:
+            logger.warning("Image derivatives failed for %s: %s", image_name, future.exception())
+        else:
+            mark_derivatives(image_name)
+    return callback
+
+
+def schedule_derivatives(image_name):
+    if not image_name or not default_storage.exists(image_name):
+        return None
+    source_path, targets = derivative_job(image_name)
+    future = get_executor().submit(render_derivatives, source_path, targets)
+    future.add_done_callback(_on_done(image_name))
+    return future
+
+
+# =======================
+# Template helpers
+# =======================
+
+def _derivatives_key(image_name):
+    return f"image_derivatives:{hashlib.md5(image_name.encode()).hexdigest()}"
+
+
+def mark_derivatives(image_name):
+    cache.set(_derivatives_key(image_name), True, DERIVATIVES_READY_TIMEOUT)
+
+
+def has_derivatives(image_name):
+    # Cached so product grids don't stat the storage once per card per render
+    key = _derivatives_key(image_name)
+    ready = cache.get(key)
+    if ready is None:
+        ready = default_storage.exists(derivative_name(image_name, DERIVATIVE_WIDTHS[-1], 'webp'))
+        cache.set(key, ready, DERIVATIVES_READY_TIMEOUT if ready else DERIVATIVES_MISSING_TIMEOUT)
+    return ready
+
+
+def srcset(image_name, ext):
+    return ', '.join(
+        f"{default_storage.url(derivative_name(image_name, width, ext))} {width}w"
+        for width in DERIVATIVE_WIDTHS
+    )
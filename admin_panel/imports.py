@@ -0,0 +1,263 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from pathlib import PurePosixPath
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .images import schedule_derivatives
+from .models import Product
+from .product_cache import invalidate_products
+from .search import bump_search_generation
+
+
+IMPORT_BATCH_SIZE = 1000
+IMAGE_WORKERS = 8
+IMAGE_DIR = 'products'
+MAX_IMAGE_STEM = 50
+CATEGORIES = {key for key, _ in Product.CATEGORY_CHOICES}
+# Rows without an image keep the stored one, so 'image' is only updated for rows that bring one
+UPDATE_FIELDS = ['name', 'price', 'stock', 'description', 'category', 'updated_at']
+ERROR_COLUMNS = ['line', 'sku', 'error']
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.rows} rows, {self.imported} imported, {self.failed} failed "
+            f"in {self.elapsed:.1f}s ({self.rows_per_second:,.0f} rows/s)"
+        )
+
+
+# =======================
+# Reading (streaming)
+# =======================
+
+def read_rows(stream, fmt):
+    # Yields (line number, dict) without loading the file; stream is binary
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=2):
+            yield number, row
+    else:
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield number, e
+                continue
+            yield number, row if isinstance(row, dict) else ValueError("Line is not a JSON object.")
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# =======================
+# Validation
+# =======================
+
+def _text(row, name):
+    value = row.get(name)
+    return str(value).strip() if value is not None else ''
+
+
+def validate_row(row):
+    # Returns (product fields, image source path) or raises ValidationError
+    if isinstance(row, Exception):
+        raise ValidationError(f"Unreadable row: {row}")
+
+    errors = []
+    sku = _text(row, 'sku')
+    name = _text(row, 'name')
+    category = _text(row, 'category').lower()
+    if not sku:
+        errors.append("sku is required")
+    elif len(sku) > Product._meta.get_field('sku').max_length:
+        errors.append("sku is too long")
+    if not name:
+        errors.append("name is required")
+    if category not in CATEGORIES:
+        errors.append(f"category must be one of {', '.join(sorted(CATEGORIES))}")
+
+    try:
+        price = Decimal(_text(row, 'price'))
+        # Same MinValueValidator / digits checks as the model field
+        Product._meta.get_field('price').clean(price, None)
+    except InvalidOperation:
+        errors.append("price is not a number")
+    except ValidationError as e:
+        errors.extend(f"price: {message}" for message in e.messages)
+
+    try:
+        stock = int(_text(row, 'stock') or 0)
+        Product._meta.get_field('stock').clean(stock, None)
+    except ValueError:
+        errors.append("stock is not a whole number")
+    except ValidationError as e:
+        errors.extend(f"stock: {message}" for message in e.messages)
+
+    if errors:
+        raise ValidationError(errors)
+    fields = {
+        'sku': sku,
+        'name': name[:Product._meta.get_field('name').max_length],
+        'price': price,
+        'stock': stock,
+        'description': _text(row, 'description'),
+        'category': category,
+    }
+    return fields, _text(row, 'image')
+
+
+# =======================
+# Images (local files copied into storage in parallel)
+# =======================
+
+def _content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _store_image(source, image_root):
+    path = os.path.normpath(os.path.join(image_root, source))
+    if not path.startswith(os.path.normpath(image_root) + os.sep):
+        raise ValidationError("image path escapes the image root")
+    if not os.path.isfile(path):
+        raise ValidationError(f"image not found: {source}")
+
+    # Named by content: re-imports reuse the stored copy, a changed file gets a new name
+    original = PurePosixPath(os.path.basename(path))
+    stem = original.stem[:MAX_IMAGE_STEM]
+    name = str(PurePosixPath(IMAGE_DIR) / f"{stem}-{_content_hash(path)[:16]}{original.suffix}")
+    if default_storage.exists(name):
+        return name
+    with open(path, 'rb') as handle:
+        return default_storage.save(name, File(handle))
+
+
+def store_images(sources, image_root, executor):
+    # {source: stored name or ValidationError}
+    unique = sorted({source for source in sources if source})
+    results = executor.map(lambda source: _try(_store_image, source, image_root), unique)
+    return dict(zip(unique, results))
+
+
+def _try(func, *args):
+    try:
+        return func(*args)
+    except ValidationError as e:
+        return e
+    except OSError as e:
+        return ValidationError(f"image could not be read: {e}")
+
+
+# =======================
+# Upsert
+# =======================
+
+def _upsert(products):
+    with_image = [product for product in products if product.image]
+    without_image = [product for product in products if not product.image]
+    for group, update_fields in ((with_image, UPDATE_FIELDS + ['image']), (without_image, UPDATE_FIELDS)):
+        if group:
+            Product.objects.bulk_create(
+                group,
+                update_conflicts=True,
+                # MySQL infers the conflict target from the unique key and rejects an explicit one
+                unique_fields=['sku'] if connection.features.supports_update_conflicts_with_target else None,
+                update_fields=update_fields,
+            )
+    return list(Product.objects.filter(sku__in=[product.sku for product in products]).values_list('id', flat=True))
+
+
+def import_products(stream, fmt='csv', image_root=None, batch_size=IMPORT_BATCH_SIZE, errors=None,
+                    image_workers=IMAGE_WORKERS, progress=None):
+    # errors: optional text stream that receives a CSV of rejected rows
+    report = ImportReport()
+    error_writer = csv.writer(errors) if errors is not None else None
+    if error_writer:
+        error_writer.writerow(ERROR_COLUMNS)
+
+    def reject(number, sku, messages):
+        report.failed += 1
+        if error_writer:
+            error_writer.writerow([number, sku, '; '.join(messages)])
+
+    with ThreadPoolExecutor(max_workers=image_workers) as executor:
+        for batch in _batches(read_rows(stream, fmt), batch_size):
+            report.rows += len(batch)
+            valid = {}
+            for number, row in batch:
+                try:
+                    fields, image = validate_row(row)
+                except ValidationError as e:
+                    reject(number, _text(row, 'sku') if isinstance(row, dict) else '', e.messages)
+                    continue
+                if image and not image_root:
+                    reject(number, fields['sku'], ["image given but no image root configured"])
+                    continue
+                # A SKU repeated within a batch: the last row wins, as in a sequential import
+                valid[fields['sku']] = (number, fields, image)
+
+            images = store_images([image for _, _, image in valid.values()], image_root, executor) if image_root else {}
+
+            products, scheduled = [], []
+            now = timezone.now()
+            for number, fields, image in valid.values():
+                stored = images.get(image, '') if image else ''
+                if isinstance(stored, ValidationError):
+                    reject(number, fields['sku'], stored.messages)
+                    continue
+                products.append(Product(image=stored, created_at=now, updated_at=now, **fields))
+                if stored:
+                    scheduled.append(stored)
+
+            if products:
+                with transaction.atomic():
+                    product_ids = _upsert(products)
+                    # bulk_create skips the Product signals: invalidate once per batch instead
+                    transaction.on_commit(lambda ids=product_ids: invalidate_products(ids))
+                    transaction.on_commit(bump_search_generation)
+                for name in scheduled:
+                    schedule_derivatives(name)
+                report.imported += len(products)
+
+            if progress:
+                progress(report)
+    return report
@@ -0,0 +1,57 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from admin_panel.images import IMAGE_WORKERS, derivative_job, mark_derivatives, render_derivatives
+from admin_panel.models import Product
+
+
+class Command(BaseCommand):
+    help = "Generate resized thumbnails and WebP copies for existing product images"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=IMAGE_WORKERS)
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        image_names = (
+            Product.objects.exclude(image='')
+            .order_by('image')
+            .values_list('image', flat=True)
+            .distinct()
+            .iterator(chunk_size=options['chunk_size'])
+        )
+
+        started = time.monotonic()
+        processed = rendered = failed = 0
+        in_flight = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for image_name in image_names:
+                # Keep a bounded window of jobs so memory stays flat on big catalogs
+                if len(in_flight) >= workers * 4:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = in_flight.pop(future)
+                        processed, rendered, failed = self._collect(future, name, processed, rendered, failed)
+
+                in_flight[executor.submit(render_derivatives, *derivative_job(image_name))] = image_name
+
+            for future in list(in_flight):
+                processed, rendered, failed = self._collect(future, in_flight.pop(future), processed, rendered, failed)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{processed} images checked, {rendered} derivatives written, {failed} failed in {elapsed:.1f}s"
+        ))
+
+    def _collect(self, future, image_name, processed, rendered, failed):
+        try:
+            rendered += future.result()
+        except Exception as e:
+            failed += 1
+            self.stderr.write(f"{image_name}: {e}")
+        else:
+            mark_derivatives(image_name)
+        return processed + 1, rendered, failed
@@ -0,0 +1,43 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_panel.exports import DATASETS, EXPORT_BATCH_SIZE, FORMATS, parse_order_filters, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream orders, customers or products to CSV / JSONL in constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--status', default='', help="Orders only: order status")
+        parser.add_argument('--date-from', default='', help="Orders only: first day (YYYY-MM-DD)")
+        parser.add_argument('--date-to', default='', help="Orders only: last day, inclusive (YYYY-MM-DD)")
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE)
+        parser.add_argument('--output', '-o', help="File to write; defaults to stdout")
+
+    def handle(self, *args, **options):
+        params = {'status': options['status'], 'date_from': options['date_from'], 'date_to': options['date_to']}
+        filters = parse_order_filters(params)
+        for name in params:
+            if params[name] and not filters[name]:
+                raise CommandError(f"Invalid --{name.replace('_', '-')}: {params[name]}")
+
+        chunks = stream_export(
+            options['dataset'], options['format'], filters, options['gzip'], options['batch_size'],
+        )
+        started = time.perf_counter()
+        written = 0
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['output']:
+                output.close()
+        if options['output']:
+            self.stdout.write(f"Wrote {written} bytes to {options['output']} in {time.perf_counter() - started:.1f}s.")
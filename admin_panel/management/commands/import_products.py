@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_panel.imports import IMAGE_WORKERS, IMPORT_BATCH_SIZE, import_products
+
+
+class Command(BaseCommand):
+    help = "Upsert products by SKU from a CSV / JSONL file, streaming it in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or - for stdin")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="Defaults to the file extension, else csv")
+        parser.add_argument('--image-root', help="Directory that relative image paths in the file point into")
+        parser.add_argument('--errors', help="Write rejected rows (line, sku, error) to this CSV file")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--image-workers', type=int, default=IMAGE_WORKERS)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+        def progress(report):
+            self.stdout.write(f"  {report}")
+
+        try:
+            source = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        except OSError as e:
+            raise CommandError(f"Cannot open {path}: {e}")
+        errors = open(options['errors'], 'w', newline='', encoding='utf-8') if options['errors'] else None
+        try:
+            report = import_products(
+                source, fmt, options['image_root'], options['batch_size'], errors,
+                options['image_workers'], progress,
+            )
+        finally:
+            if path != '-':
+                source.close()
+            if errors:
+                errors.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {report}."))
+        if report.failed and not errors:
+            self.stdout.write(self.style.WARNING("Re-run with --errors FILE to see why rows were rejected."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from admin_panel.product_cache import cache_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss statistics for the product read-through cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Clear the counters after printing")
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']:.1%}"
+        )
+        if options['reset']:
+            reset_stats()
+            self.stdout.write("Counters reset.")
@@ -0,0 +1,27 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from admin_panel.rollups import REBUILD_BATCH_SIZE, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the hourly/daily sales rollups from orders and sign-ups"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="First day to rebuild (YYYY-MM-DD); defaults to all history")
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['since']:
+            try:
+                day = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--since must look like YYYY-MM-DD")
+        else:
+            day = datetime(2000, 1, 1).date()
+        since = timezone.make_aware(datetime.combine(day, time.min))
+
+        rows = rebuild_rollups(since, batch_size=options['batch_size'])
+        self.stdout.write(f"Rebuilt {rows} rollup row(s) since {day}.")
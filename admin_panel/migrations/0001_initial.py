@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:38
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdminRegister',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('phone', models.CharField(max_length=15)),
+                ('password', models.CharField(max_length=128)),
+            ],
+            options={
+                'db_table': 'admin_register',
+            },
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0.01)])),
+                ('stock', models.PositiveIntegerField()),
+                ('description', models.TextField()),
+                ('category', models.CharField(choices=[('mobiles', 'Mobiles'), ('laptops', 'Laptops'), ('accessories', 'Accessories'), ('earbuds', 'Earbuds'), ('smartwatch', 'Smartwatch'), ('other', 'Other')], max_length=50)),
+                ('image', models.ImageField(upload_to='products/')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'admin_panel_product',
+            },
+        ),
+    ]
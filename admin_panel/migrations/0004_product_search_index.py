@@ -0,0 +1,60 @@
+from django.db import migrations
+
+from admin_panel.search import POSTGRES_DOCUMENT, SQLITE_TRIGGERS
+
+
+# Full-text index over name / description / category. MySQL maintains a
+# FULLTEXT index itself, PostgreSQL a GIN index on the weighted tsvector;
+# SQLite gets an FTS5 table kept in sync by triggers.
+FORWARD_SQL = {
+    'postgresql': [
+        f"CREATE INDEX product_search_gin ON admin_panel_product USING GIN ({POSTGRES_DOCUMENT})",
+    ],
+    'mysql': [
+        "ALTER TABLE admin_panel_product "
+        "ADD FULLTEXT INDEX product_search_ft (name, description, category)",
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE admin_panel_product_fts USING fts5("
+        "name, description, category, tokenize='unicode61')",
+        "INSERT INTO admin_panel_product_fts(rowid, name, description, category) "
+        "SELECT id, name, description, category FROM admin_panel_product",
+        *SQLITE_TRIGGERS,
+    ],
+}
+
+REVERSE_SQL = {
+    'postgresql': [
+        "DROP INDEX IF EXISTS product_search_gin",
+    ],
+    'mysql': [
+        "ALTER TABLE admin_panel_product DROP INDEX product_search_ft",
+    ],
+    'sqlite': [
+        "DROP TRIGGER IF EXISTS admin_panel_product_fts_ai",
+        "DROP TRIGGER IF EXISTS admin_panel_product_fts_au",
+        "DROP TRIGGER IF EXISTS admin_panel_product_fts_ad",
+        "DROP TABLE IF EXISTS admin_panel_product_fts",
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    for statement in FORWARD_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in REVERSE_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0003_product_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:08
+
+from django.db import migrations, models
+
+from admin_panel.search import restore_sqlite_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0006_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(restore_sqlite_triggers, migrations.RunPython.noop),
+    ]
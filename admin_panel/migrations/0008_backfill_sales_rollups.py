@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+from admin_panel.rollups import rebuild_rollups
+
+
+def backfill_rollups(apps, schema_editor):
+    # Installs upgraded past 0006 have orders and users but empty rollups, which the
+    # dashboard would show as zeros until rebuild_sales_rollups was run by hand
+    rebuild_rollups(timezone.make_aware(datetime(2000, 1, 1)), apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0007_product_sku'),
+        ('users', '0010_user_email_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,11 @@
 from django.db import models
-from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth.hashers import make_password
 from django.core.validators import MinValueValidator
 from django.conf import settings
 from django.contrib.auth import get_user_model
 
+from users.hashers import run_bounded, verify
+
 
 class AdminRegister(models.Model):
     name = models.CharField(max_length=100)
@@ -18,7 +20,12 @@ class AdminRegister(models.Model):
         self.password = make_password(raw_password)
 
     def check_password(self, raw_password):
-        return check_password(raw_password, self.password)
+        # Verified in the bounded hashing pool; outdated hashes are re-encoded in place
+        valid, new_hash = run_bounded(verify, raw_password, self.password)
+        if new_hash:
+            self.password = new_hash
+            self.save(update_fields=['password'])
+        return valid
 
     def __str__(self):
         return self.name
@@ -33,6 +40,8 @@ class Product(models.Model):
         ('smartwatch', 'Smartwatch'),
         ('other', 'Other'),
     ]
+    # Supplier / catalog key used by bulk imports to upsert; optional for hand-made products
+    sku = models.CharField(max_length=64, unique=True, blank=True, null=True)
     name = models.CharField(max_length=200)
     price = models.DecimalField(
         max_digits=10,
@@ -40,6 +49,8 @@ class Product(models.Model):
         validators=[MinValueValidator(0.01)]
     )
     stock = models.PositiveIntegerField()
+    # Quantity held by open checkouts (users.InventoryHold); never edited by hand
+    reserved = models.PositiveIntegerField(default=0, editable=False)
     description = models.TextField()
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
     image = models.ImageField(upload_to='products/')
@@ -48,14 +59,37 @@ class Product(models.Model):
 
     class Meta:
         db_table = 'admin_panel_product'
+        indexes = [
+            # Keyset pagination walks (created_at, id) newest first
+            models.Index(fields=['-created_at', '-id'], name='product_created_id_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='product_cat_created_idx'),
+            models.Index(fields=['category', 'price'], name='product_cat_price_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so saves that don't touch the image skip derivative rendering
+        if 'image' in instance.__dict__:
+            instance._loaded_image = instance.image.name
+        return instance
+
+    def image_changed(self):
+        if 'image' not in self.__dict__:
+            return False  # deferred, so never assigned
+        return self.image.name != getattr(self, '_loaded_image', None)
+
     @property
     def in_stock(self):
         return self.stock > 0
 
+    @property
+    def available(self):
+        return max(self.stock - self.reserved, 0)
+
     def get_discounted_price(self):
         if hasattr(self, 'discount') and self.discount:
             return self.price * (1 - self.discount / 100)
@@ -99,4 +133,27 @@ class OrderItem(models.Model):
         return f"{self.quantity} x {self.product.name}"
 
 
+class SalesRollup(models.Model):
+    # Incrementally maintained counters; category '' holds the all-category totals
+    PERIOD_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    bucket = models.DateTimeField()
+    category = models.CharField(max_length=50, blank=True, default='')
+    orders = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.PositiveIntegerField(default=0)
+    new_customers = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'admin_panel_sales_rollup'
+        unique_together = ('period', 'bucket', 'category')
+
+    def __str__(self):
+        return f"{self.period} {self.bucket:%Y-%m-%d %H:00} {self.category or 'all'}"
+
+
 User = get_user_model()
\ No newline at end of file
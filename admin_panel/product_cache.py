@@ -0,0 +1,173 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from .models import Product
+
+
+# Bump when the pickled Product shape changes so old entries are ignored
+CACHE_SCHEMA = 1
+PRODUCT_CACHE_TIMEOUT = getattr(settings, 'PRODUCT_CACHE_TIMEOUT', 60 * 60)
+STATS_FLUSH_EVERY = 100
+
+CATALOG_VERSION_KEY = 'product_cache:catalog_version'
+STATS_KEYS = {
+    'hits': 'product_cache:stats:hits',
+    'misses': 'product_cache:stats:misses',
+}
+
+
+# =======================
+# Versions
+# =======================
+
+def _version_key(product_id):
+    return f"product_cache:version:{product_id}"
+
+
+def _entry_key(product_id, version):
+    return f"product_cache:{CACHE_SCHEMA}:{product_id}:{version}"
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+        return 1
+
+
+def catalog_version():
+    # Covers list pages: any product write moves every catalog key forward
+    return cache.get_or_set(CATALOG_VERSION_KEY, 1, None)
+
+
+def _product_versions(product_ids):
+    keys = {product_id: _version_key(product_id) for product_id in product_ids}
+    found = cache.get_many(keys.values())
+    missing = {keys[product_id]: 1 for product_id in product_ids if keys[product_id] not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {product_id: found[key] for product_id, key in keys.items()}
+
+
+def invalidate_products(product_ids):
+    # One catalog bump per batch no matter how many rows changed
+    for product_id in set(product_ids):
+        _incr(_version_key(product_id))
+    _incr(CATALOG_VERSION_KEY)
+
+
+def invalidate_product(product_id):
+    invalidate_products([product_id])
+
+
+_deferred = threading.local()
+
+
+@contextmanager
+def deferred_invalidation():
+    # Product signals inside the block only collect ids; the caller invalidates the batch once
+    _deferred.ids = ids = set()
+    try:
+        yield ids
+    finally:
+        _deferred.ids = None
+
+
+def defer_invalidation(product_id):
+    ids = getattr(_deferred, 'ids', None)
+    if ids is None:
+        return False
+    ids.add(product_id)
+    return True
+
+
+# =======================
+# Hit / miss statistics
+# =======================
+
+_local_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _record(hits, misses):
+    with _stats_lock:
+        _local_stats['hits'] += hits
+        _local_stats['misses'] += misses
+        if _local_stats['hits'] + _local_stats['misses'] < STATS_FLUSH_EVERY:
+            return
+        pending = dict(_local_stats)
+        _local_stats.clear()
+    _flush(pending)
+
+
+def _flush(pending):
+    for name, value in pending.items():
+        if not value:
+            continue
+        try:
+            cache.incr(STATS_KEYS[name], value)
+        except ValueError:
+            cache.set(STATS_KEYS[name], value, None)
+
+
+def cache_stats():
+    with _stats_lock:
+        pending = dict(_local_stats)
+        _local_stats.clear()
+    _flush(pending)
+
+    stats = {name: cache.get(key, 0) for name, key in STATS_KEYS.items()}
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / total if total else 0.0
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        _local_stats.clear()
+    cache.delete_many(STATS_KEYS.values())
+
+
+# =======================
+# Read-through lookups
+# =======================
+
+def get_products(product_ids):
+    product_ids = list(dict.fromkeys(int(product_id) for product_id in product_ids))
+    if not product_ids:
+        return {}
+
+    versions = _product_versions(product_ids)
+    keys = {product_id: _entry_key(product_id, versions[product_id]) for product_id in product_ids}
+    found = cache.get_many(keys.values())
+    products = {product_id: found[key] for product_id, key in keys.items() if key in found}
+
+    missing = [product_id for product_id in product_ids if product_id not in products]
+    if missing:
+        loaded = Product.objects.in_bulk(missing)
+        cache.set_many(
+            {keys[product_id]: product for product_id, product in loaded.items()},
+            PRODUCT_CACHE_TIMEOUT,
+        )
+        products.update(loaded)
+
+    _record(len(product_ids) - len(missing), len(missing))
+    return products
+
+
+def get_product(product_id):
+    return get_products([product_id]).get(int(product_id))
+
+
+def get_product_or_404(product_id):
+    product = get_product(product_id)
+    if product is None:
+        raise Http404("No Product matches the given query.")
+    return product
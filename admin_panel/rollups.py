@@ -0,0 +1,226 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Prefetch, Sum
+from django.utils import timezone
+
+from .models import Product, SalesRollup
+
+
+PERIODS = ('hour', 'day')
+COUNTERS = ('orders', 'revenue', 'units', 'new_customers')
+ALL_CATEGORIES = ''
+UNKNOWN_CATEGORY = 'unknown'
+REBUILD_BATCH_SIZE = 1000
+
+
+# =======================
+# Deltas
+# =======================
+
+def buckets(moment):
+    local = timezone.localtime(moment)
+    hour = local.replace(minute=0, second=0, microsecond=0)
+    return {'hour': hour, 'day': hour.replace(hour=0)}
+
+
+def _add(deltas, key, **counters):
+    row = deltas.setdefault(key, dict.fromkeys(COUNTERS, 0))
+    for name, value in counters.items():
+        row[name] += value
+
+
+def order_deltas(deltas, order_date, grand_total, lines):
+    # lines: (category, quantity, line_total); per-category rows count each order once
+    by_category = {}
+    for category, quantity, line_total in lines:
+        units, revenue = by_category.get(category, (0, Decimal('0')))
+        by_category[category] = (units + quantity, revenue + line_total)
+
+    for period, bucket in buckets(order_date).items():
+        _add(deltas, (period, bucket, ALL_CATEGORIES),
+             orders=1, revenue=grand_total, units=sum(units for units, _ in by_category.values()))
+        for category, (units, revenue) in by_category.items():
+            _add(deltas, (period, bucket, category), orders=1, revenue=revenue, units=units)
+    return deltas
+
+
+def customer_deltas(deltas, date_joined):
+    for period, bucket in buckets(date_joined).items():
+        _add(deltas, (period, bucket, ALL_CATEGORIES), new_customers=1)
+    return deltas
+
+
+# =======================
+# Applying deltas
+# =======================
+
+UPSERT_SQL = {
+    'sqlite': (
+        "INSERT INTO admin_panel_sales_rollup (period, bucket, category, orders, revenue, units, new_customers) "
+        "VALUES {values} "
+        "ON CONFLICT (period, bucket, category) DO UPDATE SET "
+        "orders = admin_panel_sales_rollup.orders + excluded.orders, "
+        "revenue = admin_panel_sales_rollup.revenue + excluded.revenue, "
+        "units = admin_panel_sales_rollup.units + excluded.units, "
+        "new_customers = admin_panel_sales_rollup.new_customers + excluded.new_customers"
+    ),
+    'postgresql': (
+        "INSERT INTO admin_panel_sales_rollup (period, bucket, category, orders, revenue, units, new_customers) "
+        "VALUES {values} "
+        "ON CONFLICT (period, bucket, category) DO UPDATE SET "
+        "orders = admin_panel_sales_rollup.orders + excluded.orders, "
+        "revenue = admin_panel_sales_rollup.revenue + excluded.revenue, "
+        "units = admin_panel_sales_rollup.units + excluded.units, "
+        "new_customers = admin_panel_sales_rollup.new_customers + excluded.new_customers"
+    ),
+    'mysql': (
+        "INSERT INTO admin_panel_sales_rollup (period, bucket, category, orders, revenue, units, new_customers) "
+        "VALUES {values} "
+        "ON DUPLICATE KEY UPDATE "
+        "orders = orders + VALUES(orders), revenue = revenue + VALUES(revenue), "
+        "units = units + VALUES(units), new_customers = new_customers + VALUES(new_customers)"
+    ),
+}
+
+
+def _upsert(rows):
+    ops = connection.ops
+    params = []
+    for (period, bucket, category), counters in rows:
+        params.extend([
+            period,
+            ops.adapt_datetimefield_value(bucket),
+            category,
+            counters['orders'],
+            ops.adapt_decimalfield_value(counters['revenue'], 14, 2),
+            counters['units'],
+            counters['new_customers'],
+        ])
+    values = ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(rows))
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT_SQL[connection.vendor].format(values=values), params)
+
+
+def _update_or_create(rows):
+    for (period, bucket, category), counters in rows:
+        lookup = SalesRollup.objects.filter(period=period, bucket=bucket, category=category)
+        increments = {name: F(name) + value for name, value in counters.items()}
+        if lookup.update(**increments):
+            continue
+        try:
+            with transaction.atomic():
+                SalesRollup.objects.create(period=period, bucket=bucket, category=category, **counters)
+        except IntegrityError:
+            lookup.update(**increments)
+
+
+def apply_deltas(deltas):
+    # One statement for every touched bucket; a fixed row order keeps concurrent writers deadlock-free
+    rows = sorted(deltas.items(), key=lambda row: row[0])
+    if not rows:
+        return
+    if connection.vendor in UPSERT_SQL:
+        _upsert(rows)
+    else:
+        _update_or_create(rows)
+
+
+def record_order(order_date, grand_total, lines):
+    apply_deltas(order_deltas({}, order_date, grand_total, lines))
+
+
+def record_new_customer(date_joined):
+    apply_deltas(customer_deltas({}, date_joined))
+
+
+# =======================
+# Rebuild (backfills / repairs)
+# =======================
+
+def _models(apps=None):
+    # The backfill migration passes its historical app registry; everything else uses the live models
+    if apps is None:
+        from users.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+        sources = ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem))
+        return sources, Product, get_user_model(), SalesRollup
+    sources = tuple(
+        (apps.get_model('users', order), apps.get_model('users', item))
+        for order, item in (('Order', 'OrderItem'), ('ArchivedOrder', 'ArchivedOrderItem'))
+    )
+    return (
+        sources, apps.get_model('admin_panel', 'Product'), apps.get_model(settings.AUTH_USER_MODEL),
+        apps.get_model('admin_panel', 'SalesRollup'),
+    )
+
+
+def rebuild_rollups(since, batch_size=REBUILD_BATCH_SIZE, apps=None):
+    # Recomputes every bucket from `since` (rounded down to the day) from orders and sign-ups
+    sources, product_model, user_model, rollup_model = _models(apps)
+    since = buckets(since)['day']
+    deltas = {}
+    for order_model, item_model in sources:
+        last_id = 0
+        while True:
+            orders = list(
+                order_model.objects.filter(order_date__gte=since, id__gt=last_id).order_by('id')
+                .prefetch_related(Prefetch('items', queryset=item_model.objects.only(
+                    'order_id', 'product_id', 'quantity', 'total_price',
+                )))[:batch_size]
+            )
+            if not orders:
+                break
+            product_ids = {item.product_id for order in orders for item in order.items.all()}
+            categories = dict(product_model.objects.filter(id__in=product_ids).values_list('id', 'category'))
+            for order in orders:
+                lines = [
+                    (categories.get(item.product_id, UNKNOWN_CATEGORY), item.quantity, item.total_price)
+                    for item in order.items.all()
+                ]
+                order_deltas(deltas, order.order_date, order.grand_total, lines)
+            last_id = orders[-1].id
+
+    joined = user_model.objects.filter(date_joined__gte=since).values_list('date_joined', flat=True)
+    for date_joined in joined.iterator(chunk_size=batch_size):
+        customer_deltas(deltas, date_joined)
+
+    with transaction.atomic():
+        rollup_model.objects.filter(bucket__gte=since).delete()
+        rollup_model.objects.bulk_create(
+            [
+                rollup_model(period=period, bucket=bucket, category=category, **counters)
+                for (period, bucket, category), counters in sorted(deltas.items(), key=lambda row: row[0])
+            ],
+            batch_size=batch_size,
+        )
+    return len(deltas)
+
+
+# =======================
+# Dashboard reads (O(days) rows)
+# =======================
+
+def sales_totals():
+    totals = SalesRollup.objects.filter(period='day', category=ALL_CATEGORIES).aggregate(
+        orders=Sum('orders'), revenue=Sum('revenue'), new_customers=Sum('new_customers'),
+    )
+    return {name: value or 0 for name, value in totals.items()}
+
+
+def revenue_series(days=30):
+    today = buckets(timezone.now())['day']
+    start = today - timedelta(days=days - 1)
+    rows = {
+        timezone.localtime(row['bucket']).date(): row
+        for row in SalesRollup.objects.filter(period='day', category=ALL_CATEGORIES, bucket__gte=start)
+        .values('bucket', 'orders', 'revenue')
+    }
+    series = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).date()
+        row = rows.get(day, {})
+        series.append({'date': day, 'orders': row.get('orders', 0), 'revenue': row.get('revenue') or Decimal('0')})
+    return series
@@ -0,0 +1,135 @@
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import NotSupportedError, connection
+
+
+# Ranked ids fetched per full-text query; deeper catalog pages page the query itself
+SEARCH_RESULT_LIMIT = 240
+SEARCH_CACHE_TIMEOUT = getattr(settings, 'PRODUCT_SEARCH_CACHE_TIMEOUT', 300)
+GENERATION_KEY = 'product_search:generation'
+MAX_TOKENS = 8
+
+
+# SQLite rebuilds admin_panel_product for most ALTERs and drops these triggers
+# with the old table, so migrations that change Product must re-run them.
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS admin_panel_product_fts_ai AFTER INSERT ON admin_panel_product BEGIN "
+    "INSERT INTO admin_panel_product_fts(rowid, name, description, category) "
+    "VALUES (new.id, new.name, new.description, new.category); END",
+    "CREATE TRIGGER IF NOT EXISTS admin_panel_product_fts_au AFTER UPDATE OF name, description, category "
+    "ON admin_panel_product BEGIN "
+    "UPDATE admin_panel_product_fts SET name = new.name, description = new.description, "
+    "category = new.category WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS admin_panel_product_fts_ad AFTER DELETE ON admin_panel_product BEGIN "
+    "DELETE FROM admin_panel_product_fts WHERE rowid = old.id; END",
+]
+
+
+# PostgreSQL searches this expression through a GIN index on it (migration 0004);
+# the weights mirror the bm25 / MySQL ranking: name > category > description.
+POSTGRES_DOCUMENT = (
+    "(setweight(to_tsvector('simple', name), 'A') || "
+    "setweight(to_tsvector('simple', category), 'B') || "
+    "setweight(to_tsvector('simple', description), 'C'))"
+)
+
+
+def restore_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+def tokenize(query):
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TOKENS]
+
+
+# =======================
+# Backend queries
+# =======================
+
+# Ties on rank are broken by id so OFFSET pages never skip or repeat a product
+
+def _sqlite_search(tokens, offset, limit):
+    # Prefix match on every token, ranked by bm25 (name > category > description)
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    sql = (
+        "SELECT rowid FROM admin_panel_product_fts "
+        "WHERE admin_panel_product_fts MATCH %s "
+        "ORDER BY bm25(admin_panel_product_fts, 10.0, 1.0, 5.0), rowid DESC LIMIT %s OFFSET %s"
+    )
+    return sql, [match, limit, offset]
+
+
+def _mysql_search(tokens, offset, limit):
+    against = ' '.join(f'+{token}*' for token in tokens)
+    sql = (
+        "SELECT id FROM admin_panel_product "
+        "WHERE MATCH(name, description, category) AGAINST (%s IN BOOLEAN MODE) "
+        "ORDER BY MATCH(name, description, category) AGAINST (%s IN BOOLEAN MODE) DESC, id DESC "
+        "LIMIT %s OFFSET %s"
+    )
+    return sql, [against, against, limit, offset]
+
+
+def _postgres_search(tokens, offset, limit):
+    query = ' & '.join(f'{token}:*' for token in tokens)
+    sql = (
+        f"SELECT id FROM admin_panel_product "
+        f"WHERE {POSTGRES_DOCUMENT} @@ to_tsquery('simple', %s) "
+        f"ORDER BY ts_rank({POSTGRES_DOCUMENT}, to_tsquery('simple', %s)) DESC, id DESC "
+        f"LIMIT %s OFFSET %s"
+    )
+    return sql, [query, query, limit, offset]
+
+
+BACKENDS = {
+    'sqlite': _sqlite_search,
+    'mysql': _mysql_search,
+    'postgresql': _postgres_search,
+}
+
+
+def _run_search(tokens, offset, limit):
+    backend = BACKENDS.get(connection.vendor)
+    if backend is None:
+        raise NotSupportedError(f"Product search has no full-text backend for {connection.vendor}")
+
+    sql, params = backend(tokens, offset, limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+# =======================
+# Cached lookups
+# =======================
+
+def _generation():
+    return cache.get_or_set(GENERATION_KEY, 1, None)
+
+
+def bump_search_generation():
+    # Invalidates every cached result at once; old keys age out of the cache
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+
+def search_product_ids(query, offset=0, limit=SEARCH_RESULT_LIMIT):
+    # Ranked ids at positions offset .. offset + limit of the full result
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+
+    digest = hashlib.md5(' '.join(tokens).encode()).hexdigest()
+    key = f"product_search:{_generation()}:{offset}:{limit}:{digest}"
+    ids = cache.get(key)
+    if ids is None:
+        ids = _run_search(tokens, offset, limit)
+        cache.set(key, ids, SEARCH_CACHE_TIMEOUT)
+    return ids
@@ -0,0 +1,44 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .images import schedule_derivatives
+from .models import Product
+from .product_cache import defer_invalidation, invalidate_product
+from .rollups import record_new_customer
+from .search import bump_search_generation
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    product_id = instance.pk
+    if defer_invalidation(product_id):
+        return
+
+    # Bump after commit so readers never cache pre-commit rows under the new version
+    def invalidate():
+        invalidate_product(product_id)
+        bump_search_generation()
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Product)
+def product_image_saved(sender, instance, **kwargs):
+    # Thumbnails / WebP copies are rendered in the process pool, off the request
+    if not instance.image_changed():
+        return
+    instance._loaded_image = instance.image.name
+    if instance.image:
+        transaction.on_commit(partial(schedule_derivatives, instance.image.name))
+
+
+@receiver(post_save, sender=get_user_model())
+def customer_joined(sender, instance, created, raw=False, **kwargs):
+    # Same transaction as the sign-up, so the rollup never counts a rolled-back user
+    if created and not raw:
+        record_new_customer(instance.date_joined)
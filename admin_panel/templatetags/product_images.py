@@ -0,0 +1,21 @@
+from django import template
+
+from admin_panel.images import has_derivatives, srcset
+
+
+register = template.Library()
+
+
+@register.inclusion_tag('admin_panel/partials/product_picture.html')
+def product_picture(product, css_class='', style='', sizes='(max-width: 768px) 100vw, 33vw'):
+    image_name = product.image.name if product.image else ''
+    ready = bool(image_name) and has_derivatives(image_name)
+    return {
+        'product': product,
+        'css_class': css_class,
+        'style': style,
+        'sizes': sizes,
+        'ready': ready,
+        'webp_srcset': srcset(image_name, 'webp') if ready else '',
+        'jpg_srcset': srcset(image_name, 'jpg') if ready else '',
+    }
@@ -1,3 +1,614 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
 
-# Create your tests here.
+from PIL import Image
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from unittest import mock
+
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from users.models import ArchivedOrder, CartItem, Order, OrderItem, UsersRegister
+from users.catalog import get_product_page
+from users.hashers import HashingBusy
+from users.order_numbers import new_order_number
+from .exports import parse_order_filters, stream_export
+from .bulk import BulkActionError, apply_bulk_action, parse_value
+from .customers import get_customer_page
+from .images import DERIVATIVE_WIDTHS, derivative_job, derivative_name, has_derivatives, render_derivatives
+from .imports import import_products
+from .product_cache import (
+    cache_stats, catalog_version, deferred_invalidation, get_product, get_products, reset_stats,
+)
+from .models import AdminRegister, Product, SalesRollup
+from .search import search_product_ids
+from .rollups import buckets, rebuild_rollups, revenue_series, sales_totals
+
+
+CHECKOUT_FORM = {
+    'full_name': 'Test Buyer',
+    'address_line1': '1 Main Street',
+    'city': 'Chennai',
+    'state': 'TN',
+    'postal_code': '600001',
+    'country': 'India',
+    'phone': '9999999999',
+    'payment_method': 'cod',
+}
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'secret-pass')
+        self.client.force_login(self.user)
+
+    def buy(self, *lines):
+        for category, price, quantity in lines:
+            product = Product.objects.create(
+                name=f"{category} item", price=Decimal(price), stock=100, description="Test product",
+                category=category, image='products/test.jpg',
+            )
+            CartItem.objects.create(user=self.user, product=product, quantity=quantity)
+        self.client.post(reverse('checkout'), CHECKOUT_FORM)
+
+    def row(self, period, category=''):
+        bucket = buckets(timezone.now())[period]
+        return SalesRollup.objects.get(period=period, bucket=bucket, category=category)
+
+    def test_orders_and_signups_update_rollups(self):
+        self.buy(('mobiles', '100.00', 2), ('laptops', '500.00', 1))
+        self.buy(('mobiles', '10.00', 1))
+
+        for period in ('hour', 'day'):
+            total = self.row(period)
+            self.assertEqual((total.orders, total.units, total.new_customers), (2, 4, 1))
+            # 700 + 10, each with 18% tax and 50 shipping
+            self.assertEqual(total.revenue, Decimal('876.00') + Decimal('61.80'))
+            mobiles = self.row(period, 'mobiles')
+            self.assertEqual((mobiles.orders, mobiles.units, mobiles.revenue), (2, 3, Decimal('210.00')))
+
+    def test_rebuild_matches_incremental_rows(self):
+        self.buy(('mobiles', '100.00', 2), ('laptops', '500.00', 1))
+        fields = ('period', 'bucket', 'category', 'orders', 'revenue', 'units', 'new_customers')
+        incremental = sorted(SalesRollup.objects.values_list(*fields))
+
+        rebuild_rollups(timezone.now() - timedelta(days=1))
+
+        self.assertEqual(sorted(SalesRollup.objects.values_list(*fields)), incremental)
+
+    def test_backfill_migration_fills_rollups_for_existing_data(self):
+        self.buy(('mobiles', '100.00', 2), ('laptops', '500.00', 1))
+        fields = ('period', 'bucket', 'category', 'orders', 'revenue', 'units', 'new_customers')
+        incremental = sorted(SalesRollup.objects.values_list(*fields))
+        # An upgraded install: orders and users exist, the rollup table starts empty
+        SalesRollup.objects.all().delete()
+
+        migration = import_module('admin_panel.migrations.0008_backfill_sales_rollups')
+        state = MigrationLoader(connection).project_state(('admin_panel', '0008_backfill_sales_rollups'))
+        migration.backfill_rollups(state.apps, None)
+
+        self.assertEqual(sorted(SalesRollup.objects.values_list(*fields)), incremental)
+        self.assertEqual(sales_totals()['new_customers'], 1)
+
+    def test_dashboard_reads_rollups(self):
+        self.buy(('mobiles', '100.00', 1))
+        self.assertEqual(sales_totals()['orders'], 1)
+        self.assertEqual(revenue_series()[-1]['orders'], 1)
+
+        session = self.client.session
+        session['admin_email'] = 'admin@example.com'
+        session.save()
+        # session, user (template context), recent users, totals, series, product count
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.context['orders_count'], 1)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'secret-pass')
+        for n, status in enumerate(['pending', 'delivered', 'delivered']):
+            order = Order.objects.create(
+                user=self.user, order_number=new_order_number(), subtotal=Decimal('20.00'),
+                grand_total=Decimal('20.00'), status=status,
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_name=f"Item {n}-{i}", quantity=1, unit_price=Decimal('10.00'),
+                          total_price=Decimal('10.00'))
+                for i in range(2)
+            ])
+        Order.objects.filter(status='pending').update(order_date=timezone.now() - timedelta(days=10))
+
+    def export(self, fmt='csv', compress=False, batch_size=1000, **params):
+        data = b''.join(stream_export('orders', fmt, parse_order_filters(params), compress, batch_size))
+        return gzip.decompress(data).decode() if compress else data.decode()
+
+    def test_csv_has_one_row_per_line_and_batches_by_key(self):
+        # orders + items per batch of two (2 batches), then the empty archive
+        with self.assertNumQueries(5):
+            rows = list(csv.DictReader(io.StringIO(self.export(batch_size=2))))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['username'], 'buyer')
+
+    def test_status_and_date_filters_match_admin_list(self):
+        today = timezone.localdate().isoformat()
+        rows = list(csv.DictReader(io.StringIO(self.export(status='delivered', date_from=today, date_to=today))))
+        self.assertEqual({row['status'] for row in rows}, {'delivered'})
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(self.export(status='pending', date_from=today).count('\n'), 1)  # header only
+
+    def test_gzip_jsonl(self):
+        lines = self.export('jsonl', compress=True).splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(json.loads(lines[0])['product_name'], 'Item 0-0')
+
+    def test_export_view_streams_for_admins_only(self):
+        url = reverse('admin_export', args=['customers'])
+        self.assertRedirects(self.client.get(url), reverse('admin_login'), fetch_redirect_response=False)
+
+        session = self.client.session
+        session['admin_email'] = 'admin@example.com'
+        session.save()
+        response = self.client.get(url, {'gzip': '1'})
+        self.assertTrue(response.streaming)
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertIn('buyer@example.com', body)
+
+
+class ProductImportTests(TestCase):
+    FEED = (
+        "sku,name,price,stock,category,description\n"
+        "PH-1,Phone,199.99,5,mobiles,A phone\n"
+        "LP-1,Laptop,899.00,2,laptops,\n"
+        "BAD-1,Broken,0,-1,toasters,\n"
+        ",No sku,10,1,other,\n"
+    )
+
+    def run_import(self, text, fmt='csv', batch_size=1000):
+        errors = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            report = import_products(io.BytesIO(text.encode()), fmt, batch_size=batch_size, errors=errors)
+        return report, list(csv.DictReader(io.StringIO(errors.getvalue())))
+
+    def test_valid_rows_are_created_and_bad_rows_reported(self):
+        report, errors = self.run_import(self.FEED, batch_size=2)
+        self.assertEqual((report.rows, report.imported, report.failed), (4, 2, 2))
+        self.assertEqual(Product.objects.get(sku='PH-1').price, Decimal('199.99'))
+        self.assertEqual([row['line'] for row in errors], ['4', '5'])
+        self.assertIn('category', errors[0]['error'])
+        self.assertIn('stock', errors[0]['error'])
+        self.assertIn('sku is required', errors[1]['error'])
+
+    def test_reimport_updates_by_sku_and_invalidates_cache(self):
+        self.run_import(self.FEED)
+        product = Product.objects.get(sku='PH-1')
+        cache.clear()
+        self.assertEqual(get_product(product.id).stock, 5)
+
+        self.run_import('{"sku": "PH-1", "name": "Phone 2", "price": "149.50", "stock": 9, "category": "mobiles"}\n', 'jsonl')
+        self.assertEqual(Product.objects.filter(sku='PH-1').count(), 1)
+        self.assertEqual(get_product(product.id).stock, 9)
+        self.assertEqual(Product.objects.get(id=product.id).name, 'Phone 2')
+
+    def test_images_are_stored_by_content_and_kept_when_a_row_has_none(self):
+        media_root, image_root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        for root in (media_root, image_root):
+            self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+
+        def write_image(color):
+            Image.new('RGB', (40, 40), color).save(os.path.join(image_root, 'phone.png'))
+
+        def run(feed):
+            with self.captureOnCommitCallbacks(execute=True):
+                import_products(io.BytesIO(feed.encode()), image_root=image_root)
+            return Product.objects.get(sku='PH-1').image.name
+
+        with override_settings(MEDIA_ROOT=media_root), mock.patch('admin_panel.imports.schedule_derivatives'):
+            with_image = "sku,name,price,stock,category,image\nPH-1,Phone,10,1,mobiles,phone.png\n"
+            write_image('red')
+            first = run(with_image)
+            self.assertRegex(first, r'^products/phone-[0-9a-f]{16}\.png$')
+            # Same bytes again: the stored copy is reused, not duplicated
+            self.assertEqual(run(with_image), first)
+            self.assertEqual(os.listdir(os.path.join(media_root, 'products')), [os.path.basename(first)])
+
+            self.assertEqual(run("sku,name,price,stock,category\nPH-1,Phone 2,10,1,mobiles\n"), first)
+            self.assertEqual(Product.objects.get(sku='PH-1').name, 'Phone 2')
+
+            # Same file name, new content: a new stored name, so caches and derivatives can't go stale
+            write_image('blue')
+            second = run(with_image)
+            self.assertNotEqual(second, first)
+            self.assertTrue(second.startswith('products/phone-'))
+
+    def test_admin_upload(self):
+        session = self.client.session
+        session['admin_email'] = 'admin@example.com'
+        session.save()
+        upload = io.BytesIO(self.FEED.encode())
+        upload.name = 'feed.csv'
+        response = self.client.post(reverse('admin_import_products'), {'file': upload})
+        self.assertContains(response, '2 imported, 2 rejected')
+        self.assertEqual(Product.objects.count(), 2)
+
+
+class BulkProductTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = [
+            Product.objects.create(name=f"Phone {n}", price=Decimal('100.00'), stock=5, description='-',
+                                   category='mobiles')
+            for n in range(5)
+        ]
+        Product.objects.create(name='Laptop', price=Decimal('500.00'), stock=1, description='-', category='laptops')
+
+    def apply(self, action, raw=None, queryset=None, batch_size=2):
+        queryset = Product.objects.filter(category='mobiles') if queryset is None else queryset
+        with self.captureOnCommitCallbacks(execute=True):
+            return apply_bulk_action(action, queryset, parse_value(action, raw), batch_size)
+
+    def test_price_and_stock_changes_are_set_based_and_clamped(self):
+        # Per batch of ids: id page, SAVEPOINT, one UPDATE, RELEASE
+        with self.assertNumQueries(3 * 4):
+            self.assertEqual(self.apply('price_percent', '-10'), 5)
+        self.assertEqual(Product.objects.get(id=self.products[0].id).price, Decimal('90.00'))
+        self.assertEqual(self.apply('price_delta', '-200'), 5)
+        self.assertEqual(self.apply('stock_adjust', '-7'), 5)
+        product = Product.objects.get(id=self.products[0].id)
+        self.assertEqual((product.price, product.stock), (Decimal('0.01'), 0))
+        self.assertEqual(Product.objects.get(category='laptops').price, Decimal('500.00'))
+
+    def test_increases_past_the_column_range_are_rejected_up_front(self):
+        Product.objects.filter(id=self.products[0].id).update(price=Decimal('99999000.00'))
+        for action, raw in (('price_delta', '1000'), ('price_percent', '1'), ('stock_adjust', str(2 ** 31))):
+            with self.assertRaises(BulkActionError):
+                self.apply(action, raw)
+        for action, raw in (('price_delta', '1e9'), ('stock_set', str(2 ** 31))):
+            with self.assertRaises(BulkActionError):
+                parse_value(action, raw)
+        self.assertEqual(Product.objects.filter(price=Decimal('100.00')).count(), 4)
+        self.assertEqual(self.apply('price_delta', '999.99'), 5)
+        self.assertEqual(Product.objects.get(id=self.products[0].id).price, Decimal('99999999.99'))
+
+    def test_cache_invalidated_once_per_batch(self):
+        product = self.products[0]
+        self.assertEqual(get_product(product.id).category, 'mobiles')
+        self.apply('category', 'other')
+        self.assertEqual(get_product(product.id).category, 'other')
+
+    def test_delete_cascades_carts(self):
+        user = User.objects.create_user('buyer', 'buyer@example.com', 'secret-pass')
+        CartItem.objects.create(user=user, product=self.products[0], quantity=1)
+        self.assertEqual(self.apply('delete'), 5)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_bulk_view(self):
+        session = self.client.session
+        session['admin_email'] = 'admin@example.com'
+        session.save()
+        ids = [self.products[0].id, self.products[1].id]
+        response = self.client.post(reverse('admin_bulk_products'),
+                                    {'action': 'stock_set', 'value': '42', 'product_ids': ids})
+        self.assertRedirects(response, reverse('admin_products'), fetch_redirect_response=False)
+        self.assertEqual(Product.objects.filter(stock=42).count(), 2)
+        self.client.post(reverse('admin_bulk_products'), {'action': 'stock_set', 'value': '-1', 'product_ids': ids})
+        self.assertEqual(Product.objects.filter(stock=42).count(), 2)
+        response = self.client.post(reverse('admin_bulk_products'),
+                                    {'action': 'price_delta', 'value': '99999999', 'product_ids': ids}, follow=True)
+        self.assertContains(response, 'above the maximum price')
+        self.assertEqual(Product.objects.filter(price=Decimal('100.00')).count(), 5)
+
+
+class CustomerDirectoryTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.users = []
+        for n in range(5):
+            user = User.objects.create_user(f"user{n}", f"user{n}@example.com", 'secret-pass')
+            User.objects.filter(id=user.id).update(date_joined=now - timedelta(days=n))
+            self.users.append(user)
+        UsersRegister.objects.create(user=self.users[0], contact='9999999999')
+        for order_id, model, status, total in ((1, Order, 'delivered', '20.00'), (2, ArchivedOrder, 'delivered', '5.50'),
+                                               (3, Order, 'cancelled', '99.00')):
+            model.objects.create(id=order_id, user=self.users[0], order_number=new_order_number(), order_date=now,
+                                 subtotal=Decimal(total), grand_total=Decimal(total), status=status)
+
+    def test_pages_join_profile_and_order_stats_in_two_queries(self):
+        with self.assertNumQueries(2):
+            customers, cursor = get_customer_page(page_size=3)
+        self.assertEqual([customer.username for customer in customers], ['user0', 'user1', 'user2'])
+        self.assertEqual(customers[0].contact, '9999999999')
+        self.assertEqual((customers[0].order_count, customers[0].lifetime_value), (2, Decimal('25.50')))
+        self.assertEqual(customers[1].order_count, 0)
+
+        customers, cursor = get_customer_page(cursor=cursor, page_size=3)
+        self.assertEqual([customer.username for customer in customers], ['user3', 'user4'])
+        self.assertIsNone(cursor)
+
+    def test_prefix_search(self):
+        self.assertEqual([c.username for c in get_customer_page('USER3')[0]], ['user3'])
+        self.assertEqual([c.username for c in get_customer_page('user4@')[0]], ['user4'])
+        self.assertEqual(get_customer_page('example')[0], [])
+
+    def test_directory_indexes_exist_after_migrate(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'auth_user')
+        for name in ('auth_user_joined_id_idx', 'auth_user_username_lower_idx', 'auth_user_email_lower_idx'):
+            self.assertIn(name, constraints)
+
+    def page_plan(self, *args):
+        with CaptureQueriesContext(connection) as queries:
+            get_customer_page(*args, page_size=2)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + queries.captured_queries[0]['sql'])
+            return str(cursor.fetchall())
+
+    def test_pages_and_searches_use_the_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("plan text is SQLite specific")
+        self.assertIn('auth_user_joined_id_idx', self.page_plan())
+        cursor = get_customer_page(page_size=2)[1]
+        plan = self.page_plan('', cursor)
+        self.assertIn('auth_user_joined_id_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        plan = self.page_plan('U1')
+        self.assertIn('auth_user_username_lower_idx', plan)
+        self.assertIn('auth_user_email_lower_idx', plan)
+        self.assertIn('auth_user_email_lower_idx', self.page_plan('user1@'))
+        self.assertNotIn('SCAN auth_user', plan)
+
+    def test_view_query_budget(self):
+        session = self.client.session
+        session['admin_email'] = 'admin@example.com'
+        session.save()
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('admin_customer'))
+        self.assertContains(response, '25.50')
+
+
+class AdminLoginTests(TestCase):
+    def test_login_upgrades_outdated_hash(self):
+        admin = AdminRegister.objects.create(
+            name='Admin', email='admin@example.com', phone='1',
+            password=make_password('admin-pass', hasher='pbkdf2_sha1'),
+        )
+        response = self.client.post(reverse('admin_login'), {'email': 'admin@example.com', 'password': 'admin-pass'})
+        self.assertRedirects(response, reverse('admin_dashboard'), fetch_redirect_response=False)
+        admin.refresh_from_db()
+        self.assertEqual(identify_hasher(admin.password).algorithm, get_hasher().algorithm)
+        self.assertTrue(admin.check_password('admin-pass'))
+        self.assertFalse(admin.check_password('wrong'))
+
+    def test_register_when_hashing_pool_is_busy(self):
+        with mock.patch('admin_panel.views.run_bounded', side_effect=HashingBusy):
+            response = self.client.post(reverse('admin_register'), {
+                'name': 'Admin', 'email': 'admin@example.com', 'phone': '1',
+                'password': 'admin-pass', 're_enter_password': 'admin-pass',
+            })
+        self.assertEqual(response.status_code, 503)
+        self.assertContains(response, 'Too many sign-ups', status_code=503)
+        self.assertFalse(AdminRegister.objects.exists())
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def make(self, name, description='-', category='other', price='10.00'):
+        return Product.objects.create(name=name, price=Decimal(price), stock=1, description=description,
+                                      category=category)
+
+    def test_name_matches_rank_above_description_matches(self):
+        in_description = self.make('Plain case', description='Fits the galaxy phone')
+        in_name = self.make('Galaxy S24')
+        self.assertEqual(search_product_ids('galaxy'), [in_name.id, in_description.id])
+
+    def test_prefix_matching_on_every_token(self):
+        phone = self.make('Galaxy Phone Ultra')
+        self.make('Galaxy Tab')
+        self.assertEqual(search_product_ids('gal pho'), [phone.id])
+        self.assertEqual(search_product_ids('!!'), [])
+
+    def test_index_follows_add_edit_delete(self):
+        # The triggers keep the FTS table current; the signal bumps the cached generation
+        with self.captureOnCommitCallbacks(execute=True):
+            product = self.make('Nokia Brick')
+        self.assertEqual(search_product_ids('nokia'), [product.id])
+        product.name = 'Motorola Brick'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(search_product_ids('nokia'), [])
+        self.assertEqual(search_product_ids('motorola'), [product.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(search_product_ids('brick'), [])
+
+    def test_cached_results_invalidated_on_save(self):
+        first = self.make('Pixel 8')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(search_product_ids('pixel'), [first.id])
+            second = self.make('Pixel 9')
+        with self.assertNumQueries(1):
+            self.assertEqual(set(search_product_ids('pixel')), {first.id, second.id})
+        with self.assertNumQueries(0):
+            search_product_ids('pixel')
+
+    def test_catalog_pages_past_the_search_chunk(self):
+        products = [self.make(f'Widget {n}', category='laptops' if n % 2 else 'mobiles') for n in range(7)]
+        with mock.patch('users.catalog.SEARCH_RESULT_LIMIT', 2):
+            seen, cursor = [], None
+            while True:
+                page, cursor, _ = get_product_page({'query': 'widget', 'category': 'laptops',
+                                                    'page_size': '2', 'cursor': cursor or ''})
+                seen.extend(product.id for product in page)
+                if not cursor:
+                    break
+        self.assertEqual(sorted(seen), [product.id for product in products if product.category == 'laptops'])
+
+
+class ProductCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products = [
+                Product.objects.create(name=f"Cached {n}", price=Decimal('5.00'), stock=1, description='-',
+                                       category='other')
+                for n in range(3)
+            ]
+
+    def test_reads_are_served_from_cache_until_the_product_changes(self):
+        first, second, _ = self.products
+        get_products([first.id, second.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_product(first.id).name, 'Cached 0')
+
+        version = catalog_version()
+        first.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        self.assertGreater(catalog_version(), version)
+        # Only the edited product's version moved
+        with self.assertNumQueries(1):
+            products = get_products([first.id, second.id])
+        self.assertEqual(products[first.id].name, 'Renamed')
+
+        first_id = first.id
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertIsNone(get_product(first_id))
+
+    def test_bulk_writes_invalidate_once_per_batch(self):
+        get_products([product.id for product in self.products])
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_bulk_action('stock_set', Product.objects.all(), 7)
+        self.assertEqual(catalog_version(), version + 1)
+        self.assertEqual({product.stock for product in get_products([p.id for p in self.products]).values()}, {7})
+
+    def test_deferred_invalidation_collects_signal_ids(self):
+        first = self.products[0]
+        version = catalog_version()
+        with deferred_invalidation() as ids:
+            first.save()
+        self.assertEqual(ids, {first.id})
+        self.assertEqual(catalog_version(), version)
+
+    def test_stats_and_command(self):
+        ids = [product.id for product in self.products]
+        get_products(ids)
+        get_products(ids)
+        self.assertEqual(cache_stats(), {'hits': 3, 'misses': 3, 'hit_rate': 0.5})
+        out = io.StringIO()
+        call_command('product_cache_stats', '--reset', stdout=out)
+        self.assertIn('hits=3 misses=3 hit_rate=50.0%', out.getvalue())
+        self.assertEqual(cache_stats()['hits'], 0)
+
+
+def _png_upload(name='photo.png', size=(1200, 800)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 40, 40)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ProductImageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def _product(self, **fields):
+        return Product.objects.create(name='Camera', price=Decimal('10.00'), stock=1, description='-',
+                                      category='other', image=_png_upload(), **fields)
+
+    def test_derivatives_are_scheduled_only_when_the_image_changes(self):
+        with mock.patch('admin_panel.signals.schedule_derivatives') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                product = self._product()
+            self.assertEqual(schedule.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                product.stock = 5
+                product.save()
+                loaded = Product.objects.get(pk=product.pk)
+                loaded.name = 'Camera II'
+                loaded.save()
+                Product.objects.only('id', 'name').get(pk=product.pk).save()
+            self.assertEqual(schedule.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                loaded.image = _png_upload('other.png')
+                loaded.save()
+            self.assertEqual(schedule.call_count, 2)
+            schedule.assert_called_with(loaded.image.name)
+
+    def test_render_writes_every_width_and_format_once(self):
+        with mock.patch('admin_panel.signals.schedule_derivatives'):
+            product = self._product()
+        source, targets = derivative_job(product.image.name)
+        self.assertEqual(render_derivatives(source, targets), len(targets))
+        self.assertEqual(render_derivatives(source, targets), 0)
+
+        for target, width, ext in targets:
+            with Image.open(target) as image:
+                self.assertEqual(image.width, width)
+                self.assertEqual(image.format, 'WEBP' if ext == 'webp' else 'JPEG')
+
+    def test_picture_tag_falls_back_and_caches_the_storage_check(self):
+        with mock.patch('admin_panel.signals.schedule_derivatives'):
+            product = self._product()
+        template = Template('{% load product_images %}{% product_picture product "card" %}')
+
+        html = template.render(Context({'product': product}))
+        self.assertNotIn('<picture>', html)
+        self.assertIn('class="card"', html)
+
+        render_derivatives(*derivative_job(product.image.name))
+        cache.clear()
+        with mock.patch('admin_panel.images.default_storage.exists', wraps=default_storage.exists) as exists:
+            for _ in range(3):
+                html = template.render(Context({'product': product}))
+        self.assertEqual(exists.call_count, 1)
+        self.assertIn('<picture>', html)
+        largest = derivative_name(product.image.name, DERIVATIVE_WIDTHS[-1], 'webp')
+        self.assertIn(f"{default_storage.url(largest)} {DERIVATIVE_WIDTHS[-1]}w", html)
+
+    def test_backfill_command_renders_missing_derivatives(self):
+        with mock.patch('admin_panel.signals.schedule_derivatives'):
+            product = self._product()
+        out = io.StringIO()
+        call_command('backfill_image_derivatives', '--workers', '1', stdout=out, stderr=io.StringIO())
+        expected = len(DERIVATIVE_WIDTHS) * 2
+        self.assertIn(f"1 images checked, {expected} derivatives written, 0 failed", out.getvalue())
+        self.assertTrue(has_derivatives(product.image.name))
+        for width in DERIVATIVE_WIDTHS:
+            self.assertTrue(os.path.exists(default_storage.path(derivative_name(product.image.name, width, 'jpg'))))
+
+        out = io.StringIO()
+        call_command('backfill_image_derivatives', '--workers', '1', stdout=out)
+        self.assertIn("1 images checked, 0 derivatives written", out.getvalue())
@@ -8,7 +8,10 @@ urlpatterns = [
     path('admin_panel/dashboard', views.admin_dashboard, name='admin_dashboard'),
     path('admin_panel/customers', views.admin_customer, name='admin_customer'),  # ✅ keep only this
     path('admin_panel/orders', views.admin_orders, name='admin_orders'),
+    path('admin_panel/export/<str:dataset>', views.admin_export, name='admin_export'),
     path('admin_panel/products', views.admin_products, name='admin_products'),
+    path('admin_panel/products/bulk', views.admin_bulk_products, name='admin_bulk_products'),
+    path('admin_panel/products/import', views.admin_import_products, name='admin_import_products'),
     path('products/add/', views.add_product, name='add_product'),
     path('products/edit/<int:product_id>/', views.edit_product, name='edit_product'),
     path('products/delete/<int:product_id>/', views.delete_product, name='delete_product'),
@@ -1,6 +1,12 @@
+import csv
+import io
+
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, StreamingHttpResponse
+from django.views.decorators.http import require_POST
 from django.contrib import messages
-from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User  # Added User import
 from django.db import ProgrammingError, OperationalError  # Moved import to top
 from django.db.models import Sum
@@ -11,6 +17,13 @@ from users.models import UsersRegister
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required, user_passes_test
 from users.models import Order, OrderItem  # Import from users app
+from users.hashers import HashingBusy, run_bounded
+from users.order_search import search_orders
+from .bulk import ACTIONS, BulkActionError, apply_bulk_action, parse_value
+from .customers import get_customer_page
+from .imports import import_products
+from .exports import DATASETS, FORMATS, export_filename, order_date_range, parse_order_filters, stream_export
+from .rollups import revenue_series, sales_totals
 from django.db.models import Q
 
 def admin_login(request):
@@ -20,7 +33,7 @@ def admin_login(request):
 
         try:
             admin = AdminRegister.objects.get(email=email)
-            if check_password(password, admin.password):
+            if admin.check_password(password):
                 request.session['admin_email'] = admin.email
                 messages.success(request, 'Login successful!')
                 return redirect('admin_dashboard')
@@ -28,6 +41,9 @@ def admin_login(request):
                 messages.error(request, 'Invalid email or password')
         except AdminRegister.DoesNotExist:
             messages.error(request, 'Invalid email or password')
+        except HashingBusy:
+            messages.error(request, 'Too many sign-ins right now, please try again.')
+            return render(request, 'admin_panel/admin_login.html', status=503)
 
         return render(request, 'admin_panel/admin_login.html')
 
@@ -50,11 +66,17 @@ def admin_register(request):
             messages.error(request, "Email already registered")
             return redirect("admin_register")
 
+        try:
+            password_hash = run_bounded(make_password, password)  # hashed in the bounded pool
+        except HashingBusy:
+            messages.error(request, "Too many sign-ups right now, please try again.")
+            return render(request, "admin_panel/admin_register.html", status=503)
+
         AdminRegister.objects.create(
             name=name,
             email=email,
             phone=phone,
-            password=make_password(password),
+            password=password_hash,
         )
         messages.success(request, "Admin Registration Successful")
         return redirect("admin_login")
@@ -67,32 +89,35 @@ def admin_dashboard(request):
         return redirect('admin_login')
 
     try:
-        # Try to access UsersRegister table first
-        customers_count = UsersRegister.objects.count()
         recent_users = UsersRegister.objects.all().order_by('-created_at')[:5]
     except (ProgrammingError, OperationalError):
         # Fallback to User model if UsersRegister doesn't exist
-        customers_count = User.objects.count()
         recent_users = User.objects.all().order_by('-date_joined')[:5]
 
+    # Counters come from the daily rollup rows, not from scanning the order and user tables
     try:
-        orders_count = Order.objects.count()
-        total_revenue = Order.objects.aggregate(total=Sum('grand_total'))['total'] or 0
+        totals = sales_totals()
+        revenue_by_day = revenue_series()
     except (ProgrammingError, OperationalError):
-        orders_count = 0
-        total_revenue = 0
+        totals = {'orders': 0, 'revenue': 0, 'new_customers': 0}
+        revenue_by_day = []
 
     try:
         products_count = Product.objects.count()
     except (ProgrammingError, OperationalError):
         products_count = 0
 
+    peak = max((day['revenue'] for day in revenue_by_day), default=0) or 1
+    for day in revenue_by_day:
+        day['percent'] = int(day['revenue'] * 100 / peak)
+
     context = {
-        "customers_count": customers_count,
-        "orders_count": orders_count,
+        "customers_count": totals['new_customers'],
+        "orders_count": totals['orders'],
         "products_count": products_count,
-        "total_revenue": total_revenue,
+        "total_revenue": totals['revenue'],
         "recent_users": recent_users,
+        "revenue_by_day": revenue_by_day,
     }
 
     return render(request, 'admin_panel/dashboard.html', context)
@@ -102,49 +127,122 @@ def admin_customer(request):
     if 'admin_email' not in request.session:
         return redirect('admin_login')
 
-    customers = User.objects.all().order_by('-date_joined')
-    return render(request, "admin_panel/customers.html", {"customers": customers})
+    search_query = request.GET.get('q', '')
+    customers, next_cursor = get_customer_page(search_query, request.GET.get('cursor'))
+    return render(request, "admin_panel/customers.html", {
+        "customers": customers,
+        "next_cursor": next_cursor,
+        "search_query": search_query,
+    })
 
 
 def admin_orders(request):
-    # Get filter parameters
-    status_filter = request.GET.get('status', '')
+    # Get filter parameters (shared with the order export)
+    filters = parse_order_filters(request.GET)
     search_query = request.GET.get('search', '')
 
-    # Base queryset - use users.Order model
-    orders = Order.objects.all().select_related('user').prefetch_related('items')
-
-    # Apply status filter
-    if status_filter:
-        orders = orders.filter(status=status_filter)
-
-    # Apply search filter
-    if search_query:
-        orders = orders.filter(
-            Q(order_number__icontains=search_query) |
-            Q(user__username__icontains=search_query) |
-            Q(user__email__icontains=search_query) |
-            Q(items__product_name__icontains=search_query)
-        ).distinct()
-
-    # Order by most recent first
-    orders = orders.order_by('-order_date')
+    # One query per page against the denormalized search index (hot and archived orders)
+    orders, next_cursor = search_orders(
+        search_query, filters['status'], request.GET.get('cursor'), date_range=order_date_range(filters),
+    )
 
     context = {
         'orders': orders,
+        'next_cursor': next_cursor,
         'status_choices': Order.STATUS_CHOICES,
-        'selected_status': status_filter,
+        'selected_status': filters['status'],
+        'date_from': request.GET.get('date_from', '') if filters['date_from'] else '',
+        'date_to': request.GET.get('date_to', '') if filters['date_to'] else '',
         'search_query': search_query,
     }
     return render(request, 'admin_panel/orders.html', context)
 
 
+def admin_export(request, dataset):
+    if 'admin_email' not in request.session:
+        return redirect('admin_login')
+    if dataset not in DATASETS:
+        raise Http404("Unknown export")
+
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        fmt = 'csv'
+    compress = request.GET.get('gzip') == '1'
+
+    response = StreamingHttpResponse(
+        stream_export(dataset, fmt, parse_order_filters(request.GET), compress),
+        content_type='application/gzip' if compress else FORMATS[fmt][0],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(dataset, fmt, compress)}"'
+    return response
+
+
+IMPORT_ERROR_PREVIEW = 50
+
+
+def admin_import_products(request):
+    if 'admin_email' not in request.session:
+        return redirect('admin_login')
+
+    context = {}
+    if request.method == "POST":
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, "Choose a CSV or JSONL file to import.")
+            return redirect('admin_import_products')
+
+        fmt = 'jsonl' if upload.name.endswith(('.jsonl', '.ndjson')) else 'csv'
+        errors = io.StringIO()
+        # Uploaded feeds may only reference images already staged on the server
+        report = import_products(upload.file, fmt, getattr(settings, 'PRODUCT_IMPORT_IMAGE_ROOT', None), errors=errors)
+        rows = list(csv.reader(io.StringIO(errors.getvalue())))[1:]
+        context = {'report': report, 'errors': rows[:IMPORT_ERROR_PREVIEW], 'more_errors': len(rows) > IMPORT_ERROR_PREVIEW}
+
+    return render(request, 'admin_panel/import_products.html', context)
+
+
 def admin_products(request):
     if 'admin_email' not in request.session:
         return redirect('admin_login')
 
     products = Product.objects.all().order_by('-id')
-    return render(request, 'admin_panel/products.html', {'products': products})
+    return render(request, 'admin_panel/products.html', {
+        'products': products,
+        'bulk_actions': ACTIONS.items(),
+        'category_choices': Product.CATEGORY_CHOICES,
+    })
+
+
+@require_POST
+def admin_bulk_products(request):
+    if 'admin_email' not in request.session:
+        return redirect('admin_login')
+
+    action = request.POST.get('action')
+    try:
+        value = parse_value(action, request.POST.get('value'))
+    except BulkActionError as e:
+        messages.error(request, str(e))
+        return redirect('admin_products')
+
+    # Either the ticked rows or every product in a category, so thousands of SKUs are one request
+    scope_category = request.POST.get('scope_category')
+    if scope_category:
+        queryset = Product.objects.filter(category=scope_category)
+    else:
+        ids = [int(pk) for pk in request.POST.getlist('product_ids') if pk.isdigit()]
+        if not ids:
+            messages.error(request, "Select at least one product.")
+            return redirect('admin_products')
+        queryset = Product.objects.filter(id__in=ids)
+
+    try:
+        affected = apply_bulk_action(action, queryset, value)
+    except BulkActionError as e:
+        messages.error(request, str(e))
+        return redirect('admin_products')
+    messages.success(request, f"{ACTIONS[action]}: {affected} product(s) affected.")
+    return redirect('admin_products')
 
 
 def add_product(request):
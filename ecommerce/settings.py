@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -70,6 +72,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'users.context_processors.header_counts',
             ],
         },
     },
@@ -79,23 +82,148 @@ WSGI_APPLICATION = 'ecommerce.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# DB_ENGINE picks the profile: sqlite (default; local runs and the test suite), mysql or
+# postgresql. Connections are kept for DB_CONN_MAX_AGE seconds and health-checked before
+# reuse. DB_POOL=1 (postgresql only, needs psycopg[pool]) replaces them with a pool of
+# DB_POOL_MIN..DB_POOL_MAX connections shared by the process, which suits ASGI workers.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+DB_POOL = os.environ.get('DB_POOL') == '1'
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Writers wait for the lock instead of failing with "database is locked"
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # A file, not :memory:, so threaded tests (ConcurrentCartTests) get real locking
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+    if os.environ.get('DB_NAME'):
+        # WAL lets readers run alongside the writer. The mode is stored in the file itself, so
+        # it is only switched on when DB_NAME points at a deployment database, leaving the
+        # tracked db.sqlite3 (and the default test run) untouched.
+        DATABASES['default']['OPTIONS']['init_command'] = 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL'
+elif DB_ENGINE == 'mysql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': os.environ.get('DB_NAME', 'ecommerce_db'),
+            'USER': os.environ.get('DB_USER', 'root'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '3306'),
+            'OPTIONS': {
+                'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+                'charset': 'utf8mb4',
+            },
+        }
+    }
+elif DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'ecommerce_db'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+                    'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+                    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                },
+            } if DB_POOL else {},
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unknown DB_ENGINE {DB_ENGINE!r}: use sqlite, mysql or postgresql")
+
+if DB_POOL and DB_ENGINE != 'postgresql':
+    raise ImproperlyConfigured("DB_POOL=1 needs DB_ENGINE=postgresql")
+
+DATABASES['default'].update(
+    # A pooled connection goes back to the pool after each request instead of persisting
+    CONN_MAX_AGE=0 if DB_POOL else DB_CONN_MAX_AGE,
+    CONN_HEALTH_CHECKS=True,
+)
 
-DATABASES = {
+
+# Cache
+# LocMem works for a single process and the test suite; point CACHE_BACKEND at a
+# shared backend (Redis / Memcached) in production so invalidations reach every worker.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'ecommerce_db',
-        'USER': 'root',
-        'PASSWORD': 'Sangeetha7397105845',
-        'HOST': 'localhost',
-        'PORT': '3306',
-        'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-            'charset': 'utf8mb4',
-        },
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'ecommerce'),
+        'TIMEOUT': 300,
     }
 }
 
 
+# Order numbers
+# Every process that places orders needs a unique worker id (0-1023): ORDER_WORKER_ID is the
+# host's base id and each server process adds its ORDER_WORKER_INDEX, e.g. a gunicorn
+# pre_fork hook handing out the free slot 0..workers-1 and post_fork exporting it. Give each
+# host a non-overlapping range. Unset outside DEBUG, placing an order raises instead of
+# risking duplicate numbers.
+
+ORDER_WORKER_ID = int(os.environ['ORDER_WORKER_ID']) if os.environ.get('ORDER_WORKER_ID') else (0 if DEBUG else None)
+
+
+# Authentication
+# Shoppers sign in with their email (one lookup on the auth_user_email_key index);
+# ModelBackend keeps username logins working for staff and createsuperuser.
+
+AUTHENTICATION_BACKENDS = [
+    'users.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
+# Password hashing
+# PASSWORD_HASHER_PROFILE picks the hasher for new hashes (pbkdf2, scrypt or argon2,
+# the last needs argon2-cffi); the others stay listed so existing hashes verify and are
+# re-encoded on the next login. Parameters come from `manage.py calibrate_password_hashers`.
+
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'pbkdf2')
+PASSWORD_HASHER_PROFILES = {
+    'pbkdf2': 'users.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'users.hashers.TunedScryptPasswordHasher',
+    'argon2': 'users.hashers.TunedArgon2PasswordHasher',
+}
+if PASSWORD_HASHER_PROFILE not in PASSWORD_HASHER_PROFILES:
+    raise ImproperlyConfigured(
+        f"Unknown PASSWORD_HASHER_PROFILE {PASSWORD_HASHER_PROFILE!r}: use {', '.join(PASSWORD_HASHER_PROFILES)}"
+    )
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE],
+    *[path for name, path in PASSWORD_HASHER_PROFILES.items() if name != PASSWORD_HASHER_PROFILE],
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_HASHER_PARAMS = {
+    name: int(os.environ[f'PASSWORD_{name.upper()}'])
+    for name in (
+        'pbkdf2_iterations',
+        'scrypt_work_factor', 'scrypt_block_size', 'scrypt_parallelism',
+        'argon2_time_cost', 'argon2_memory_cost', 'argon2_parallelism',
+    )
+    if os.environ.get(f'PASSWORD_{name.upper()}')
+}
+# Concurrent hashes per process (default: CPU count) and how long a login waits for a slot
+PASSWORD_HASH_WORKERS = int(os.environ['PASSWORD_HASH_WORKERS']) if os.environ.get('PASSWORD_HASH_WORKERS') else None
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,79 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, ArchivedShippingAddress, Order, OrderItem, OrderSearchEntry,
+    ShippingAddress,
+)
+
+
+ARCHIVE_STATUSES = ('delivered', 'cancelled', 'refunded')
+ARCHIVE_AFTER_DAYS = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 180)
+ARCHIVE_BATCH_SIZE = 500
+
+# Hot model -> archive model; archive rows keep the hot ids
+ARCHIVE_MODELS = [
+    (Order, ArchivedOrder),
+    (OrderItem, ArchivedOrderItem),
+    (ShippingAddress, ArchivedShippingAddress),
+]
+
+
+def _copy(instance, model):
+    return model(**{field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields})
+
+
+def archive_batch(cutoff, statuses=ARCHIVE_STATUSES, batch_size=ARCHIVE_BATCH_SIZE):
+    # Copy + delete in one transaction: a crash leaves the batch either hot or archived, never both
+    with transaction.atomic():
+        orders = list(
+            Order.objects.select_for_update(skip_locked=True)
+            .filter(status__in=statuses, order_date__lt=cutoff)
+            .order_by('order_date', 'id')[:batch_size]
+        )
+        if not orders:
+            return 0
+        order_ids = [order.id for order in orders]
+
+        rows = {
+            Order: orders,
+            OrderItem: list(OrderItem.objects.filter(order_id__in=order_ids)),
+            ShippingAddress: list(ShippingAddress.objects.filter(order_id__in=order_ids)),
+        }
+        for hot_model, archive_model in ARCHIVE_MODELS:
+            # ignore_conflicts: rows left behind by an interrupted manual run are not duplicated
+            archive_model.objects.bulk_create(
+                [_copy(row, archive_model) for row in rows[hot_model]], ignore_conflicts=True,
+            )
+
+        OrderSearchEntry.objects.filter(order_id__in=order_ids).update(archived=True)
+
+        # Children first so the order delete does not need to collect them
+        OrderItem.objects.filter(order_id__in=order_ids).delete()
+        ShippingAddress.objects.filter(order_id__in=order_ids).delete()
+        Order.objects.filter(id__in=order_ids).delete()
+    return len(orders)
+
+
+def archive_orders(older_than_days=ARCHIVE_AFTER_DAYS, statuses=ARCHIVE_STATUSES, batch_size=ARCHIVE_BATCH_SIZE,
+                   max_batches=None, pause=0, progress=None):
+    # Every batch commits on its own, so an interrupted run simply resumes where it stopped
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    archived = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(cutoff, statuses, batch_size)
+        if not moved:
+            break
+        archived += moved
+        batches += 1
+        if progress:
+            progress(archived)
+        if moved < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return archived
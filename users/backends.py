@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+from django.db.models import CharField, Func
+
+from .hashers import arun_bounded, run_bounded, verify
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+class EmailKey(Func):
+    # Rendered without parameters so it is the exact expression of the
+    # auth_user_email_key unique index (users 0010) and the planner uses it
+    template = "NULLIF(LOWER(%(expressions)s), '')"
+    output_field = CharField()
+
+
+def users_by_email(email):
+    return get_user_model()._default_manager.alias(email_key=EmailKey('email')).filter(
+        email_key=normalize_email(email)
+    )
+
+
+def email_taken(email):
+    return users_by_email(email).exists()
+
+
+class EmailBackend(ModelBackend):
+    # authenticate(request, email=..., password=...): one indexed lookup, no second fetch by username.
+    # Username logins (createsuperuser, Django admin) fall through to ModelBackend.
+    # Hashing runs in the bounded pool (users.hashers) and may raise HashingBusy.
+
+    def _accept(self, user, valid, new_hash):
+        if not valid or not self.user_can_authenticate(user):
+            return None, False
+        if new_hash:
+            # Transparent upgrade to the current hasher profile / parameters
+            user.password = new_hash
+        return user, bool(new_hash)
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if not email or password is None:
+            return None
+        user = users_by_email(email).first()
+        if user is None:
+            # Same hashing cost as a wrong password so response times don't reveal accounts
+            run_bounded(make_password, password)
+            return None
+        user, upgraded = self._accept(user, *run_bounded(verify, password, user.password))
+        if upgraded:
+            user.save(update_fields=['password'])
+        return user
+
+    async def aauthenticate(self, request, email=None, password=None, **kwargs):
+        if not email or password is None:
+            return None
+        user = await users_by_email(email).afirst()
+        if user is None:
+            await arun_bounded(make_password, password)
+            return None
+        user, upgraded = self._accept(user, *await arun_bounded(verify, password, user.password))
+        if upgraded:
+            await user.asave(update_fields=['password'])
+        return user
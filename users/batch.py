@@ -0,0 +1,173 @@
+from functools import partial
+
+from django.db import connection, transaction
+
+from admin_panel.models import Product
+from .cart import add_quantities, load_cart
+from .counters import invalidate_counts, touch_state
+from .models import CartItem, Wishlist
+
+
+MAX_BATCH_SIZE = 200
+CART_MODES = ('add', 'set')
+WISHLIST_ACTIONS = ('add', 'remove')
+
+
+class BatchError(ValueError):
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+# =======================
+# Validation
+# =======================
+
+def _positive_int(value, minimum):
+    if isinstance(value, bool):
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number >= minimum else None
+
+
+def parse_batch(payload):
+    if not isinstance(payload, dict):
+        raise BatchError(["Body must be a JSON object."])
+
+    mode = payload.get('mode', 'add')
+    cart_ops = payload.get('cart') or []
+    wishlist_ops = payload.get('wishlist') or []
+    errors = []
+
+    if mode not in CART_MODES:
+        errors.append(f"mode must be one of {', '.join(CART_MODES)}.")
+    if not isinstance(cart_ops, list) or not isinstance(wishlist_ops, list):
+        raise BatchError(["cart and wishlist must be lists."])
+    if len(cart_ops) + len(wishlist_ops) > MAX_BATCH_SIZE:
+        raise BatchError([f"At most {MAX_BATCH_SIZE} operations per batch."])
+
+    # Later entries for the same product win
+    cart = {}
+    for index, op in enumerate(cart_ops):
+        op = op if isinstance(op, dict) else {}
+        product_id = _positive_int(op.get('product_id'), 1)
+        quantity = _positive_int(op.get('quantity', 1), 0 if mode == 'set' else 1)
+        if product_id is None or quantity is None:
+            errors.append(f"cart[{index}]: invalid product_id or quantity.")
+            continue
+        cart[product_id] = quantity
+
+    wishlist = {}
+    for index, op in enumerate(wishlist_ops):
+        op = op if isinstance(op, dict) else {}
+        product_id = _positive_int(op.get('product_id'), 1)
+        action = op.get('action', 'add')
+        if product_id is None or action not in WISHLIST_ACTIONS:
+            errors.append(f"wishlist[{index}]: invalid product_id or action.")
+            continue
+        wishlist[product_id] = action
+
+    if errors:
+        raise BatchError(errors)
+    return mode, cart, wishlist
+
+
+# =======================
+# Apply
+# =======================
+
+def _apply_cart(user, mode, cart):
+    if mode == 'add':
+        # Increments in the database, so lines added concurrently are summed rather than overwritten
+        add_quantities(user.id, cart)
+        return
+
+    existing = {
+        item.product_id: item
+        for item in CartItem.objects.select_for_update().filter(user=user, product_id__in=cart)
+    }
+
+    to_create, to_update, to_delete = [], [], []
+    for product_id, quantity in cart.items():
+        item = existing.get(product_id)
+        if item is None:
+            if quantity:
+                to_create.append(CartItem(user=user, product_id=product_id, quantity=quantity))
+        elif quantity == 0:
+            to_delete.append(item.id)
+        else:
+            item.quantity = quantity
+            to_update.append(item)
+
+    if to_create:
+        # A line created concurrently since the read above is set to the requested quantity, not duplicated
+        CartItem.objects.bulk_create(
+            to_create,
+            update_conflicts=True,
+            # MySQL infers the conflict target from the unique key and rejects an explicit one
+            unique_fields=['user', 'product'] if connection.features.supports_update_conflicts_with_target else None,
+            update_fields=['quantity'],
+        )
+    if to_update:
+        CartItem.objects.bulk_update(to_update, ['quantity'])
+    if to_delete:
+        CartItem.objects.filter(id__in=to_delete).delete()
+
+
+def _apply_wishlist(user, wishlist):
+    added = [product_id for product_id, action in wishlist.items() if action == 'add']
+    removed = [product_id for product_id, action in wishlist.items() if action == 'remove']
+    if added:
+        Wishlist.objects.bulk_create(
+            [Wishlist(user=user, product_id=product_id) for product_id in added],
+            ignore_conflicts=True,
+        )
+    if removed:
+        Wishlist.objects.filter(user=user, product_id__in=removed).delete()
+
+
+def apply_batch(user, payload):
+    mode, cart, wishlist = parse_batch(payload)
+
+    # One lookup validates every product id in the batch; the database, not the cache, so FKs hold
+    product_ids = set(cart) | set(wishlist)
+    unknown = sorted(product_ids - set(Product.objects.only('id').in_bulk(product_ids)))
+    if unknown:
+        raise BatchError([f"Unknown product ids: {', '.join(map(str, unknown))}."])
+
+    with transaction.atomic():
+        if cart:
+            _apply_cart(user, mode, cart)
+        if wishlist:
+            _apply_wishlist(user, wishlist)
+        # Bulk writes skip model signals: recount once instead of per row
+        transaction.on_commit(partial(invalidate_counts, user.id))
+        transaction.on_commit(partial(touch_state, user.id))
+
+    return batch_state(user)
+
+
+def batch_state(user):
+    lines, totals = load_cart(user)
+    wishlist_ids = list(Wishlist.objects.filter(user=user).values_list('product_id', flat=True))
+    return {
+        'cart': {
+            'items': [
+                {
+                    'id': line.id,
+                    'product_id': line.product_id,
+                    'quantity': line.quantity,
+                    'line_total': line.line_total,
+                }
+                for line in lines
+            ],
+            **totals,
+        },
+        'wishlist': {
+            'product_ids': wishlist_ids,
+            'count': len(wishlist_ids),
+        },
+    }
@@ -0,0 +1,193 @@
+from decimal import Decimal
+from functools import partial
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .counters import adjust_count, touch_state
+from .models import CartItem
+
+
+TAX_RATE = Decimal('0.18')
+SHIPPING_FLAT = Decimal('50.00')
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+
+# Same rule as CartItem.subtotal, evaluated by the database
+LINE_PRICE = Coalesce('price_at_added', 'product__price')
+LINE_TOTAL = ExpressionWrapper(
+    LINE_PRICE * F('quantity'),
+    output_field=DecimalField(max_digits=12, decimal_places=2),
+)
+
+
+# =======================
+# Cart totals
+# =======================
+
+def money(value):
+    # Some backends (SQLite) drop the scale of computed decimals
+    return Decimal(value or 0).quantize(CENT)
+
+
+def cart_lines(user):
+    return (
+        CartItem.objects.filter(user=user)
+        .select_related('product')
+        .annotate(unit_price=LINE_PRICE, line_total=LINE_TOTAL)
+        .order_by('added_at', 'id')
+    )
+
+
+def load_cart(user):
+    # One query: lines with their product and per-line totals; totals are summed from the rows
+    lines = list(cart_lines(user))
+    for line in lines:
+        line.unit_price = money(line.unit_price)
+        line.line_total = money(line.line_total)
+    totals = {
+        'subtotal': sum((line.line_total for line in lines), ZERO),
+        'item_count': sum(line.quantity for line in lines),
+        'line_count': len(lines),
+    }
+    return lines, totals
+
+
+def cart_totals(user, line_id=None):
+    # One aggregate query; optionally also returns one line's total for AJAX replies
+    aggregates = {
+        'subtotal': Sum(LINE_TOTAL),
+        'item_count': Sum('quantity'),
+        'line_count': Count('id'),
+    }
+    if line_id is not None:
+        aggregates['line_total'] = Sum(LINE_TOTAL, filter=Q(id=line_id))
+        aggregates['line_quantity'] = Sum('quantity', filter=Q(id=line_id))
+
+    totals = CartItem.objects.filter(user=user).aggregate(**aggregates)
+    totals['subtotal'] = money(totals['subtotal'])
+    totals['item_count'] = totals['item_count'] or 0
+    if line_id is not None:
+        totals['line_total'] = money(totals['line_total'])
+        totals['line_quantity'] = totals['line_quantity'] or 0
+    return totals
+
+
+def checkout_totals(subtotal):
+    tax = money(subtotal * TAX_RATE)
+    shipping = SHIPPING_FLAT if subtotal > 0 else ZERO
+    return {
+        'subtotal': subtotal,
+        'tax': tax,
+        'shipping': shipping,
+        'grand_total': subtotal + tax + shipping,
+    }
+
+
+# =======================
+# Atomic cart mutations
+# =======================
+
+UPSERT_SQL = {
+    'sqlite': (
+        "INSERT INTO users_cart (user_id, product_id, quantity, added_at, is_active) "
+        "VALUES {values} "
+        "ON CONFLICT (user_id, product_id) DO UPDATE SET quantity = users_cart.quantity + excluded.quantity "
+        "RETURNING quantity, product_id"
+    ),
+    'postgresql': (
+        "INSERT INTO users_cart (user_id, product_id, quantity, added_at, is_active) "
+        "VALUES {values} "
+        "ON CONFLICT (user_id, product_id) DO UPDATE SET quantity = users_cart.quantity + excluded.quantity "
+        "RETURNING quantity, product_id"
+    ),
+    'mysql': (
+        "INSERT INTO users_cart (user_id, product_id, quantity, added_at, is_active) "
+        "VALUES {values} "
+        "ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)"
+    ),
+}
+
+
+def cart_changed(user_id, delta_lines=0):
+    # Raw upserts and F() updates skip model signals, so mirror them here
+    if delta_lines:
+        transaction.on_commit(partial(adjust_count, 'cart', user_id, delta_lines))
+    transaction.on_commit(partial(touch_state, user_id))
+
+
+def _upsert(user_id, rows):
+    # Returns how many of the rows were new lines
+    now = timezone.now()
+    params = []
+    for product_id, quantity in rows:
+        params.extend([user_id, product_id, quantity, now, True])
+    sql = UPSERT_SQL[connection.vendor].format(values=', '.join(['(%s, %s, %s, %s, %s)'] * len(rows)))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        if connection.vendor == 'mysql':
+            # FOUND_ROWS semantics: 1 per inserted row, 2 per incremented row
+            return 2 * len(rows) - cursor.rowcount
+        # Existing lines always hold >= 1, so a result equal to the delta means a new row
+        requested = dict(rows)
+        return sum(1 for quantity, product_id in cursor.fetchall() if quantity == requested[product_id])
+
+
+def _update_or_create(user_id, product_id, quantity):
+    lines = CartItem.objects.filter(user_id=user_id, product_id=product_id)
+    if lines.update(quantity=F('quantity') + quantity):
+        return False
+    try:
+        with transaction.atomic():
+            CartItem.objects.bulk_create([CartItem(user_id=user_id, product_id=product_id, quantity=quantity)])
+        return True
+    except IntegrityError:
+        lines.update(quantity=F('quantity') + quantity)
+        return False
+
+
+def add_quantity(user_id, product_id, quantity=1):
+    # Single-statement upsert on the (user, product) unique key: no read-modify-write
+    if connection.vendor in UPSERT_SQL:
+        created = _upsert(user_id, [(product_id, quantity)]) == 1
+    else:
+        created = _update_or_create(user_id, product_id, quantity)
+    cart_changed(user_id, 1 if created else 0)
+    return created
+
+
+def add_quantities(user_id, quantities):
+    # Multi-row add_quantity for batches: one statement, rows in a fixed order so writers can't deadlock
+    rows = sorted(quantities.items())
+    if not rows:
+        return 0
+    if connection.vendor in UPSERT_SQL:
+        created = _upsert(user_id, rows)
+    else:
+        created = sum(_update_or_create(user_id, product_id, quantity) for product_id, quantity in rows)
+    cart_changed(user_id, created)
+    return created
+
+
+def change_quantity(user_id, item_id, delta):
+    # Returns 'updated', 'removed' or None when the line does not exist
+    lines = CartItem.objects.filter(id=item_id, user_id=user_id)
+    if delta >= 0:
+        if lines.update(quantity=F('quantity') + delta):
+            cart_changed(user_id)
+            return 'updated'
+        return None
+
+    # Decrement only while the result stays positive, otherwise drop the line
+    if lines.filter(quantity__gt=-delta).update(quantity=F('quantity') + delta):
+        cart_changed(user_id)
+        return 'updated'
+    if lines.filter(quantity__lte=-delta).delete()[0]:
+        return 'removed'
+    # Lost a race with a concurrent increment: the decrement now fits
+    if lines.filter(quantity__gt=-delta).update(quantity=F('quantity') + delta):
+        cart_changed(user_id)
+        return 'updated'
+    return None
@@ -0,0 +1,169 @@
+import base64
+import binascii
+import hashlib
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from admin_panel.models import Product
+from admin_panel.product_cache import catalog_version, get_products
+from admin_panel.search import SEARCH_RESULT_LIMIT, search_product_ids
+
+
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+PAGE_CACHE_TIMEOUT = 5 * 60
+CATEGORIES = {key for key, _ in Product.CATEGORY_CHOICES}
+
+
+# =======================
+# Cursor helpers
+# =======================
+
+def encode_cursor(created_at, product_id):
+    raw = f"{created_at.isoformat()}|{product_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, product_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(product_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return None
+
+
+# =======================
+# Filters
+# =======================
+
+def _parse_price(value):
+    try:
+        price = Decimal(value)
+    except (InvalidOperation, TypeError):
+        return None
+    return price if price >= 0 else None
+
+
+def parse_filters(params):
+    category = params.get('category', '')
+    return {
+        'category': category if category in CATEGORIES else '',
+        'min_price': _parse_price(params.get('min_price')),
+        'max_price': _parse_price(params.get('max_price')),
+        'in_stock': params.get('in_stock') in ('1', 'on', 'true'),
+    }
+
+
+def filter_products(queryset, filters):
+    if filters['category']:
+        queryset = queryset.filter(category=filters['category'])
+    if filters['min_price'] is not None:
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    if filters['max_price'] is not None:
+        queryset = queryset.filter(price__lte=filters['max_price'])
+    if filters['in_stock']:
+        queryset = queryset.filter(stock__gt=0)
+    return queryset
+
+
+def page_size_from(params):
+    try:
+        size = int(params.get('page_size', PAGE_SIZE))
+    except (TypeError, ValueError):
+        return PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+# =======================
+# Keyset pagination
+# =======================
+
+def get_product_page(params):
+    filters = parse_filters(params)
+    page_size = page_size_from(params)
+    query = params.get('query', '').strip()
+    cursor = params.get('cursor') or ''
+
+    # Page membership is cached per catalog version; rows come from the product cache
+    key_source = repr((query, sorted(filters.items()), page_size, cursor))
+    key = f"catalog_page:{catalog_version()}:{hashlib.md5(key_source.encode()).hexdigest()}"
+    cached = cache.get(key)
+    if cached is not None:
+        ids, next_cursor = cached
+        products = get_products(ids)
+        return [products[product_id] for product_id in ids if product_id in products], next_cursor, filters
+
+    if query:
+        products, next_cursor = _search_page(query, filters, page_size, cursor)
+    else:
+        products, next_cursor = _keyset_page(filters, page_size, cursor)
+
+    cache.set(key, ([product.id for product in products], next_cursor), PAGE_CACHE_TIMEOUT)
+    return products, next_cursor, filters
+
+
+def _keyset_page(filters, page_size, cursor):
+    # Each page is one index range scan on (created_at, id): no OFFSET, no COUNT
+    queryset = filter_products(Product.objects.all(), filters)
+
+    cursor = decode_cursor(cursor)
+    if cursor:
+        created_at, product_id = cursor
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=product_id)
+        )
+
+    # Only keys come from the scan; rows are served by the product cache
+    keys = list(queryset.order_by('-created_at', '-id').values_list('created_at', 'id')[:page_size + 1])
+    next_cursor = encode_cursor(*keys[page_size - 1]) if len(keys) > page_size else None
+    ids = [product_id for _, product_id in keys[:page_size]]
+    products = get_products(ids)
+    return [products[product_id] for product_id in ids if product_id in products], next_cursor
+
+
+def _search_page(query, filters, page_size, cursor):
+    # The cursor is a position in the full ranked result; the full-text query is paged
+    # in SEARCH_RESULT_LIMIT chunks until the filters have let page_size + 1 through
+    try:
+        position = max(0, int(cursor or 0))
+    except ValueError:
+        position = 0
+
+    filtered = filters != parse_filters({})
+    accepted = []
+    while len(accepted) <= page_size:
+        chunk = search_product_ids(query, position, SEARCH_RESULT_LIMIT)
+        if filtered and chunk:
+            matched = set(
+                filter_products(Product.objects.filter(id__in=chunk), filters).values_list('id', flat=True)
+            )
+        else:
+            matched = set(chunk)
+        accepted.extend((position + i, product_id) for i, product_id in enumerate(chunk) if product_id in matched)
+        if len(chunk) < SEARCH_RESULT_LIMIT:
+            break
+        position += len(chunk)
+
+    window = accepted[:page_size]
+    next_cursor = str(window[-1][0] + 1) if len(accepted) > page_size else None
+    products = get_products([product_id for _, product_id in window])
+    return [products[product_id] for _, product_id in window if product_id in products], next_cursor
+
+
+def product_to_dict(product, available=None):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': str(product.price),
+        'category': product.category,
+        'stock': product.stock,
+        'in_stock': product.in_stock,
+        'available': product.available if available is None else available,
+        'image_url': product.image.url if product.image else None,
+    }
@@ -0,0 +1,159 @@
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, Value, When
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+
+from admin_panel.models import Product
+from admin_panel.product_cache import invalidate_products
+from admin_panel.rollups import record_order
+from .cart import cart_lines, checkout_totals, money
+from .inventory import claim_holds, release_quantities
+from .models import CartItem, InventoryHold, Order, OrderItem, ShippingAddress
+from .order_numbers import new_order_number
+from .order_search import index_order
+from .tasks import enqueue_order_placed
+
+
+ADDRESS_FIELDS = [
+    'full_name', 'address_line1', 'address_line2', 'city', 'state', 'postal_code', 'country', 'phone',
+]
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class EmptyCart(CheckoutError):
+    pass
+
+
+class OutOfStock(CheckoutError):
+    def __init__(self, products):
+        self.products = products
+        names = ', '.join(product.name for product in products)
+        super().__init__(f"Not enough stock for: {names}")
+
+
+# =======================
+# Order placement
+# =======================
+
+def _locked_cart(user):
+    # Lock only the cart rows; product rows are guarded by the conditional stock UPDATE
+    lock_of = ('self',) if connection.features.has_select_for_update_of else ()
+    return list(cart_lines(user).select_for_update(of=lock_of))
+
+
+def _reserve_stock(lines, held):
+    # One UPDATE for every line: each row only matches when it still has enough stock
+    # once other shoppers' holds are kept aside; our own hold is consumed
+    wanted = {}
+    for line in lines:
+        wanted[line.product_id] = wanted.get(line.product_id, 0) + line.quantity
+
+    # stock + held >= reserved + quantity, written without subtraction so unsigned
+    # columns (MySQL) never go negative mid-expression
+    enough = Q()
+    for product_id, quantity in wanted.items():
+        enough |= Q(
+            GreaterThanOrEqual(F('stock') + held.get(product_id, 0), F('reserved') + quantity),
+            id=product_id,
+            stock__gte=quantity,
+        )
+
+    update = {
+        'stock': Case(
+            *[When(id=product_id, then=F('stock') - quantity) for product_id, quantity in wanted.items()],
+            default=F('stock'),
+            output_field=PositiveIntegerField(),
+        ),
+        'updated_at': timezone.now(),
+    }
+    consumed = {product_id: held[product_id] for product_id in wanted if held.get(product_id)}
+    if consumed:
+        update['reserved'] = Case(
+            *[
+                When(id=product_id, reserved__gte=quantity, then=F('reserved') - quantity)
+                for product_id, quantity in consumed.items()
+            ],
+            When(id__in=list(consumed), then=Value(0)),
+            default=F('reserved'),
+            output_field=PositiveIntegerField(),
+        )
+
+    updated = Product.objects.filter(enough).update(**update)
+    if updated != len(wanted):
+        short = [
+            line.product for line in lines
+            if line.product.stock + held.get(line.product_id, 0) < line.product.reserved + wanted[line.product_id]
+            or line.product.stock < wanted[line.product_id]
+        ]
+        raise OutOfStock(short or [line.product for line in lines])
+    return list(wanted)
+
+
+def place_order(user, address, payment_method):
+    with transaction.atomic():
+        lines = _locked_cart(user)
+        if not lines:
+            raise EmptyCart("Your cart is empty!")
+
+        for line in lines:
+            line.unit_price = money(line.unit_price)
+            line.line_total = money(line.line_total)
+        totals = checkout_totals(sum((line.line_total for line in lines), money(0)))
+
+        held, hold_ids = claim_holds(user)
+        product_ids = _reserve_stock(lines, held)
+
+        # Holds on products that left the cart go back to the pool
+        release_quantities({
+            product_id: quantity for product_id, quantity in held.items() if product_id not in product_ids
+        })
+        if hold_ids:
+            InventoryHold.objects.filter(id__in=hold_ids).delete()
+
+        order = Order.objects.create(
+            user=user,
+            order_number=new_order_number(),
+            subtotal=totals['subtotal'],
+            tax_amount=totals['tax'],
+            shipping_cost=totals['shipping'],
+            grand_total=totals['grand_total'],
+            payment_method=payment_method,
+            status='pending',
+            payment_status='pending',
+        )
+        ShippingAddress.objects.create(
+            user=user,
+            order=order,
+            **{field: address.get(field) for field in ADDRESS_FIELDS},
+        )
+        items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product_id=line.product_id,
+                product_name=line.product.name,
+                quantity=line.quantity,
+                unit_price=line.unit_price,
+                total_price=line.line_total,
+                image_url=line.product.image.url if line.product.image else None,
+            )
+            for line in lines
+        ])
+        CartItem.objects.filter(id__in=[line.id for line in lines]).delete()
+        index_order(order, user, items)
+        record_order(
+            order.order_date,
+            order.grand_total,
+            [(line.product.category, line.quantity, line.line_total) for line in lines],
+        )
+
+        # Stock moved through UPDATE, which skips the Product signals
+        transaction.on_commit(partial(invalidate_products, product_ids))
+        # Confirmation email and analytics run in the task workers, not in the request
+        enqueue_order_placed(order)
+
+    return order
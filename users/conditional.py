@@ -0,0 +1,45 @@
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .counters import get_state_version
+
+
+# =======================
+# Conditional GET for catalog pages
+# =======================
+
+def page_validators(request, products):
+    # The page depends on the products shown, the user's cart/wishlist and the CSRF secret baked into forms
+    get_token(request)  # makes sure the CSRF secret exists before it is hashed
+    state_version = get_state_version(request.user.id)
+    stamps = [product.updated_at.timestamp() for product in products]
+    last_modified = int(max(stamps + [state_version]))
+
+    source = '|'.join([
+        str(request.user.id),
+        repr(state_version),
+        request.META.get('CSRF_COOKIE', ''),
+        ','.join(f"{product.id}:{stamp!r}" for product, stamp in zip(products, stamps)),
+    ])
+    etag = quote_etag(hashlib.md5(source.encode()).hexdigest())
+    return etag, last_modified
+
+
+def not_modified(request, etag, last_modified):
+    # Pending flash messages must be rendered, so never short-circuit then
+    if len(get_messages(request)):
+        return None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    # A 304 must repeat the validators and cache policy of the full response
+    return set_validators(response, etag, last_modified) if response is not None else None
+
+
+def set_validators(response, etag, last_modified):
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
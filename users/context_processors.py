@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
+from .counters import get_counts
+
+
+def header_counts(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    # Lazy so pages that never show the header pay nothing
+    return {'header_counts': SimpleLazyObject(lambda: get_counts(user.id))}
@@ -0,0 +1,65 @@
+import time
+
+from django.core.cache import cache
+
+from .models import CartItem, Wishlist
+
+
+COUNTER_TIMEOUT = 60 * 60
+COUNTED_MODELS = {
+    'cart': CartItem,
+    'wishlist': Wishlist,
+}
+
+
+def _key(kind, user_id):
+    return f"user_counts:{kind}:{user_id}"
+
+
+def get_counts(user_id):
+    keys = {kind: _key(kind, user_id) for kind in COUNTED_MODELS}
+    cached = cache.get_many(keys.values())
+
+    counts = {}
+    for kind, key in keys.items():
+        if key in cached:
+            counts[kind] = cached[key]
+        else:
+            counts[kind] = COUNTED_MODELS[kind].objects.filter(user_id=user_id).count()
+            # add, not set: a counter filled (and maybe adjusted) since our COUNT wins
+            if not cache.add(key, counts[kind], COUNTER_TIMEOUT):
+                counts[kind] = cache.get(key, counts[kind])
+    return counts
+
+
+def get_count(kind, user_id):
+    return get_counts(user_id)[kind]
+
+
+def adjust_count(kind, user_id, delta):
+    # Only adjust warm counters; a cold key is recomputed on next read
+    try:
+        cache.incr(_key(kind, user_id), delta)
+    except ValueError:
+        pass
+
+
+def invalidate_counts(user_id, *kinds):
+    cache.delete_many([_key(kind, user_id) for kind in (kinds or COUNTED_MODELS)])
+
+
+# =======================
+# Cart / wishlist state version
+# =======================
+
+def _state_key(user_id):
+    return f"user_counts:state:{user_id}"
+
+
+def get_state_version(user_id):
+    # Timestamp of the last cart/wishlist change; a cold key starts "now" (safe side)
+    return cache.get_or_set(_state_key(user_id), time.time(), COUNTER_TIMEOUT)
+
+
+def touch_state(user_id):
+    cache.set(_state_key(user_id), time.time(), COUNTER_TIMEOUT)
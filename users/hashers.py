@@ -0,0 +1,94 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher, check_password, make_password,
+)
+
+
+# Filled from the environment in settings.py; run `manage.py calibrate_password_hashers` to pick values
+PARAMS = getattr(settings, 'PASSWORD_HASHER_PARAMS', {})
+HASH_WORKERS = getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+HASH_TIMEOUT = getattr(settings, 'PASSWORD_HASH_TIMEOUT', 10)
+# Only a cap for OpenSSL; hashes made under older, larger work factors must still verify
+SCRYPT_MAXMEM = 1024 ** 3
+
+
+class HashingBusy(Exception):
+    pass
+
+
+# =======================
+# Tuned hashers (same algorithm names: existing hashes verify, and are
+# re-encoded on the next login when the parameters or the profile change)
+# =======================
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = PARAMS.get('pbkdf2_iterations', PBKDF2PasswordHasher.iterations)
+
+    def must_update(self, encoded):
+        # Re-encode only to strengthen: a lower setting must not weaken stored hashes
+        return self.decode(encoded)['iterations'] < self.iterations
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    work_factor = PARAMS.get('scrypt_work_factor', ScryptPasswordHasher.work_factor)
+    block_size = PARAMS.get('scrypt_block_size', ScryptPasswordHasher.block_size)
+    parallelism = PARAMS.get('scrypt_parallelism', ScryptPasswordHasher.parallelism)
+    maxmem = SCRYPT_MAXMEM
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = PARAMS.get('argon2_time_cost', Argon2PasswordHasher.time_cost)
+    memory_cost = PARAMS.get('argon2_memory_cost', Argon2PasswordHasher.memory_cost)
+    parallelism = PARAMS.get('argon2_parallelism', Argon2PasswordHasher.parallelism)
+
+
+# =======================
+# Bounded hashing pool
+# =======================
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # At most HASH_WORKERS hashes run at once per process, so a burst of logins
+    # queues here instead of occupying every request thread
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='password-hash')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def verify(raw_password, encoded):
+    # Pure CPU, safe on a pool thread: (valid, upgraded hash or None).
+    # Saving the upgrade is left to the caller's thread and its DB connection.
+    outdated = []
+    valid = check_password(raw_password, encoded, setter=outdated.append)
+    return valid, make_password(raw_password) if outdated else None
+
+
+def run_bounded(func, *args):
+    future = get_executor().submit(func, *args)
+    try:
+        return future.result(timeout=HASH_TIMEOUT)
+    except FutureTimeout:
+        future.cancel()
+        raise HashingBusy()
+
+
+async def arun_bounded(func, *args):
+    # Awaits the pool, so slow hashes never block the event loop
+    future = get_executor().submit(func, *args)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), HASH_TIMEOUT)
+    except asyncio.TimeoutError:
+        future.cancel()
+        raise HashingBusy()
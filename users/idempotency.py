@@ -0,0 +1,97 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+FORM_FIELD = 'idempotency_key'
+MAX_KEY_LENGTH = 255
+TTL = getattr(settings, 'IDEMPOTENCY_TTL', 24 * 60 * 60)
+# A request still running after this long is assumed dead and its key released
+LOCK_TTL = 60
+# Larger bodies are not worth replaying byte for byte; the status and redirect are kept
+MAX_STORED_BODY = 16 * 1024
+REPLAYED_HEADERS = ('Content-Type', 'Location')
+IN_PROGRESS = 'in-progress'
+
+
+def _request_key(request):
+    return request.META.get(HEADER) or request.POST.get(FORM_FIELD)
+
+
+def _cache_key(request, key):
+    digest = hashlib.sha256(f"{request.user.pk}:{request.path}:{key}".encode()).hexdigest()
+    return f"idempotency:{digest}"
+
+
+def _request_fingerprint(request):
+    # Same key with a different body is a client bug, not a retry
+    body = hashlib.sha256(request.body).hexdigest()[:16]
+    return f"{request.method}:{request.path}:{body}"
+
+
+def _store(response, fingerprint):
+    stored = {
+        'fingerprint': fingerprint,
+        'status': response.status_code,
+        'headers': {name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)},
+    }
+    if len(response.content) <= MAX_STORED_BODY:
+        stored['body'] = response.content
+    return stored
+
+
+def _replay(stored):
+    response = HttpResponse(stored.get('body', b''), status=stored['status'])
+    for name, value in stored['headers'].items():
+        response[name] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    # Replays the first response for a repeated Idempotency-Key header / idempotency_key field
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'POST':
+            return view(request, *args, **kwargs)
+        # Read the raw body before request.POST consumes the stream
+        fingerprint = _request_fingerprint(request)
+        key = _request_key(request)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return JsonResponse({'error': 'Idempotency key is too long.'}, status=400)
+
+        cache_key = _cache_key(request, key)
+        # add() is atomic: exactly one request per key gets to run the view
+        if not cache.add(cache_key, IN_PROGRESS, LOCK_TTL):
+            stored = cache.get(cache_key)
+            if stored == IN_PROGRESS:
+                return JsonResponse({'error': 'A request with this idempotency key is in progress.'}, status=409)
+            if stored is not None:
+                if stored['fingerprint'] != fingerprint:
+                    return JsonResponse(
+                        {'error': 'Idempotency key was already used for a different request.'}, status=422,
+                    )
+                return _replay(stored)
+            # Expired between add() and get(): just run it
+            cache.add(cache_key, IN_PROGRESS, LOCK_TTL)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if response.status_code >= 500 or response.streaming:
+            # Failures must stay retryable
+            cache.delete(cache_key)
+        else:
+            cache.set(cache_key, _store(response, fingerprint), TTL)
+        return response
+
+    return wrapper
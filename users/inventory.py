@@ -0,0 +1,184 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, Value, When
+from django.utils import timezone
+
+from admin_panel.models import Product
+from .models import InventoryHold
+
+
+HOLD_TTL = timedelta(seconds=getattr(settings, 'INVENTORY_HOLD_TTL', 15 * 60))
+SWEEP_BATCH_SIZE = 500
+
+
+class ReservationFailed(Exception):
+    pass
+
+
+# =======================
+# Reserved counters (conditional UPDATEs, no row locks on products)
+# =======================
+
+def _reserve_all(quantities):
+    # One statement for every product; each row only matches if it can cover its quantity
+    enough = Q()
+    for product_id, quantity in quantities.items():
+        enough |= Q(id=product_id, stock__gte=F('reserved') + quantity)
+
+    with transaction.atomic():
+        updated = Product.objects.filter(enough).update(reserved=Case(
+            *[When(id=product_id, then=F('reserved') + quantity) for product_id, quantity in quantities.items()],
+            default=F('reserved'),
+            output_field=PositiveIntegerField(),
+        ))
+        if updated != len(quantities):
+            raise ReservationFailed()
+
+
+def _reserve_one(product_id, quantity):
+    return Product.objects.filter(id=product_id, stock__gte=F('reserved') + quantity).update(
+        reserved=F('reserved') + quantity
+    ) == 1
+
+
+def release_quantities(quantities):
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity}
+    if not quantities:
+        return
+    Product.objects.filter(id__in=quantities).update(reserved=Case(
+        *[
+            When(id=product_id, reserved__gte=quantity, then=F('reserved') - quantity)
+            for product_id, quantity in quantities.items()
+        ],
+        # Never underflow the unsigned column if counters drifted
+        default=Value(0),
+        output_field=PositiveIntegerField(),
+    ))
+
+
+def reserve_quantities(quantities):
+    # Returns the product ids that could not be (fully) reserved
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity}
+    if not quantities:
+        return []
+    try:
+        _reserve_all(quantities)
+        return []
+    except ReservationFailed:
+        # Rare path (something is short): fall back to one statement per product
+        return [product_id for product_id, quantity in quantities.items() if not _reserve_one(product_id, quantity)]
+
+
+def available_to_sell(product_ids):
+    # Plain read: no locks, safe to call from catalog pages
+    return dict(
+        Product.objects.filter(id__in=product_ids)
+        .annotate(available=Case(
+            When(stock__gt=F('reserved'), then=F('stock') - F('reserved')),
+            default=Value(0),
+            output_field=PositiveIntegerField(),
+        ))
+        .values_list('id', 'available')
+    )
+
+
+# =======================
+# Holds
+# =======================
+
+def hold_cart(user, lines):
+    # Reserve the cart for HOLD_TTL; returns product ids that could not be held in full
+    now = timezone.now()
+    expires_at = now + HOLD_TTL
+
+    wanted = {}
+    for line in lines:
+        wanted[line.product_id] = wanted.get(line.product_id, 0) + line.quantity
+
+    with transaction.atomic():
+        holds = {hold.product_id: hold for hold in InventoryHold.objects.select_for_update().filter(user=user)}
+
+        # An unswept expired hold is still counted in `reserved`, so it can be renewed as is
+        to_reserve = {}
+        to_release = {}
+        for product_id, quantity in wanted.items():
+            held = holds[product_id].quantity if product_id in holds else 0
+            if quantity > held:
+                to_reserve[product_id] = quantity - held
+            elif quantity < held:
+                to_release[product_id] = held - quantity
+        for product_id, hold in holds.items():
+            if product_id not in wanted:
+                to_release[product_id] = hold.quantity
+
+        short = reserve_quantities(to_reserve)
+        release_quantities(to_release)
+
+        to_create, to_update, to_delete = [], [], []
+        for product_id, quantity in wanted.items():
+            hold = holds.get(product_id)
+            if product_id in short:
+                quantity = hold.quantity if hold else 0
+            if hold is None:
+                if quantity:
+                    to_create.append(InventoryHold(
+                        user=user, product_id=product_id, quantity=quantity, expires_at=expires_at,
+                    ))
+            elif quantity:
+                hold.quantity = quantity
+                hold.expires_at = expires_at
+                to_update.append(hold)
+            else:
+                to_delete.append(hold.id)
+        to_delete.extend(hold.id for product_id, hold in holds.items() if product_id not in wanted)
+
+        if to_create:
+            InventoryHold.objects.bulk_create(to_create)
+        if to_update:
+            InventoryHold.objects.bulk_update(to_update, ['quantity', 'expires_at'])
+        if to_delete:
+            InventoryHold.objects.filter(id__in=to_delete).delete()
+
+    return short
+
+
+def claim_holds(user):
+    # Called inside the order transaction: lock and return {product_id: quantity held}
+    holds = list(InventoryHold.objects.select_for_update().filter(user=user))
+    return {hold.product_id: hold.quantity for hold in holds}, [hold.id for hold in holds]
+
+
+def release_user_holds(user):
+    with transaction.atomic():
+        held, hold_ids = claim_holds(user)
+        release_quantities(held)
+        if hold_ids:
+            InventoryHold.objects.filter(id__in=hold_ids).delete()
+
+
+def sweep_expired_holds(batch_size=SWEEP_BATCH_SIZE, now=None):
+    # Releases expired holds in batches; concurrent sweepers skip each other's rows
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            holds = list(
+                InventoryHold.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lte=now)
+                .order_by('expires_at')[:batch_size]
+            )
+            if not holds:
+                break
+
+            quantities = {}
+            for hold in holds:
+                quantities[hold.product_id] = quantities.get(hold.product_id, 0) + hold.quantity
+            release_quantities(quantities)
+            InventoryHold.objects.filter(id__in=[hold.id for hold in holds]).delete()
+
+        released += len(holds)
+        if len(holds) < batch_size:
+            break
+    return released
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_STATUSES, archive_orders
+from users.models import Order
+
+
+class Command(BaseCommand):
+    help = "Move finished orders older than a cutoff into the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--statuses', default=','.join(ARCHIVE_STATUSES), help="Comma-separated order statuses")
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches")
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        statuses = [status.strip() for status in options['statuses'].split(',') if status.strip()]
+        known = {key for key, _ in Order.STATUS_CHOICES}
+        if not statuses or set(statuses) - known:
+            raise CommandError(f"--statuses must be a subset of: {', '.join(sorted(known))}")
+
+        archived = archive_orders(
+            older_than_days=options['older_than_days'],
+            statuses=statuses,
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            pause=options['pause'],
+            progress=lambda count: self.stdout.write(f"  {count} archived..."),
+        )
+        self.stdout.write(f"Archived {archived} order(s).")
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = "Measure per-request connection overhead with and without persistent connections"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--queries', type=int, default=3, help="Queries per simulated request")
+        parser.add_argument('--max-age', type=int, default=60, help="CONN_MAX_AGE for the persistent run")
+
+    def run(self, max_age, requests, queries):
+        # Same request_started / request_finished signals the handlers send, so
+        # close_old_connections() decides whether each request reconnects
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        connects = 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            request_started.send(sender=self.__class__)
+            if connection.connection is None:
+                connects += 1
+            with connection.cursor() as cursor:
+                for _ in range(queries):
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+            request_finished.send(sender=self.__class__)
+        return time.perf_counter() - started, connects
+
+    def handle(self, *args, **options):
+        requests, queries = options['requests'], options['queries']
+        configured = connection.settings_dict['CONN_MAX_AGE']
+        self.stdout.write(
+            f"{connection.vendor}: {requests} requests x {queries} queries, "
+            f"configured CONN_MAX_AGE={configured}, health checks={connection.settings_dict['CONN_HEALTH_CHECKS']}"
+        )
+        try:
+            results = {}
+            for label, max_age in (('per-request connections', 0), ('persistent connections', options['max_age'])):
+                elapsed, connects = self.run(max_age, requests, queries)
+                results[label] = elapsed
+                self.stdout.write(
+                    f"{label}: {elapsed / requests * 1000:.3f} ms/request, {connects} connects, "
+                    f"{requests / elapsed:,.0f} requests/s"
+                )
+            saved = (results['per-request connections'] - results['persistent connections']) / requests
+            self.stdout.write(f"connect overhead: {saved * 1000:.3f} ms/request")
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = configured
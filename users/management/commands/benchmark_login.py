@@ -0,0 +1,83 @@
+import random
+import time
+
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.backends import users_by_email
+
+
+EMAIL_DOMAIN = 'bench.invalid'
+PASSWORD = 'bench-password'
+SEED_BATCH_SIZE = 5000
+
+
+def bench_email(n):
+    return f"bench{n}@{EMAIL_DOMAIN}"
+
+
+class Command(BaseCommand):
+    help = "Measure email login throughput: legacy email scan + username authenticate vs EmailBackend"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000, help="Synthetic accounts to have in auth_user")
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument(
+            '--keep', action='store_true',
+            help="Leave the synthetic accounts in place for the next run (deleted by default)",
+        )
+
+    def seed(self, wanted):
+        User = get_user_model()
+        existing = User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").count()
+        # One hash for every account: seeding 1M users must not pay 1M hashes
+        password = make_password(PASSWORD)
+        for start in range(existing, wanted, SEED_BATCH_SIZE):
+            User.objects.bulk_create([
+                User(username=f"bench{n}", email=bench_email(n), password=password)
+                for n in range(start, min(start + SEED_BATCH_SIZE, wanted))
+            ])
+        if wanted > existing:
+            self.stdout.write(f"Seeded {wanted - existing} users.")
+
+    def measure(self, label, login, emails):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for email in emails:
+                assert login(email) is not None
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label}: {len(emails) / elapsed:,.1f} logins/s, {elapsed / len(emails) * 1000:.2f} ms/login, "
+            f"{len(queries) / len(emails):.1f} queries/login"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.run(options)
+        finally:
+            # Even an interrupted run must not leave the synthetic accounts in a real database
+            if not options['keep']:
+                deleted, _ = get_user_model().objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").delete()
+                self.stdout.write(f"Deleted {deleted} rows.")
+
+    def run(self, options):
+        self.seed(options['users'])
+        User = get_user_model()
+        emails = [bench_email(random.randrange(options['users'])) for _ in range(options['logins'])]
+
+        def legacy(email):
+            user = User.objects.get(email=email)
+            return ModelBackend().authenticate(None, username=user.username, password=PASSWORD)
+
+        def email_backend(email):
+            return authenticate(None, email=email.upper(), password=PASSWORD)
+
+        # Lookups alone show the index; full logins are bounded by the password hasher
+        self.measure("legacy lookup", lambda email: User.objects.get(email=email), emails)
+        self.measure("email key lookup", lambda email: users_by_email(email).first(), emails)
+        self.measure("legacy login", legacy, emails)
+        self.measure("EmailBackend login", email_backend, emails)
@@ -0,0 +1,43 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.order_numbers import MAX_WORKER_ID, SnowflakeGenerator, generate_batch
+
+
+class Command(BaseCommand):
+    help = "Measure order number throughput and check uniqueness across processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200000, help="Ids per process")
+        parser.add_argument('--processes', type=int, default=4)
+
+    def handle(self, *args, **options):
+        count, processes = options['count'], options['processes']
+        if not 1 <= processes <= MAX_WORKER_ID + 1:
+            raise CommandError(f"--processes must be between 1 and {MAX_WORKER_ID + 1}")
+
+        generator = SnowflakeGenerator(0)
+        started = time.perf_counter()
+        for _ in range(count):
+            generator.next_id()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"single process: {count} ids in {elapsed:.3f}s ({count / elapsed:,.0f} ids/s, "
+            f"{elapsed / count * 1e9:.0f} ns/id)"
+        )
+
+        started = time.perf_counter()
+        with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+            batches = list(pool.map(generate_batch, range(processes), [count] * processes))
+        elapsed = time.perf_counter() - started
+        ids = [snowflake for batch in batches for snowflake in batch]
+        duplicates = len(ids) - len(set(ids))
+        self.stdout.write(
+            f"{processes} processes: {len(ids)} ids in {elapsed:.3f}s (incl. pool start-up), "
+            f"duplicates={duplicates}"
+        )
+        if duplicates:
+            raise CommandError("Duplicate order numbers generated")
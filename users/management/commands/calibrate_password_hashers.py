@@ -0,0 +1,92 @@
+import os
+import statistics
+import time
+
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher
+from django.core.management.base import BaseCommand, CommandError
+
+from users.hashers import TunedArgon2PasswordHasher, TunedPBKDF2PasswordHasher, TunedScryptPasswordHasher
+
+
+PASSWORD = 'calibration-password'
+# Never recommend less work than Django's own defaults: the tuned hashers keep the
+# algorithm names, so a weaker setting would re-encode existing hashes downwards
+MAX_DOUBLINGS = 12
+
+
+def hash_ms(hasher, samples):
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.encode(PASSWORD, hasher.salt())
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = "Time the password hashers on this host and print parameters that hit a target hash time"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=100.0, help="Wanted time for one hash on one core")
+        parser.add_argument('--profile', choices=['all', 'pbkdf2', 'scrypt', 'argon2'], default='all')
+        parser.add_argument('--samples', type=int, default=3)
+        parser.add_argument('--argon2-memory-kib', type=int, default=TunedArgon2PasswordHasher.memory_cost)
+
+    def handle(self, *args, **options):
+        target, samples = options['target_ms'], options['samples']
+        if target <= 0 or samples < 1:
+            raise CommandError("--target-ms and --samples must be positive")
+        profiles = ['pbkdf2', 'scrypt', 'argon2'] if options['profile'] == 'all' else [options['profile']]
+        self.stdout.write(f"Target {target:.0f} ms per hash, {os.cpu_count()} CPUs.\n")
+        for profile in profiles:
+            result = getattr(self, f'calibrate_{profile}')(target, samples, options)
+            if result is None:
+                continue
+            env, elapsed = result
+            self.stdout.write(f"{profile}: {elapsed:.1f} ms/hash, ~{1000 / elapsed:,.1f} logins/s per core")
+            self.stdout.write(f"  PASSWORD_HASHER_PROFILE={profile}")
+            for name, value in env.items():
+                self.stdout.write(f"  PASSWORD_{name.upper()}={value}")
+
+    def calibrate_pbkdf2(self, target, samples, options):
+        # Cost is linear in iterations: scale from one measurement, then re-measure
+        hasher = TunedPBKDF2PasswordHasher()
+        hasher.iterations = 100_000
+        per_iteration = hash_ms(hasher, samples) / hasher.iterations
+        hasher.iterations = max(PBKDF2PasswordHasher.iterations, int(round(target / per_iteration, -3)))
+        return {'pbkdf2_iterations': hasher.iterations}, hash_ms(hasher, samples)
+
+    def calibrate_scrypt(self, target, samples, options):
+        # N must be a power of two: double it until one hash reaches the target
+        hasher = TunedScryptPasswordHasher()
+        hasher.work_factor, hasher.parallelism = ScryptPasswordHasher.work_factor, 1
+        elapsed = hash_ms(hasher, samples)
+        for _ in range(MAX_DOUBLINGS):
+            if elapsed >= target:
+                break
+            hasher.work_factor *= 2
+            elapsed = hash_ms(hasher, samples)
+        return {
+            'scrypt_work_factor': hasher.work_factor,
+            'scrypt_block_size': hasher.block_size,
+            'scrypt_parallelism': hasher.parallelism,
+        }, elapsed
+
+    def calibrate_argon2(self, target, samples, options):
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            self.stdout.write("argon2: skipped, argon2-cffi is not installed")
+            return None
+        # Memory is fixed by the operator; passes are added until the target is reached
+        hasher = TunedArgon2PasswordHasher()
+        hasher.memory_cost, hasher.time_cost = options['argon2_memory_kib'], Argon2PasswordHasher.time_cost
+        elapsed = hash_ms(hasher, samples)
+        while elapsed < target and hasher.time_cost < 100:
+            hasher.time_cost += 1
+            elapsed = hash_ms(hasher, samples)
+        return {
+            'argon2_time_cost': hasher.time_cost,
+            'argon2_memory_cost': hasher.memory_cost,
+            'argon2_parallelism': hasher.parallelism,
+        }, elapsed
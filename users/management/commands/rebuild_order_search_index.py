@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from users.order_search import REBUILD_BATCH_SIZE, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Re-index every hot and archived order for the admin order search"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(
+            batch_size=options['batch_size'],
+            progress=lambda count: self.stdout.write(f"  {count} indexed..."),
+        )
+        self.stdout.write(f"Indexed {indexed} order(s).")
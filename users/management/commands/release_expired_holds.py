@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.inventory import SWEEP_BATCH_SIZE, sweep_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Release expired inventory holds back to available stock"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help="Keep sweeping until interrupted")
+        parser.add_argument('--interval', type=int, default=60, help="Seconds between sweeps with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            released = sweep_expired_holds(batch_size=options['batch_size'])
+            self.stdout.write(f"Released {released} expired hold(s).")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,43 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from users.tasks import run_worker
+
+
+class Command(BaseCommand):
+    help = "Run background task workers (order confirmations, analytics events, ...)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Worker threads")
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit")
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+
+        counts = []
+        kwargs = {
+            'batch_size': options['batch_size'],
+            'poll_interval': options['poll_interval'],
+            'once': options['once'],
+            'stop_event': stop_event,
+        }
+        threads = [
+            threading.Thread(target=lambda: counts.append(run_worker(**kwargs)), daemon=True)
+            for _ in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(f"Processed {sum(counts)} task(s).")
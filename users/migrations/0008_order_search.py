@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:01
+
+from django.db import migrations, models
+
+from users.order_search import POSTGRES_DOCUMENT, SQLITE_TRIGGERS
+
+
+# Full-text index over the denormalized document, as for product search: a FULLTEXT
+# index on MySQL, a GIN index on the tsvector on PostgreSQL, an FTS5 table kept in
+# sync by triggers on SQLite.
+FORWARD_SQL = {
+    'postgresql': [
+        f"CREATE INDEX order_search_gin ON users_order_search USING GIN ({POSTGRES_DOCUMENT})",
+    ],
+    'mysql': [
+        "ALTER TABLE users_order_search ADD FULLTEXT INDEX order_search_ft (document)",
+    ],
+    'sqlite': [
+        "CREATE VIRTUAL TABLE users_order_search_fts USING fts5(document, tokenize='unicode61')",
+        *SQLITE_TRIGGERS,
+    ],
+}
+
+REVERSE_SQL = {
+    'postgresql': [
+        "DROP INDEX IF EXISTS order_search_gin",
+    ],
+    'mysql': [
+        "ALTER TABLE users_order_search DROP INDEX order_search_ft",
+    ],
+    'sqlite': [
+        "DROP TRIGGER IF EXISTS users_order_search_fts_ai",
+        "DROP TRIGGER IF EXISTS users_order_search_fts_au",
+        "DROP TRIGGER IF EXISTS users_order_search_fts_ad",
+        "DROP TABLE IF EXISTS users_order_search_fts",
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    for statement in FORWARD_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in REVERSE_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_order_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSearchEntry',
+            fields=[
+                ('order_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('order_number', models.CharField(max_length=50)),
+                ('order_date', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], max_length=20)),
+                ('user_id', models.IntegerField()),
+                ('username', models.CharField(max_length=150)),
+                ('email', models.CharField(blank=True, max_length=254)),
+                ('grand_total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('items', models.JSONField(default=list)),
+                ('archived', models.BooleanField(default=False)),
+                ('document', models.TextField()),
+            ],
+            options={
+                'db_table': 'users_order_search',
+                'indexes': [models.Index(fields=['-order_date', '-order_id'], name='order_search_date_idx'), models.Index(fields=['status', '-order_date', '-order_id'], name='order_search_status_idx')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db import migrations
+
+
+# auth_user belongs to contrib.auth, so its extra indexes are plain SQL:
+# (date_joined, id) backs the admin customer directory's keyset pages and
+# LOWER(username) / LOWER(email) its case-insensitive prefix search.
+INDEXES = {
+    'auth_user_joined_id_idx': 'date_joined, id',
+    'auth_user_username_lower_idx': 'LOWER(username)',
+    'auth_user_email_lower_idx': 'LOWER(email)',
+}
+
+
+def _columns(columns, vendor):
+    if not columns.startswith('LOWER('):
+        return columns
+    if vendor == 'postgresql':
+        # text_pattern_ops lets LIKE 'prefix%' use the index whatever the database collation
+        return f"{columns} text_pattern_ops"
+    if vendor == 'mysql':
+        # Functional key parts go in their own parentheses
+        return f"({columns})"
+    return columns
+
+
+def create_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for name, columns in INDEXES.items():
+        schema_editor.execute(f"CREATE INDEX {name} ON auth_user ({_columns(columns, vendor)})")
+
+
+def drop_indexes(apps, schema_editor):
+    for name in INDEXES:
+        if schema_editor.connection.vendor == 'mysql':
+            schema_editor.execute(f"DROP INDEX {name} ON auth_user")
+        else:
+            schema_editor.execute(f"DROP INDEX {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_order_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        # SQLite rebuilds auth_user for auth's own ALTERs, which would drop these raw indexes
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
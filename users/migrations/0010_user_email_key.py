@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import migrations
+
+
+# Unique on the normalized email, written with the same expression as
+# users.backends.EmailKey. NULLIF leaves blank emails (e.g. createsuperuser
+# without one) out of the uniqueness check on every backend.
+INDEX_NAME = 'auth_user_email_key'
+INDEX_EXPRESSION = "NULLIF(LOWER(email), '')"
+
+
+def create_email_key(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {INDEX_EXPRESSION} FROM auth_user WHERE email <> '' "
+            f"GROUP BY {INDEX_EXPRESSION} HAVING COUNT(*) > 1"
+        )
+        duplicates = [row[0] for row in cursor.fetchall()]
+    if duplicates:
+        raise RuntimeError(
+            "Merge or rename accounts sharing an email before migrating: " + ', '.join(duplicates[:20])
+        )
+    # MySQL wants functional key parts in their own parentheses
+    expression = f"({INDEX_EXPRESSION})" if connection.vendor == 'mysql' else INDEX_EXPRESSION
+    schema_editor.execute(f"CREATE UNIQUE INDEX {INDEX_NAME} ON auth_user ({expression})")
+
+
+def drop_email_key(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(f"DROP INDEX {INDEX_NAME} ON auth_user")
+    else:
+        schema_editor.execute(f"DROP INDEX {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_customer_directory_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        # SQLite rebuilds auth_user for auth's own ALTERs, which would drop this raw index
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_email_key, drop_email_key),
+    ]
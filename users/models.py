@@ -71,6 +71,29 @@ class CartItem(models.Model):
 
 
 
+class InventoryHold(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='inventory_holds'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='holds'
+    )
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'users_inventory_hold'
+        unique_together = ('user', 'product')
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} held for {self.user_id}"
+
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -101,6 +124,14 @@ class Order(models.Model):
     transaction_id = models.CharField(max_length=100, blank=True, null=True)
     ip_address = models.GenericIPAddressField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Order history: one user's orders, newest first
+            models.Index(fields=['user', '-order_date', '-id'], name='order_user_date_idx'),
+            # Archival sweep: finished orders past the cutoff
+            models.Index(fields=['status', 'order_date'], name='order_status_date_idx'),
+        ]
+
     def __str__(self):
         return self.order_number
 
@@ -130,4 +161,123 @@ class ShippingAddress(models.Model):
     is_default = models.BooleanField(default=False)
 
     def __str__(self):
-        return f"{self.full_name} - {self.address_line1}"
\ No newline at end of file
+        return f"{self.full_name} - {self.address_line1}"
+
+
+
+# =======================
+# Order archive (cold storage, same columns and ids as the hot tables)
+# =======================
+
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders')
+    order_number = models.CharField(max_length=50, unique=True)
+    order_date = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    tax_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    shipping_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    grand_total = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_method = models.CharField(max_length=50, blank=True, null=True)
+    payment_status = models.CharField(max_length=20, choices=Order.PAYMENT_STATUS)
+    transaction_id = models.CharField(max_length=100, blank=True, null=True)
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'users_order_archive'
+        indexes = [
+            models.Index(fields=['user', '-order_date', '-id'], name='archive_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return self.order_number
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    product_id = models.IntegerField(blank=True, null=True)
+    product_name = models.CharField(max_length=255)
+    quantity = models.IntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    image_url = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta:
+        db_table = 'users_orderitem_archive'
+
+    def __str__(self):
+        return self.product_name
+
+
+class ArchivedShippingAddress(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='shipping_address')
+    full_name = models.CharField(max_length=100)
+    address_line1 = models.CharField(max_length=255)
+    address_line2 = models.CharField(max_length=255, blank=True, null=True)
+    city = models.CharField(max_length=100)
+    state = models.CharField(max_length=100)
+    postal_code = models.CharField(max_length=20)
+    country = models.CharField(max_length=100)
+    phone = models.CharField(max_length=20)
+    is_default = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'users_shippingaddress_archive'
+
+    def __str__(self):
+        return f"{self.full_name} - {self.address_line1}"
+
+class OrderSearchEntry(models.Model):
+    # Denormalized row per order (hot or archived) for the admin order list and search
+    order_id = models.BigIntegerField(primary_key=True)
+    order_number = models.CharField(max_length=50)
+    order_date = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    user_id = models.IntegerField()
+    username = models.CharField(max_length=150)
+    email = models.CharField(max_length=254, blank=True)
+    grand_total = models.DecimalField(max_digits=10, decimal_places=2)
+    items = models.JSONField(default=list)
+    archived = models.BooleanField(default=False)
+    document = models.TextField()
+
+    class Meta:
+        db_table = 'users_order_search'
+        indexes = [
+            models.Index(fields=['-order_date', '-order_id'], name='order_search_date_idx'),
+            models.Index(fields=['status', '-order_date', '-order_id'], name='order_search_status_idx'),
+        ]
+
+    def __str__(self):
+        return self.order_number
+
+class BackgroundTask(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField()
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'users_background_task'
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='task_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+# 64-bit ids: 41 bits of milliseconds since EPOCH_MS | 10 bits worker | 12 bits sequence
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+PREFIX = 'ORD-'
+# Zero-padded so string order matches numeric (and therefore time) order
+DIGITS = 19
+# Set per server process (e.g. by a gunicorn post_fork hook) and added to ORDER_WORKER_ID
+WORKER_INDEX_ENV = 'ORDER_WORKER_INDEX'
+
+
+class SnowflakeGenerator:
+    def __init__(self, worker_id, clock=None):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self.clock = clock or (lambda: time.time_ns() // 1_000_000)
+        self.last_ms = -1
+        self.sequence = 0
+        self.lock = threading.Lock()
+
+    def next_id(self):
+        with self.lock:
+            now_ms = self.clock() - EPOCH_MS
+            if now_ms > self.last_ms:
+                self.last_ms = now_ms
+                self.sequence = 0
+            elif self.sequence < MAX_SEQUENCE:
+                # Same millisecond, or the clock stepped back: keep counting on the last timestamp
+                self.sequence += 1
+            else:
+                # Sequence exhausted: borrow the next millisecond instead of spinning
+                self.last_ms += 1
+                self.sequence = 0
+            return (self.last_ms << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self.sequence
+
+
+def configured_worker_id():
+    # Host base id + this process's slot; guessing (hash of host/pid) would collide silently
+    base = getattr(settings, 'ORDER_WORKER_ID', None)
+    if base is None:
+        raise ImproperlyConfigured(
+            "ORDER_WORKER_ID is not set: every host placing orders needs its own base worker id"
+        )
+    try:
+        return base + int(os.environ.get(WORKER_INDEX_ENV, 0))
+    except ValueError:
+        raise ImproperlyConfigured(f"{WORKER_INDEX_ENV} must be an integer")
+
+
+_generator = None
+_generator_pid = None
+_generator_lock = threading.Lock()
+
+
+def get_generator():
+    global _generator, _generator_pid
+    with _generator_lock:
+        # A forked child must not continue its parent's sequence
+        if _generator is None or _generator_pid != os.getpid():
+            _generator = SnowflakeGenerator(configured_worker_id())
+            _generator_pid = os.getpid()
+        return _generator
+
+
+def format_order_number(snowflake):
+    return f"{PREFIX}{snowflake:0{DIGITS}d}"
+
+
+def new_order_number():
+    return format_order_number(get_generator().next_id())
+
+
+def order_number_timestamp(order_number):
+    snowflake = int(order_number[len(PREFIX):])
+    millis = (snowflake >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS
+    return datetime.fromtimestamp(millis / 1000, tz=dt_timezone.utc)
+
+
+def generate_batch(worker_id, count):
+    # Top-level so process pools (tests, benchmark) can pickle it
+    generator = SnowflakeGenerator(worker_id)
+    return [generator.next_id() for _ in range(count)]
+
+
+def generate_worker_batch(worker_index, count):
+    # Same, but through the configured id, as a server process with that slot would
+    os.environ[WORKER_INDEX_ENV] = str(worker_index)
+    return [get_generator().next_id() for _ in range(count)]
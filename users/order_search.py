@@ -0,0 +1,183 @@
+from django.db import NotSupportedError, connection
+from django.db.models import Prefetch, Q
+from django.db.models.expressions import RawSQL
+
+from admin_panel.search import tokenize
+from .catalog import decode_cursor, encode_cursor
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, Order, OrderItem, OrderSearchEntry,
+)
+
+
+ADMIN_PAGE_SIZE = 50
+REBUILD_BATCH_SIZE = 500
+
+# SQLite rebuilds users_order_search for most ALTERs and drops these triggers
+# with the old table, so migrations that change OrderSearchEntry must re-run them.
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS users_order_search_fts_ai AFTER INSERT ON users_order_search BEGIN "
+    "INSERT INTO users_order_search_fts(rowid, document) VALUES (new.order_id, new.document); END",
+    "CREATE TRIGGER IF NOT EXISTS users_order_search_fts_au AFTER UPDATE OF document ON users_order_search BEGIN "
+    "UPDATE users_order_search_fts SET document = new.document WHERE rowid = old.order_id; END",
+    "CREATE TRIGGER IF NOT EXISTS users_order_search_fts_ad AFTER DELETE ON users_order_search BEGIN "
+    "DELETE FROM users_order_search_fts WHERE rowid = old.order_id; END",
+]
+
+
+# PostgreSQL matches this expression through a GIN index on it (migration 0008)
+POSTGRES_DOCUMENT = "to_tsvector('simple', document)"
+
+
+def restore_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+# =======================
+# Building entries
+# =======================
+
+def _document(order, user, items):
+    # Order numbers are zero-padded; index the bare digits too so "364" finds ORD-000…364…
+    digits = order.order_number.rsplit('-', 1)[-1].lstrip('0')
+    parts = [order.order_number, digits, user.username, user.email or '']
+    parts.extend(item.product_name for item in items)
+    return ' '.join(part for part in parts if part)
+
+
+def build_entry(order, user, items, archived=False, entry_model=OrderSearchEntry):
+    return entry_model(
+        order_id=order.id,
+        order_number=order.order_number,
+        order_date=order.order_date,
+        status=order.status,
+        user_id=user.id,
+        username=user.username,
+        email=user.email or '',
+        grand_total=order.grand_total,
+        items=[
+            {'name': item.product_name, 'quantity': item.quantity, 'unit_price': str(item.unit_price)}
+            for item in items
+        ],
+        archived=archived,
+        document=_document(order, user, items),
+    )
+
+
+def save_entries(entries, entry_model=OrderSearchEntry):
+    # Upsert: re-indexing an order replaces its row
+    fields = [field.name for field in entry_model._meta.concrete_fields if not field.primary_key]
+    entry_model.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=['order_id'] if connection.features.supports_update_conflicts_with_target else None,
+        update_fields=fields,
+    )
+
+
+def index_order(order, user, items):
+    save_entries([build_entry(order, user, items)])
+
+
+def _models(apps=None):
+    # The backfill migration passes its historical app registry; everything else uses the live models
+    if apps is None:
+        return ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)), OrderSearchEntry
+    sources = tuple(
+        (apps.get_model('users', order), apps.get_model('users', item))
+        for order, item in (('Order', 'OrderItem'), ('ArchivedOrder', 'ArchivedOrderItem'))
+    )
+    return sources, apps.get_model('users', 'OrderSearchEntry')
+
+
+def rebuild_index(batch_size=REBUILD_BATCH_SIZE, progress=None, apps=None):
+    # Backfill / repair: re-index every hot and archived order, then drop orphans
+    sources, entry_model = _models(apps)
+    indexed = 0
+    seen = set()
+    for (order_model, item_model), archived in zip(sources, (False, True)):
+        last_id = 0
+        while True:
+            orders = list(
+                order_model.objects.filter(id__gt=last_id).order_by('id')
+                .select_related('user')
+                .prefetch_related(Prefetch('items', queryset=item_model.objects.order_by('id')))[:batch_size]
+            )
+            if not orders:
+                break
+            save_entries(
+                [build_entry(order, order.user, order.items.all(), archived, entry_model) for order in orders],
+                entry_model,
+            )
+            seen.update(order.id for order in orders)
+            last_id = orders[-1].id
+            indexed += len(orders)
+            if progress:
+                progress(indexed)
+
+    stale = set(entry_model.objects.values_list('order_id', flat=True)) - seen
+    for start in range(0, len(stale), batch_size):
+        entry_model.objects.filter(order_id__in=list(stale)[start:start + batch_size]).delete()
+    return indexed
+
+
+# =======================
+# Search
+# =======================
+
+def _sqlite_match(tokens):
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    return RawSQL("SELECT rowid FROM users_order_search_fts WHERE users_order_search_fts MATCH %s", [match])
+
+
+def _mysql_match(tokens):
+    against = ' '.join(f'+{token}*' for token in tokens)
+    return RawSQL(
+        "SELECT order_id FROM users_order_search WHERE MATCH(document) AGAINST (%s IN BOOLEAN MODE)", [against],
+    )
+
+
+def _postgres_match(tokens):
+    query = ' & '.join(f'{token}:*' for token in tokens)
+    return RawSQL(
+        f"SELECT order_id FROM users_order_search WHERE {POSTGRES_DOCUMENT} @@ to_tsquery('simple', %s)", [query],
+    )
+
+
+BACKENDS = {
+    'sqlite': _sqlite_match,
+    'mysql': _mysql_match,
+    'postgresql': _postgres_match,
+}
+
+
+def search_orders(query='', status='', cursor=None, page_size=ADMIN_PAGE_SIZE, date_range=(None, None)):
+    # One query per page: keyset on (order_date, order_id), optionally narrowed by status, dates and full-text
+    entries = OrderSearchEntry.objects.defer('document')
+    if status:
+        entries = entries.filter(status=status)
+    start, end = date_range
+    if start:
+        entries = entries.filter(order_date__gte=start)
+    if end:
+        entries = entries.filter(order_date__lt=end)
+
+    tokens = tokenize(query)
+    if tokens:
+        backend = BACKENDS.get(connection.vendor)
+        if backend is None:
+            raise NotSupportedError(f"Order search has no full-text backend for {connection.vendor}")
+        entries = entries.filter(order_id__in=backend(tokens))
+
+    cursor = decode_cursor(cursor)
+    if cursor:
+        order_date, order_id = cursor
+        entries = entries.filter(Q(order_date__lt=order_date) | Q(order_date=order_date, order_id__lt=order_id))
+
+    page = list(entries.order_by('-order_date', '-order_id')[:page_size + 1])
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = encode_cursor(page[-1].order_date, page[-1].order_id)
+    return page, next_cursor
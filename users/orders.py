@@ -0,0 +1,66 @@
+from django.db.models import Prefetch, Q
+
+from .catalog import decode_cursor, encode_cursor
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+
+ORDER_PAGE_SIZE = 10
+
+
+# =======================
+# Order history
+# =======================
+
+# Hot tables first; finished orders move to the archive tables after a while (see archive.py)
+ORDER_SOURCES = [
+    (Order, OrderItem),
+    (ArchivedOrder, ArchivedOrderItem),
+]
+
+
+def _with_details(queryset, item_model):
+    return queryset.prefetch_related(
+        Prefetch('items', queryset=item_model.objects.order_by('id')),
+        'shipping_address',
+    )
+
+
+def _decorate(order):
+    # Everything below reads the prefetched lists, never the database
+    items = list(order.items.all())
+    addresses = list(order.shipping_address.all())
+    order.line_count = len(items)
+    order.item_count = sum(item.quantity for item in items)
+    order.preview_image = next((item.image_url for item in items if item.image_url), None)
+    order.address = addresses[0] if addresses else None
+    order.is_archived = isinstance(order, ArchivedOrder)
+    return order
+
+
+def get_order_page(user, cursor=None, page_size=ORDER_PAGE_SIZE):
+    # Keyset page on the (user, order_date DESC, id DESC) index of each table, merged:
+    # one query per table plus prefetches, at any depth
+    cursor = decode_cursor(cursor)
+    orders = []
+    for order_model, item_model in ORDER_SOURCES:
+        queryset = order_model.objects.filter(user=user)
+        if cursor:
+            order_date, order_id = cursor
+            queryset = queryset.filter(Q(order_date__lt=order_date) | Q(order_date=order_date, id__lt=order_id))
+        orders.extend(_with_details(queryset.order_by('-order_date', '-id'), item_model)[:page_size + 1])
+
+    # Ids are shared between hot and archive rows, so (order_date, id) stays a total order
+    orders.sort(key=lambda order: (order.order_date, order.id), reverse=True)
+    next_cursor = None
+    if len(orders) > page_size:
+        orders = orders[:page_size]
+        next_cursor = encode_cursor(orders[-1].order_date, orders[-1].id)
+    return [_decorate(order) for order in orders], next_cursor
+
+
+def get_order(user, order_id):
+    for order_model, item_model in ORDER_SOURCES:
+        order = _with_details(order_model.objects.filter(id=order_id, user=user), item_model).first()
+        if order is not None:
+            return _decorate(order)
+    return None
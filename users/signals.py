@@ -0,0 +1,43 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .counters import adjust_count, touch_state
+from .models import CartItem, Order, OrderSearchEntry, Wishlist
+
+
+COUNTER_KINDS = {
+    CartItem: 'cart',
+    Wishlist: 'wishlist',
+}
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_save, sender=Wishlist)
+def user_item_saved(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(adjust_count, COUNTER_KINDS[sender], instance.user_id, 1))
+    transaction.on_commit(partial(touch_state, instance.user_id))
+
+
+@receiver(post_delete, sender=CartItem)
+@receiver(post_delete, sender=Wishlist)
+def user_item_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(adjust_count, COUNTER_KINDS[sender], instance.user_id, -1))
+    transaction.on_commit(partial(touch_state, instance.user_id))
+
+
+# New orders are indexed by place_order together with their items;
+# later edits (admin status changes, deletes) are mirrored here.
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    if not created:
+        OrderSearchEntry.objects.filter(order_id=instance.id).update(status=instance.status)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    # Archival marks its entries first, so moved orders stay searchable
+    OrderSearchEntry.objects.filter(order_id=instance.id, archived=False).delete()
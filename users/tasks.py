@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import BackgroundTask, Order
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+LEASE = timedelta(minutes=5)
+
+TASKS = {}
+
+
+# =======================
+# Registry
+# =======================
+
+def task(name, max_attempts=DEFAULT_MAX_ATTEMPTS, batch=False):
+    # batch=True handlers receive every claimed payload for their name in one call
+    def register(func):
+        TASKS[name] = {'func': func, 'max_attempts': max_attempts, 'batch': batch}
+        return func
+    return register
+
+
+# =======================
+# Enqueue
+# =======================
+
+def _insert(tasks):
+    now = timezone.now()
+    BackgroundTask.objects.bulk_create([
+        BackgroundTask(name=name, payload=payload, run_after=now + timedelta(seconds=delay))
+        for name, payload, delay in tasks
+    ])
+
+
+def enqueue_many(tasks):
+    # tasks: (name, payload) or (name, payload, delay_seconds); one INSERT once the transaction commits
+    tasks = [(t[0], t[1], t[2] if len(t) > 2 else 0) for t in tasks]
+    for name, payload, delay in tasks:
+        if name not in TASKS:
+            raise ValueError(f"Unknown task: {name}")
+    if tasks:
+        transaction.on_commit(partial(_insert, tasks))
+
+
+def enqueue(name, payload=None, delay=0):
+    enqueue_many([(name, payload or {}, delay)])
+
+
+# =======================
+# Workers
+# =======================
+
+def claim_tasks(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            BackgroundTask.objects.select_for_update(skip_locked=True)
+            # A running task whose lease ran out belongs to a worker that died
+            .filter(Q(status='pending', run_after__lte=now) | Q(status='running', locked_until__lt=now))
+            .order_by('run_after', 'id')[:batch_size]
+        )
+        if tasks:
+            BackgroundTask.objects.filter(id__in=[t.id for t in tasks]).update(
+                status='running', locked_until=now + LEASE, attempts=F('attempts') + 1,
+            )
+    for t in tasks:
+        t.attempts += 1
+    return tasks
+
+
+def _retry_at(attempts):
+    return timezone.now() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def run_tasks(tasks):
+    by_name = {}
+    for t in tasks:
+        by_name.setdefault(t.name, []).append(t)
+
+    done, failed = [], []
+    for name, group in by_name.items():
+        spec = TASKS.get(name)
+        if spec is None:
+            failed.extend((t, f"Unknown task: {name}", True) for t in group)
+            continue
+
+        calls = [group] if spec['batch'] else [[t] for t in group]
+        for chunk in calls:
+            try:
+                if spec['batch']:
+                    spec['func']([t.payload for t in chunk])
+                else:
+                    spec['func'](**chunk[0].payload)
+                done.extend(chunk)
+            except Exception:
+                error = traceback.format_exc()
+                logger.warning("Task %s failed: %s", name, error.splitlines()[-1])
+                failed.extend((t, error, t.attempts >= spec['max_attempts']) for t in chunk)
+
+    # Finished tasks are deleted rather than kept around; failures get a backoff
+    if done:
+        BackgroundTask.objects.filter(id__in=[t.id for t in done]).delete()
+    for t, error, give_up in failed:
+        t.status = 'failed' if give_up else 'pending'
+        t.run_after = _retry_at(t.attempts)
+        t.locked_until = None
+        t.last_error = error
+    if failed:
+        BackgroundTask.objects.bulk_update(
+            [t for t, error, give_up in failed], ['status', 'run_after', 'locked_until', 'last_error'],
+        )
+    return len(done), len(failed)
+
+
+def _recycle_connections():
+    # Drop stale or broken connections between polls, but never one an enclosing transaction is using
+    if not transaction.get_connection().in_atomic_block:
+        close_old_connections()
+
+
+def run_worker(batch_size=50, poll_interval=1.0, once=False, stop_event=None):
+    stop_event = stop_event or threading.Event()
+    processed = 0
+    try:
+        while not stop_event.is_set():
+            _recycle_connections()
+            tasks = claim_tasks(batch_size)
+            if not tasks:
+                if once:
+                    break
+                stop_event.wait(poll_interval)
+                continue
+            run_tasks(tasks)
+            processed += len(tasks)
+    finally:
+        _recycle_connections()
+    return processed
+
+
+# =======================
+# Post-order tasks
+# =======================
+
+@task('send_order_confirmation')
+def send_order_confirmation(order_id):
+    order = Order.objects.select_related('user').filter(id=order_id).first()
+    if order is None or not order.user.email:
+        return
+    send_mail(
+        f"Order {order.order_number} confirmed",
+        f"Hi {order.user.get_username()},\n\n"
+        f"We have received your order {order.order_number} for a total of {order.grand_total}.\n",
+        settings.DEFAULT_FROM_EMAIL,
+        [order.user.email],
+    )
+
+
+@task('record_order_events', batch=True)
+def record_order_events(payloads):
+    for payload in payloads:
+        logger.info("order placed: %s", payload)
+
+
+def enqueue_order_placed(order):
+    enqueue_many([
+        ('send_order_confirmation', {'order_id': order.id}),
+        ('record_order_events', {
+            'order_id': order.id,
+            'order_number': order.order_number,
+            'user_id': order.user_id,
+            'grand_total': str(order.grand_total),
+        }),
+    ])
@@ -1,3 +1,963 @@
-from django.test import TestCase
+import io
+import json
+import multiprocessing
+import os
+import runpy
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hasher, identify_hasher, make_password
+from django.contrib.messages import constants
+from django.contrib.messages.storage.base import Message
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.http import HttpRequest
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from admin_panel.models import Product
+from admin_panel.product_cache import get_products
+from .backends import users_by_email
+from .cart import add_quantities, add_quantity, cart_totals, change_quantity, load_cart
+from .catalog import MAX_PAGE_SIZE, decode_cursor, encode_cursor, get_product_page
+from .counters import get_count, get_counts, invalidate_counts
+from .hashers import HashingBusy, run_bounded
+from .inventory import hold_cart, sweep_expired_holds
+from .tasks import TASKS, enqueue, run_worker, task
+from .archive import archive_orders
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, BackgroundTask, CartItem, InventoryHold, Order, OrderItem, OrderSearchEntry,
+    Wishlist,
+)
+from .order_search import BACKENDS as ORDER_SEARCH_BACKENDS, POSTGRES_DOCUMENT, rebuild_index, search_orders
+from .orders import get_order_page
+from .order_numbers import (
+    EPOCH_MS, MAX_SEQUENCE, MAX_WORKER_ID, SEQUENCE_BITS, SnowflakeGenerator, configured_worker_id,
+    format_order_number, generate_batch, generate_worker_batch, new_order_number, order_number_timestamp,
+)
+
+
+class CartTestMixin:
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'secret-pass')
+        self.client.force_login(self.user)
+
+    def make_products(self, count, price='10.00', stock=100):
+        return [
+            Product.objects.create(
+                name=f"Product {i}",
+                price=Decimal(price),
+                stock=stock,
+                description="Test product",
+                category='mobiles',
+                image='products/test.jpg',
+            )
+            for i in range(count)
+        ]
+
+    def fill_cart(self, products, quantity=2):
+        for product in products:
+            CartItem.objects.create(user=self.user, product=product, quantity=quantity)
+
+
+class CatalogPageTests(CartTestMixin, TestCase):
+    def page(self, **params):
+        products, cursor, filters = get_product_page(params)
+        return [product.name for product in products], cursor
+
+    def test_keyset_order_is_stable_across_created_at_ties(self):
+        products = self.make_products(5)
+        Product.objects.update(created_at=timezone.now())
+        names, cursor = self.page(page_size='2')
+        seen = list(names)
+        while cursor:
+            names, cursor = self.page(page_size='2', cursor=cursor)
+            seen.extend(names)
+        # Ties on created_at fall back to id DESC: every product once, newest id first
+        self.assertEqual(seen, [product.name for product in reversed(products)])
+
+    def test_cursor_round_trip_and_garbage(self):
+        created_at = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(created_at, 42)), (created_at, 42))
+        for garbage in ('', 'not-base64!', 'aGVsbG8=', None):
+            self.assertIsNone(decode_cursor(garbage))
+        self.make_products(2)
+        self.assertEqual(len(self.page(cursor='garbage')[0]), 2)
+
+    def test_filters(self):
+        cheap, dear, empty = self.make_products(3)
+        Product.objects.filter(id=dear.id).update(price=Decimal('99.00'), category='laptops')
+        Product.objects.filter(id=empty.id).update(stock=0)
+        cache.clear()
+        self.assertEqual(self.page(category='laptops')[0], [dear.name])
+        self.assertEqual(self.page(category='bogus')[0], [empty.name, dear.name, cheap.name])
+        self.assertEqual(self.page(min_price='50')[0], [dear.name])
+        self.assertEqual(self.page(max_price='50')[0], [empty.name, cheap.name])
+        self.assertEqual(self.page(in_stock='1')[0], [dear.name, cheap.name])
+
+    def test_page_size_is_clamped(self):
+        self.make_products(MAX_PAGE_SIZE + 1)
+        self.assertEqual(len(self.page(page_size='1000')[0]), MAX_PAGE_SIZE)
+        self.assertEqual(len(self.page(page_size='0')[0]), 1)
+        self.assertEqual(len(self.page(page_size='abc')[0]), 24)
+
+
+class CounterTests(CartTestMixin, TestCase):
+    def test_warm_counters_follow_signals(self):
+        first, second = self.make_products(2)
+        self.assertEqual(get_counts(self.user.id), {'cart': 0, 'wishlist': 0})
+        with self.captureOnCommitCallbacks(execute=True):
+            CartItem.objects.create(user=self.user, product=first, quantity=1)
+            item = CartItem.objects.create(user=self.user, product=second, quantity=1)
+            Wishlist.objects.create(user=self.user, product=first)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_counts(self.user.id), {'cart': 2, 'wishlist': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_count('cart', self.user.id), 1)
+
+    def test_cold_counter_is_recounted(self):
+        first, = self.make_products(1)
+        # Created while the key is cold: the increment is skipped, the next read counts
+        with self.captureOnCommitCallbacks(execute=True):
+            CartItem.objects.create(user=self.user, product=first, quantity=1)
+        with self.assertNumQueries(2):
+            self.assertEqual(get_counts(self.user.id), {'cart': 1, 'wishlist': 0})
+        invalidate_counts(self.user.id, 'cart')
+        with self.assertNumQueries(1):
+            self.assertEqual(get_count('cart', self.user.id), 1)
+
+    def test_cold_fill_does_not_overwrite_a_concurrent_fill(self):
+        first, = self.make_products(1)
+        CartItem.objects.create(user=self.user, product=first, quantity=1)
+        real_add = cache.add
+
+        def racing_add(key, value, timeout=None):
+            # Another request filled and incremented the key between our COUNT and add
+            cache.set(key, 5)
+            return real_add(key, value, timeout)
+
+        with mock.patch.object(cache, 'add', side_effect=racing_add):
+            self.assertEqual(get_count('cart', self.user.id), 5)
+        self.assertEqual(get_count('cart', self.user.id), 5)
+
+
+class ConditionalGetTests(CartTestMixin, TestCase):
+    AJAX = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+    def setUp(self):
+        super().setUp()
+        self.product, = self.make_products(1)
+        self.pages = [reverse('users_dashboard'), reverse('product_detail', args=[self.product.id])]
+
+    def get(self, url, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(url, **headers)
+
+    def test_matching_etag_is_not_modified(self):
+        for url in self.pages:
+            response = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('private', response['Cache-Control'])
+            self.assertIn('no-cache', response['Cache-Control'])
+            self.assertTrue(response.has_header('Last-Modified'))
+
+            repeat = self.get(url, response['ETag'])
+            self.assertEqual(repeat.status_code, 304)
+            self.assertEqual(repeat['ETag'], response['ETag'])
+            self.assertEqual(self.get(url, '"stale"').status_code, 200)
+
+    def test_etag_changes_after_edits(self):
+        edits = [
+            lambda: Product.objects.get(pk=self.product.pk).save(),
+            lambda: self.client.post(reverse('add_to_cart', args=[self.product.id]), **self.AJAX),
+            lambda: self.client.post(reverse('toggle_wishlist', args=[self.product.id]), **self.AJAX),
+        ]
+        for edit in edits:
+            etags = [self.get(url)['ETag'] for url in self.pages]
+            with self.captureOnCommitCallbacks(execute=True):
+                edit()
+            for url, etag in zip(self.pages, etags):
+                self.assertEqual(self.get(url, etag).status_code, 200)
+
+    def test_pending_messages_skip_not_modified(self):
+        url = self.pages[0]
+        etag = self.get(url)['ETag']
+        # A flash message queued elsewhere leaves the page validators untouched
+        storage = CookieStorage(HttpRequest())
+        self.client.cookies[storage.cookie_name] = storage._encode([Message(constants.SUCCESS, 'Saved')])
+
+        response = self.get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Saved')
+        self.assertEqual(self.get(url, etag).status_code, 304)
+
+
+class CartTotalsTests(CartTestMixin, TestCase):
+    def test_totals_prefer_price_at_added(self):
+        first, second = self.make_products(2)
+        CartItem.objects.create(user=self.user, product=first, quantity=3)
+        CartItem.objects.create(user=self.user, product=second, quantity=1, price_at_added=Decimal('4.50'))
+
+        totals = cart_totals(self.user)
+        self.assertEqual(totals['subtotal'], Decimal('34.50'))
+        self.assertEqual(totals['item_count'], 4)
+        self.assertEqual(totals['line_count'], 2)
+
+    def test_load_cart_matches_aggregate(self):
+        self.fill_cart(self.make_products(5), quantity=3)
+        lines, totals = load_cart(self.user)
+        self.assertEqual(totals['subtotal'], cart_totals(self.user)['subtotal'])
+        self.assertEqual([line.line_total for line in lines], [Decimal('30.00')] * 5)
+
+    def test_empty_cart(self):
+        totals = cart_totals(self.user)
+        self.assertEqual(totals['subtotal'], Decimal('0.00'))
+        self.assertEqual(totals['item_count'], 0)
+
+
+class CartQueryCountTests(CartTestMixin, TestCase):
+    # Session + user lookups made by the auth middleware
+    AUTH_QUERIES = 2
+
+    def assert_constant_queries(self, make_request, expected):
+        for size in (1, 25):
+            CartItem.objects.filter(user=self.user).delete()
+            InventoryHold.objects.filter(user=self.user).delete()
+            products = self.make_products(size)
+            self.fill_cart(products)
+            item = CartItem.objects.get(user=self.user, product=products[0])
+            get_counts(self.user.id)  # header counters are served from the cache
+            with self.assertNumQueries(self.AUTH_QUERIES + expected):
+                make_request(products, item)
+
+    def test_cart_view(self):
+        self.assert_constant_queries(lambda products, item: self.client.get(reverse('cart')), 1)
+
+    def test_checkout_page(self):
+        # cart, savepoints (4), held rows, reserve, create holds
+        self.assert_constant_queries(lambda products, item: self.client.get(reverse('checkout')), 8)
+
+    def test_update_cart_item(self):
+        def update(products, item):
+            response = self.client.post(reverse('update_cart_item', args=[item.id]), {'action': 'increase'})
+            self.assertEqual(response.json()['cart_total'], f"{Decimal('10.00') * (2 * len(products) + 1):.2f}")
+        # F() update, aggregate
+        self.assert_constant_queries(update, 2)
+
+    def test_remove_from_cart(self):
+        def remove(products, item):
+            response = self.client.post(reverse('remove_from_cart', args=[item.id]))
+            self.assertEqual(response.json()['cart_total'], f"{Decimal('20.00') * (len(products) - 1):.2f}")
+        # lookup, delete, aggregate
+        self.assert_constant_queries(remove, 3)
+
+
+class AtomicCartTests(CartTestMixin, TestCase):
+    def test_add_quantity_inserts_then_increments(self):
+        product, = self.make_products(1)
+        self.assertTrue(add_quantity(self.user.id, product.id))
+        self.assertFalse(add_quantity(self.user.id, product.id, 2))
+        self.assertEqual(CartItem.objects.get(user=self.user, product=product).quantity, 3)
+
+    def test_decrease_to_zero_removes_line(self):
+        product, = self.make_products(1)
+        item = CartItem.objects.create(user=self.user, product=product, quantity=2)
+        self.assertEqual(change_quantity(self.user.id, item.id, -1), 'updated')
+        self.assertEqual(change_quantity(self.user.id, item.id, -1), 'removed')
+        self.assertFalse(CartItem.objects.filter(id=item.id).exists())
+        self.assertIsNone(change_quantity(self.user.id, item.id, -1))
+
+    def test_other_users_line_is_untouched(self):
+        product, = self.make_products(1)
+        other = User.objects.create_user('other', 'other@example.com', 'secret-pass')
+        item = CartItem.objects.create(user=other, product=product, quantity=1)
+        response = self.client.post(reverse('update_cart_item', args=[item.id]), {'action': 'increase'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(CartItem.objects.get(id=item.id).quantity, 1)
+
+
+class BatchUpdateTests(CartTestMixin, TestCase):
+    def post_batch(self, payload):
+        return self.client.post(reverse('batch_update'), json.dumps(payload), content_type='application/json')
+
+    def test_add_and_wishlist_in_one_request(self):
+        first, second, third = self.make_products(3)
+        CartItem.objects.create(user=self.user, product=first, quantity=1)
+        Wishlist.objects.create(user=self.user, product=third)
+
+        response = self.post_batch({
+            'cart': [{'product_id': first.id, 'quantity': 2}, {'product_id': second.id}],
+            'wishlist': [{'product_id': second.id}, {'product_id': third.id, 'action': 'remove'}],
+        })
+
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        quantities = {item['product_id']: item['quantity'] for item in data['cart']['items']}
+        self.assertEqual(quantities, {first.id: 3, second.id: 1})
+        self.assertEqual(data['cart']['subtotal'], '40.00')
+        self.assertEqual(data['wishlist']['product_ids'], [second.id])
+
+    def test_set_mode_removes_zero_quantity_lines(self):
+        first, second = self.make_products(2)
+        self.fill_cart([first, second], quantity=4)
+        self.post_batch({'mode': 'set', 'cart': [
+            {'product_id': first.id, 'quantity': 0},
+            {'product_id': second.id, 'quantity': 1},
+        ]})
+        self.assertEqual(list(CartItem.objects.values_list('product_id', 'quantity')), [(second.id, 1)])
+
+    def test_unknown_product_rejects_whole_batch(self):
+        product, = self.make_products(1)
+        response = self.post_batch({'cart': [{'product_id': product.id}, {'product_id': 9999}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('9999', response.json()['errors'][0])
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_stale_cached_product_is_rejected(self):
+        product, = self.make_products(1)
+        get_products([product.id])
+        # Deleted without running the on_commit invalidation: the cache still has it
+        Product.objects.filter(id=product.id).delete()
+        response = self.post_batch({'cart': [{'product_id': product.id}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(product.id), response.json()['errors'][0])
+
+    def test_add_mode_increments_lines_added_since_the_request_began(self):
+        first, second = self.make_products(2)
+        self.fill_cart([first], quantity=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(add_quantities(self.user.id, {first.id: 2, second.id: 3}), 1)
+        self.assertEqual(dict(CartItem.objects.values_list('product_id', 'quantity')), {first.id: 7, second.id: 3})
+        self.assertEqual(get_count('cart', self.user.id), 2)
+
+    def test_malformed_body(self):
+        for body in (b'{not json', b'\xff\xfe'):
+            response = self.client.post(reverse('batch_update'), body, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['errors'], ["Body must be valid JSON."])
+        response = self.client.post(reverse('batch_update'), '[]', content_type='application/json')
+        self.assertEqual(response.json()['errors'], ["Body must be a JSON object."])
+
+    def test_query_count_is_independent_of_batch_size(self):
+        for size in (2, 40):
+            CartItem.objects.all().delete()
+            products = self.make_products(size)
+            self.fill_cart(products[:size // 2])
+            get_counts(self.user.id)
+            # set mode: auth (2), product lookup, lock existing, insert, update, savepoints (2), cart, wishlist
+            with self.assertNumQueries(10):
+                self.post_batch({'mode': 'set', 'cart': [
+                    {'product_id': product.id, 'quantity': 3} for product in products
+                ]})
+            CartItem.objects.filter(product__in=products[size // 2:]).delete()
+            # add mode: auth (2), product lookup, upsert, savepoints (2), cart, wishlist
+            with self.assertNumQueries(8):
+                self.post_batch({'cart': [{'product_id': product.id} for product in products]})
+
+
+class CheckoutTests(CartTestMixin, TestCase):
+    ADDRESS = {
+        'full_name': 'Test Buyer',
+        'address_line1': '1 Main Street',
+        'city': 'Chennai',
+        'state': 'TN',
+        'postal_code': '600001',
+        'country': 'India',
+        'phone': '9999999999',
+        'payment_method': 'cod',
+    }
+
+    def test_order_placed_and_stock_decremented(self):
+        products = self.make_products(3, stock=5)
+        self.fill_cart(products, quantity=2)
+
+        response = self.client.post(reverse('checkout'), self.ADDRESS)
+
+        order = Order.objects.get(user=self.user)
+        self.assertRedirects(response, reverse('order_success', args=[order.id]), fetch_redirect_response=False)
+        self.assertEqual(order.subtotal, Decimal('60.00'))
+        self.assertEqual(order.grand_total, Decimal('60.00') + Decimal('10.80') + Decimal('50.00'))
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 3)
+        self.assertEqual(set(Product.objects.values_list('stock', flat=True)), {3})
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+
+    def test_insufficient_stock_rolls_back(self):
+        plenty, scarce = self.make_products(2, stock=5)
+        Product.objects.filter(id=scarce.id).update(stock=1)
+        self.fill_cart([plenty, scarce], quantity=2)
+
+        response = self.client.post(reverse('checkout'), self.ADDRESS)
+
+        self.assertRedirects(response, reverse('cart'), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(id=plenty.id).stock, 5)
+        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 2)
+
+    def test_same_second_checkouts_get_distinct_numbers(self):
+        products = self.make_products(2)
+        for product in products:
+            self.fill_cart([product])
+            self.client.post(reverse('checkout'), self.ADDRESS)
+        numbers = list(Order.objects.values_list('order_number', flat=True))
+        self.assertEqual(len(set(numbers)), 2)
+
+    def test_query_count_is_independent_of_cart_size(self):
+        for size in (1, 30):
+            products = self.make_products(size)
+            self.fill_cart(products)
+            get_counts(self.user.id)
+            # auth (2), savepoints (2), cart, holds, stock, order, address, items, cart delete (select + delete),
+            # search index, sales rollups
+            with self.assertNumQueries(14):
+                self.client.post(reverse('checkout'), self.ADDRESS)
+            Order.objects.all().delete()
+
+
+class InventoryHoldTests(CartTestMixin, TestCase):
+    def other_shopper(self):
+        other = User.objects.create_user('rival', 'rival@example.com', 'secret-pass')
+        self.client.force_login(other)
+        return other
+
+    def test_checkout_page_holds_stock(self):
+        product, = self.make_products(1, stock=3)
+        self.fill_cart([product], quantity=2)
+
+        self.client.get(reverse('checkout'))
+
+        product.refresh_from_db()
+        self.assertEqual((product.reserved, product.available), (2, 1))
+        self.assertEqual(InventoryHold.objects.get(user=self.user).quantity, 2)
+
+    def test_reloading_checkout_does_not_double_reserve(self):
+        product, = self.make_products(1, stock=3)
+        self.fill_cart([product], quantity=2)
+
+        self.client.get(reverse('checkout'))
+        CartItem.objects.filter(user=self.user).update(quantity=1)
+        self.client.get(reverse('checkout'))
+
+        product.refresh_from_db()
+        self.assertEqual(product.reserved, 1)
+
+    def test_held_stock_is_not_sold_to_others(self):
+        product, = self.make_products(1, stock=3)
+        self.fill_cart([product], quantity=2)
+        self.client.get(reverse('checkout'))
+
+        other = self.other_shopper()
+        CartItem.objects.create(user=other, product=product, quantity=2)
+        line = CartItem.objects.filter(user=other)
+        self.assertEqual(hold_cart(other, line), [product.id])
+
+        response = self.client.post(reverse('checkout'), CheckoutTests.ADDRESS)
+        self.assertRedirects(response, reverse('cart'), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+
+    def test_order_consumes_own_hold(self):
+        product, = self.make_products(1, stock=2)
+        self.fill_cart([product], quantity=2)
+        self.client.get(reverse('checkout'))
+
+        self.client.post(reverse('checkout'), CheckoutTests.ADDRESS)
+
+        product.refresh_from_db()
+        self.assertEqual((product.stock, product.reserved), (0, 0))
+        self.assertFalse(InventoryHold.objects.exists())
+
+    def test_stock_check_never_subtracts_from_unsigned_columns(self):
+        product, = self.make_products(1, stock=2)
+        self.fill_cart([product], quantity=2)
+        self.client.get(reverse('checkout'))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('checkout'), CheckoutTests.ADDRESS)
+
+        stock_update = next(q['sql'] for q in queries if q['sql'].startswith('UPDATE "admin_panel_product"'))
+        where = stock_update.split(' WHERE ', 1)[1]
+        # MySQL errors when an UNSIGNED expression dips below zero, e.g. reserved - held
+        self.assertNotIn('-', where)
+        product.refresh_from_db()
+        self.assertEqual((product.stock, product.reserved), (0, 0))
+
+    def test_sweeper_releases_expired_holds(self):
+        products = self.make_products(3, stock=5)
+        self.fill_cart(products, quantity=2)
+        self.client.get(reverse('checkout'))
+        InventoryHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(sweep_expired_holds(batch_size=2), 3)
+
+        self.assertFalse(InventoryHold.objects.exists())
+        self.assertEqual(set(Product.objects.values_list('reserved', flat=True)), {0})
+
+
+class OrderTestMixin(CartTestMixin):
+    def make_orders(self, count, lines=3):
+        orders = []
+        for n in range(count):
+            order = Order.objects.create(
+                user=self.user, order_number=new_order_number(), subtotal=Decimal('30.00'),
+                grand_total=Decimal('30.00'),
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order, product_name=f"Item {i}", quantity=2, unit_price=Decimal('5.00'),
+                    total_price=Decimal('10.00'), image_url=f"/media/{n}-{i}.jpg",
+                )
+                for i in range(lines)
+            ])
+            orders.append(order)
+        return orders
+
+
+class OrderHistoryTests(OrderTestMixin, TestCase):
+    def test_query_count_is_independent_of_history_size(self):
+        for count in (1, 25):
+            self.make_orders(count)
+            get_counts(self.user.id)
+            # auth (2), hot orders, items, addresses, archived orders (none here)
+            with self.assertNumQueries(6):
+                response = self.client.get(reverse('order_history'))
+            self.assertEqual(response.status_code, 200)
+
+    def test_pages_cover_every_order_once(self):
+        created = self.make_orders(23)
+        seen, cursor = [], None
+        while True:
+            orders, cursor = get_order_page(self.user, cursor)
+            seen.extend(order.id for order in orders)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [order.id for order in reversed(created)])
+
+    def test_line_count_and_preview(self):
+        self.make_orders(1, lines=3)
+        order, = get_order_page(self.user)[0]
+        self.assertEqual((order.line_count, order.item_count), (3, 6))
+        self.assertEqual(order.preview_image, '/media/0-0.jpg')
+
+
+class OrderArchiveTests(OrderTestMixin, TestCase):
+    def age(self, orders, days, status='delivered'):
+        Order.objects.filter(id__in=[order.id for order in orders]).update(
+            order_date=timezone.now() - timedelta(days=days), status=status,
+        )
+
+    def test_old_finished_orders_move_in_batches(self):
+        old = self.make_orders(5)
+        recent = self.make_orders(1)
+        pending = self.make_orders(1)
+        self.age(old, 400)
+        self.age(pending, 400, status='pending')
+        self.age(recent, 10)
+
+        # Interrupted after two batches, then resumed
+        self.assertEqual(archive_orders(older_than_days=180, batch_size=2, max_batches=2), 4)
+        self.assertEqual(archive_orders(older_than_days=180, batch_size=2), 1)
+
+        self.assertEqual(set(ArchivedOrder.objects.values_list('id', flat=True)), {order.id for order in old})
+        self.assertEqual(ArchivedOrderItem.objects.count(), 15)
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {recent[0].id, pending[0].id})
+        self.assertFalse(OrderItem.objects.filter(order_id__in=[order.id for order in old]).exists())
+
+    def test_history_and_detail_read_both_tables(self):
+        old = self.make_orders(12)
+        self.age(old, 400)
+        recent = self.make_orders(3)
+        archive_orders(older_than_days=180)
+
+        seen, cursor = [], None
+        while True:
+            orders, cursor = get_order_page(self.user, cursor)
+            seen.extend(order.id for order in orders)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [order.id for order in reversed(recent)] + [order.id for order in reversed(old)])
+
+        response = self.client.get(reverse('order_success', args=[old[0].id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['order'].is_archived)
+        self.assertEqual(response.context['order'].line_count, 3)
+
+
+class OrderSearchTests(CartTestMixin, TestCase):
+    def place(self, names, status=None):
+        products = self.make_products(len(names))
+        for product, name in zip(products, names):
+            Product.objects.filter(id=product.id).update(name=name)
+        self.fill_cart(products)
+        self.client.post(reverse('checkout'), CheckoutTests.ADDRESS)
+        order = Order.objects.latest('id')
+        if status:
+            order.status = status
+            order.save()
+        return order
+
+    def ids(self, query='', status=''):
+        return [entry.order_id for entry in search_orders(query, status)[0]]
+
+    def test_orders_are_indexed_when_placed(self):
+        order = self.place(['Galaxy Phone', 'Leather Case'])
+        entry = OrderSearchEntry.objects.get(order_id=order.id)
+        self.assertEqual(entry.username, 'buyer')
+        self.assertEqual([item['name'] for item in entry.items], ['Galaxy Phone', 'Leather Case'])
+
+    def test_prefix_and_token_search(self):
+        phone = self.place(['Galaxy Phone'])
+        laptop = self.place(['Gaming Laptop'])
+        self.assertEqual(self.ids('gala'), [phone.id])
+        self.assertEqual(self.ids('ga'), [laptop.id, phone.id])
+        self.assertEqual(self.ids('buyer@example'), [laptop.id, phone.id])
+        self.assertEqual(self.ids(phone.order_number), [phone.id])
+        self.assertEqual(self.ids('gaming phone'), [])
+
+    def test_status_changes_and_archival_are_reflected(self):
+        order = self.place(['Galaxy Phone'], status='delivered')
+        self.assertEqual(self.ids(status='delivered'), [order.id])
+        Order.objects.filter(id=order.id).update(order_date=timezone.now() - timedelta(days=400))
+        OrderSearchEntry.objects.filter(order_id=order.id).update(order_date=timezone.now() - timedelta(days=400))
+
+        archive_orders(older_than_days=180)
+
+        self.assertEqual(self.ids('galaxy'), [order.id])
+        self.assertTrue(OrderSearchEntry.objects.get(order_id=order.id).archived)
+
+    def test_rebuild_matches_incremental_index(self):
+        self.place(['Galaxy Phone'])
+        before = list(OrderSearchEntry.objects.values())
+        OrderSearchEntry.objects.all().delete()
+        rebuild_index()
+        self.assertEqual(list(OrderSearchEntry.objects.values()), before)
+
+    def test_backfill_migration_indexes_existing_orders(self):
+        phone = self.place(['Galaxy Phone'])
+        before = list(OrderSearchEntry.objects.values())
+        # An upgraded install: orders exist, the index table starts empty
+        OrderSearchEntry.objects.all().delete()
+
+        migration = import_module('users.migrations.0011_backfill_order_search')
+        state = MigrationLoader(connection).project_state(('users', '0011_backfill_order_search'))
+        migration.backfill_order_search(state.apps, None)
+
+        self.assertEqual(list(OrderSearchEntry.objects.values()), before)
+        self.assertEqual(self.ids('galaxy'), [phone.id])
+
+    def test_every_indexed_database_has_a_search_backend(self):
+        migration = import_module('users.migrations.0008_order_search')
+        self.assertEqual(set(migration.FORWARD_SQL), set(ORDER_SEARCH_BACKENDS))
+        match = ORDER_SEARCH_BACKENDS['postgresql'](['gala', 'buyer'])
+        # Same expression as the GIN index, or PostgreSQL falls back to a sequential scan
+        self.assertIn(f"{POSTGRES_DOCUMENT} @@ to_tsquery('simple', %s)", match.sql)
+        self.assertEqual(match.params, ['gala:* & buyer:*'])
+
+    def test_admin_page_is_a_single_search_query(self):
+        for _ in range(3):
+            self.place(['Galaxy Phone', 'Leather Case'])
+        # search page + session and user loaded by the template context
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('admin_orders'), {'search': 'galaxy', 'status': 'pending'})
+        self.assertEqual(len(response.context['orders']), 3)
+
+
+class IdempotencyTests(CartTestMixin, TestCase):
+    def test_replayed_add_to_cart_does_not_increment_twice(self):
+        product, = self.make_products(1)
+        url = reverse('add_to_cart', args=[product.id])
+        headers = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest', 'HTTP_IDEMPOTENCY_KEY': 'add-1'}
+
+        first = self.client.post(url, **headers)
+        with self.assertNumQueries(2):  # auth only
+            second = self.client.post(url, **headers)
+
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(CartItem.objects.get(user=self.user).quantity, 1)
+
+    def test_double_submitted_checkout_places_one_order(self):
+        self.fill_cart(self.make_products(2))
+        form = dict(CheckoutTests.ADDRESS, idempotency_key='checkout-1')
+
+        first = self.client.post(reverse('checkout'), form)
+        second = self.client.post(reverse('checkout'), form)
+
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(second.status_code, 302)
+        self.assertEqual(second['Location'], first['Location'])
+
+    def test_key_reused_for_different_request_is_rejected(self):
+        first, second = self.make_products(2)
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'reused'}
+        self.client.post(reverse('add_to_cart', args=[first.id]), {'quantity': 1}, **headers)
+        response = self.client.post(reverse('add_to_cart', args=[first.id]), {'quantity': 5}, **headers)
+        self.assertEqual(response.status_code, 422)
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        product, = self.make_products(1)
+        url = reverse('add_to_cart', args=[product.id])
+        self.client.post(url)
+        self.client.post(url)
+        self.assertEqual(CartItem.objects.get(user=self.user).quantity, 2)
+
+
+class TaskQueueTests(CartTestMixin, TestCase):
+    def test_order_tasks_enqueued_on_commit_and_run_by_worker(self):
+        self.fill_cart(self.make_products(1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('checkout'), CheckoutTests.ADDRESS)
+        self.assertEqual(
+            sorted(BackgroundTask.objects.values_list('name', flat=True)),
+            ['record_order_events', 'send_order_confirmation'],
+        )
+
+        self.assertEqual(run_worker(once=True), 2)
+
+        self.assertFalse(BackgroundTask.objects.exists())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['buyer@example.com'])
+
+    def test_rolled_back_order_enqueues_nothing(self):
+        product, = self.make_products(1, stock=1)
+        self.fill_cart([product], quantity=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('checkout'), CheckoutTests.ADDRESS)
+        self.assertFalse(BackgroundTask.objects.exists())
+
+    def test_failures_back_off_then_give_up(self):
+        calls = []
+
+        @task('flaky_test_task', max_attempts=2)
+        def flaky(**payload):
+            calls.append(payload)
+            raise RuntimeError("boom")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue('flaky_test_task', {'n': 1})
+
+        with self.assertLogs('users.tasks', 'WARNING'):
+            run_worker(once=True)
+        queued = BackgroundTask.objects.get()
+        self.assertEqual((queued.status, queued.attempts), ('pending', 1))
+        self.assertGreater(queued.run_after, timezone.now())
+        self.assertIn('boom', queued.last_error)
+
+        BackgroundTask.objects.update(run_after=timezone.now())
+        with self.assertLogs('users.tasks', 'WARNING'):
+            run_worker(once=True)
+        self.assertEqual(BackgroundTask.objects.get().status, 'failed')
+        self.assertEqual(calls, [{'n': 1}, {'n': 1}])
+        TASKS.pop('flaky_test_task')
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    def load(self, **env):
+        with mock.patch.dict('os.environ', env):
+            for name in ('DB_ENGINE', 'DB_NAME', 'DB_POOL', 'DB_CONN_MAX_AGE'):
+                if name not in env:
+                    os.environ.pop(name, None)
+            return runpy.run_path(str(settings.BASE_DIR / 'ecommerce' / 'settings.py'))['DATABASES']['default']
+
+    def test_persistent_health_checked_connections(self):
+        database = self.load(DB_CONN_MAX_AGE='120')
+        self.assertEqual((database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']), (120, True))
+        pooled = self.load(DB_ENGINE='postgresql', DB_POOL='1')
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertIn('pool', pooled['OPTIONS'])
+
+    def test_pool_needs_postgresql(self):
+        for engine in ('sqlite', 'mysql'):
+            with self.assertRaises(ImproperlyConfigured):
+                self.load(DB_ENGINE=engine, DB_POOL='1')
+        with self.assertRaises(ImproperlyConfigured):
+            self.load(DB_ENGINE='oracle')
+
+    def test_unknown_hasher_profile_is_rejected(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "pbkdf2, scrypt, argon2"):
+            self.load(PASSWORD_HASHER_PROFILE='md5')
+
+    def test_wal_only_for_deployment_sqlite_files(self):
+        self.assertNotIn('init_command', self.load()['OPTIONS'])
+        deployed = self.load(DB_NAME='/srv/shop/db.sqlite3')
+        self.assertIn('journal_mode=WAL', deployed['OPTIONS']['init_command'])
+
+
+class ConnectionBenchmarkTests(TransactionTestCase):
+    def test_benchmark_command_runs(self):
+        out = io.StringIO()
+        call_command('benchmark_db_connections', '--requests', '5', '--queries', '1', stdout=out)
+        output = out.getvalue()
+        self.assertIn('per-request connections:', output)
+        self.assertIn('5 connects', output)
+        self.assertIn('persistent connections:', output)
+        self.assertIn(' 1 connects', output)
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], settings.DATABASES['default']['CONN_MAX_AGE'])
+
+
+class EmailLoginTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'secret-pass')
+
+    def test_login_by_email_is_case_insensitive_and_redirects(self):
+        url = reverse('users_login')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'email': ' Shopper@Example.COM ', 'password': 'secret-pass'})
+        self.assertRedirects(response, reverse('users_dashboard'), fetch_redirect_response=False)
+        # The user is loaded once; everything else is session bookkeeping and last_login
+        self.assertEqual(sum(query['sql'].startswith('SELECT') and 'FROM "auth_user"' in query['sql']
+                             for query in queries.captured_queries), 1)
+
+        response = self.client.post(url, {'email': 'shopper@example.com', 'password': 'wrong'})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+
+    def test_email_key_is_unique_and_indexed(self):
+        self.assertEqual(users_by_email('SHOPPER@example.com').get(), self.user)
+        if connection.vendor == 'sqlite':
+            sql, params = users_by_email('shopper@example.com').query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                self.assertIn('auth_user_email_key', str(cursor.fetchall()))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user('copycat', 'SHOPPER@example.com', 'secret-pass')
+        # Blank emails are left out of the key
+        User.objects.create_user('blank1', '', 'secret-pass')
+        User.objects.create_user('blank2', '', 'secret-pass')
+
+    def test_outdated_hash_is_upgraded_on_login(self):
+        User.objects.filter(id=self.user.id).update(password=make_password('secret-pass', hasher='pbkdf2_sha1'))
+        self.client.post(reverse('users_login'), {'email': 'shopper@example.com', 'password': 'secret-pass'})
+        self.user.refresh_from_db()
+        self.assertEqual(identify_hasher(self.user.password).algorithm, get_hasher().algorithm)
+        self.assertTrue(self.user.check_password('secret-pass'))
+
+    def test_stronger_hash_is_not_downgraded_on_login(self):
+        hasher = get_hasher()
+        stronger = hasher.encode('secret-pass', hasher.salt(), iterations=hasher.iterations + 1000)
+        User.objects.filter(id=self.user.id).update(password=stronger)
+        self.client.post(reverse('users_login'), {'email': 'shopper@example.com', 'password': 'secret-pass'})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, stronger)
+        self.assertTrue(hasher.must_update(hasher.encode('secret-pass', hasher.salt(), iterations=1000)))
+
+    def test_calibration_never_recommends_less_than_the_default(self):
+        out = io.StringIO()
+        call_command('calibrate_password_hashers', '--profile', 'pbkdf2', '--target-ms', '0.001', '--samples', '1',
+                     stdout=out)
+        self.assertIn(f"PASSWORD_PBKDF2_ITERATIONS={PBKDF2PasswordHasher.iterations}", out.getvalue())
+
+    def test_login_benchmark_removes_its_accounts(self):
+        out = io.StringIO()
+        call_command('benchmark_login', '--users', '20', '--logins', '1', stdout=out)
+        self.assertIn('EmailBackend login:', out.getvalue())
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), [self.user.username])
+
+    def test_hash_pool_wait_is_bounded(self):
+        with mock.patch('users.hashers.HASH_TIMEOUT', 0.01), self.assertRaises(HashingBusy):
+            run_bounded(time.sleep, 0.2)
+
+    def test_register_rejects_email_in_other_case(self):
+        response = self.client.post(reverse('users_register'), {
+            'username': 'another', 'email': 'SHOPPER@example.com', 'password': 'x', 'confirm_password': 'x',
+        })
+        self.assertRedirects(response, reverse('users_register'), fetch_redirect_response=False)
+        self.assertFalse(User.objects.filter(username='another').exists())
+
+
+class OrderNumberTests(SimpleTestCase):
+    def test_ids_increase_within_a_process(self):
+        generator = SnowflakeGenerator(7)
+        ids = [generator.next_id() for _ in range(10000)]
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertLess(format_order_number(ids[0]), format_order_number(ids[-1]))
+
+    def test_clock_going_backwards_never_repeats(self):
+        ticks = iter([EPOCH_MS + 1000, EPOCH_MS + 1000, EPOCH_MS + 900, EPOCH_MS + 1000])
+        generator = SnowflakeGenerator(1, clock=lambda: next(ticks))
+        ids = [generator.next_id() for _ in range(4)]
+        self.assertEqual(ids, sorted(set(ids)))
+
+    def test_exhausted_sequence_borrows_next_millisecond(self):
+        generator = SnowflakeGenerator(1, clock=lambda: EPOCH_MS + 5)
+        ids = [generator.next_id() for _ in range(MAX_SEQUENCE + 3)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+
+    def test_timestamp_round_trip(self):
+        stamp = order_number_timestamp(new_order_number())
+        self.assertLess(abs(stamp - datetime.now(dt_timezone.utc)), timedelta(seconds=2))
+
+    def test_unique_across_processes(self):
+        workers, count = 4, 20000
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            batches = list(pool.map(generate_batch, range(workers), [count] * workers))
+        ids = [snowflake for batch in batches for snowflake in batch]
+        self.assertEqual(len(set(ids)), workers * count)
+
+    def test_configured_ids_are_unique_across_server_processes(self):
+        # Base id from settings + per-process slot, as the web workers derive it
+        workers, count = 4, 5000
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            batches = list(pool.map(generate_worker_batch, range(workers), [count] * workers))
+        ids = [snowflake for batch in batches for snowflake in batch]
+        self.assertEqual(len(set(ids)), workers * count)
+        worker_ids = {(snowflake >> SEQUENCE_BITS) & MAX_WORKER_ID for snowflake in ids}
+        self.assertEqual(worker_ids, set(range(workers)))
+
+    def test_missing_worker_id_fails_fast(self):
+        with self.settings(ORDER_WORKER_ID=None):
+            with self.assertRaises(ImproperlyConfigured):
+                configured_worker_id()
+        with self.settings(ORDER_WORKER_ID=1000), mock.patch.dict('os.environ', {'ORDER_WORKER_INDEX': '30'}):
+            self.assertEqual(configured_worker_id(), 1030)
+            with self.assertRaises(ValueError):
+                SnowflakeGenerator(configured_worker_id())
+
+
+class ConcurrentCartTests(CartTestMixin, TransactionTestCase):
+    THREADS = 8
+    ADDS_PER_THREAD = 25
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("Shared-cache in-memory SQLite fails concurrent writers instead of waiting")
+        super().setUp()
+
+    def test_concurrent_adds_lose_no_updates(self):
+        product, = self.make_products(1)
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(self.ADDS_PER_THREAD):
+                    add_quantity(self.user.id, product.id)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        item = CartItem.objects.get(user=self.user, product=product)
+        self.assertEqual(item.quantity, self.THREADS * self.ADDS_PER_THREAD)
@@ -1,20 +1,23 @@
 from django.urls import path
 from . import views
+from .idempotency import idempotent
 
 urlpatterns = [
     path('', views.users_login, name='users_login'),
     path('register/', views.users_register, name='users_register'),
     path('dashboard/', views.users_dashboard, name='users_dashboard'),
+    path('products/feed/', views.product_feed, name='product_feed'),
     path('wishlist/', views.wishlist_view, name='wishlist'),
-    path('wishlist/add/<int:product_id>/', views.add_to_wishlist, name='add_to_wishlist'),
-    path('wishlist/remove/<int:item_id>/', views.remove_from_wishlist, name='remove_from_wishlist'),
-    path('wishlist/toggle/<int:product_id>/', views.toggle_wishlist, name='toggle_wishlist'),
+    path('wishlist/add/<int:product_id>/', idempotent(views.add_to_wishlist), name='add_to_wishlist'),
+    path('wishlist/remove/<int:item_id>/', idempotent(views.remove_from_wishlist), name='remove_from_wishlist'),
+    path('wishlist/toggle/<int:product_id>/', idempotent(views.toggle_wishlist), name='toggle_wishlist'),
     path('cart/', views.cart_view, name='cart'),
-    path('cart/add/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
-    path('cart/update/<int:item_id>/', views.update_cart_item, name='update_cart_item'),
-    path('cart/remove/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
+    path('cart/add/<int:product_id>/', idempotent(views.add_to_cart), name='add_to_cart'),
+    path('cart/update/<int:item_id>/', idempotent(views.update_cart_item), name='update_cart_item'),
+    path('cart/remove/<int:item_id>/', idempotent(views.remove_from_cart), name='remove_from_cart'),
+    path('batch/', idempotent(views.batch_update), name='batch_update'),
     path('product/<int:product_id>/', views.product_detail, name='product_detail'),
-    path('checkout/', views.checkout_view, name='checkout'),
+    path('checkout/', idempotent(views.checkout_view), name='checkout'),
     path('order-success/<int:order_id>/', views.order_success, name='order_success'),
     path('orders/', views.order_history, name='order_history'),
     path('logout/', views.user_logout, name='logout'),
@@ -1,20 +1,37 @@
+import json
+import logging
+import uuid
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, get_user_model
 from django.contrib.auth.models import User
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.contrib.auth.hashers import make_password
 from admin_panel.models import Product
+from admin_panel.product_cache import get_product_or_404
 from .models import Wishlist, CartItem
 from .models import Order, OrderItem, ShippingAddress
-from decimal import Decimal
+from .backends import email_taken, normalize_email
+from .batch import BatchError, apply_batch
+from .cart import add_quantity, cart_totals, change_quantity, checkout_totals, load_cart
+from .catalog import get_product_page, product_to_dict
+from .checkout import EmptyCart, OutOfStock, place_order
+from .conditional import not_modified, page_validators, set_validators
+from .counters import get_count
+from .hashers import HashingBusy, run_bounded
+from .inventory import HOLD_TTL, available_to_sell, hold_cart
+from .orders import get_order, get_order_page
 from django.utils import timezone
 from django.contrib.auth import logout
 from django.contrib.auth import logout as auth_logout
 
+logger = logging.getLogger(__name__)
+
 
 # =======================
 # User Authentication
@@ -22,42 +39,37 @@ from django.contrib.auth import logout as auth_logout
 
 def users_login(request):
     if request.method == "POST":
-        email = request.POST.get("email", "").strip().lower()  # Normalize email
+        email = normalize_email(request.POST.get("email"))
         password = request.POST.get("password", "").strip()
 
         if not email or not password:
             messages.error(request, "Email and password are required.")
             return redirect("users_login")
 
+        # EmailBackend: one indexed lookup by normalized email, then the password check
         try:
-            user_obj = User.objects.get(email=email)
-            if not user_obj.is_active:
-                messages.error(request, "Account is inactive. Please contact support.")
-                return redirect("users_login")
-
-            user = authenticate(request, username=user_obj.username, password=password)
-            if user is not None:
-                login(request, user)
-                messages.success(request, "Login successful!")
-                context = {
-                    'user': user,
-                    'message': 'Welcome back!',
-                    # Add any other context variables needed for dashboard
-                }
-                return render(request, 'users/dashboard.html', context)
-            else:
-                messages.error(request, "Incorrect password.")
-                return redirect("users_login")
-        except User.DoesNotExist:
-            messages.error(request, "No account found with this email.")
+            user = authenticate(request, email=email, password=password)
+        except HashingBusy:
+            messages.error(request, "Too many sign-ins right now, please try again.")
+            return render(request, "users/login.html", status=503)
+        if user is None:
+            messages.error(request, "Incorrect email or password.")
             return redirect("users_login")
 
+        login(request, user)
+        messages.success(request, "Login successful!")
+        # Redirect rather than render: the dashboard view builds the product page
+        next_url = request.GET.get("next")
+        if not url_has_allowed_host_and_scheme(next_url, {request.get_host()}, request.is_secure()):
+            next_url = "users_dashboard"
+        return redirect(next_url)
+
     return render(request, "users/login.html")
 
 def users_register(request):
     if request.method == "POST":
         username = request.POST.get("username")
-        email = request.POST.get("email")
+        email = normalize_email(request.POST.get("email"))
         contact = request.POST.get("contact")
         password = request.POST.get("password")
         confirm_password = request.POST.get("confirm_password")
@@ -70,17 +82,29 @@ def users_register(request):
             messages.error(request, "Username already exists")
             return redirect("users_register")
 
-        if User.objects.filter(email=email).exists():
+        if not email:
+            messages.error(request, "Email is required")
+            return redirect("users_register")
+
+        if email_taken(email):
             messages.error(request, "Email already registered")
             return redirect("users_register")
 
-        # Save to Django's auth user
-        user = User.objects.create(
-            username=username,
-            email=email,
-            password=make_password(password)  # hashed password
-        )
-        user.save()
+        # Save to Django's auth user; the email key index settles concurrent sign-ups
+        try:
+            password_hash = run_bounded(make_password, password)  # hashed in the bounded pool
+            with transaction.atomic():
+                User.objects.create(
+                    username=username,
+                    email=email,
+                    password=password_hash,
+                )
+        except HashingBusy:
+            messages.error(request, "Too many sign-ups right now, please try again.")
+            return redirect("users_register")
+        except IntegrityError:
+            messages.error(request, "Username or email already registered")
+            return redirect("users_register")
 
         messages.success(request, "Registration successful! Please log in.")
         return redirect("users_login")
@@ -95,14 +119,40 @@ def users_register(request):
 @login_required
 def users_dashboard(request):
     user = request.user
+    products, next_cursor, filters = get_product_page(request.GET)
+
+    etag, last_modified = page_validators(request, products)
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
     wishlist_product_ids = Wishlist.objects.filter(user=user).values_list('product_id', flat=True)
-    products = Product.objects.all()  # Or filter based on category/search
+
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
 
     context = {
         'products': products,
         'wishlist_product_ids': wishlist_product_ids,
+        'filters': filters,
+        'category_choices': Product.CATEGORY_CHOICES,
+        'next_query': next_query,
     }
-    return render(request, 'users/dashboard.html', context)
+    return set_validators(render(request, 'users/dashboard.html', context), etag, last_modified)
+
+
+@login_required
+def product_feed(request):
+    products, next_cursor, filters = get_product_page(request.GET)
+    # Cached products carry a stale `reserved`; read live availability without locking
+    available = available_to_sell([product.id for product in products])
+    return JsonResponse({
+        'products': [product_to_dict(product, available.get(product.id)) for product in products],
+        'next_cursor': next_cursor,
+    })
 
 
 # =======================
@@ -117,7 +167,7 @@ def wishlist_view(request):
 
 @login_required
 def add_to_wishlist(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
+    product = get_product_or_404(product_id)
     created = Wishlist.objects.get_or_create(user=request.user, product=product)
 
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -150,7 +200,7 @@ def remove_from_wishlist(request, item_id):
 
 @login_required
 def toggle_wishlist(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
+    product = get_product_or_404(product_id)
     wishlist_item, created = Wishlist.objects.get_or_create(
         user=request.user,
         product=product
@@ -169,7 +219,7 @@ def toggle_wishlist(request, product_id):
             'status': 'success',
             'action': action,
             'message': message,
-            'wishlist_count': Wishlist.objects.filter(user=request.user).count()
+            'wishlist_count': get_count('wishlist', request.user.id)
         })
 
     messages.success(request, message)
@@ -182,10 +232,10 @@ def toggle_wishlist(request, product_id):
 
 @login_required
 def cart_view(request):
-    cart_items = CartItem.objects.filter(user=request.user).select_related('product')
+    cart_items, totals = load_cart(request.user)
 
-    cart_total = sum(item.subtotal for item in cart_items)
-    shipping_cost = 50 if cart_total > 0 else 0
+    cart_total = totals['subtotal']
+    shipping_cost = checkout_totals(cart_total)['shipping']
     grand_total = cart_total + shipping_cost
 
     context = {
@@ -199,25 +249,31 @@ def cart_view(request):
 
 @login_required
 def update_cart_item(request, item_id):
-    item = get_object_or_404(CartItem, id=item_id, user=request.user)
     action = request.POST.get('action')
+    if action is None and request.content_type == 'application/json':
+        try:
+            action = json.loads(request.body or b'{}').get('action')
+        except (ValueError, AttributeError):
+            action = None
 
-    if action == 'increase':
-        item.quantity += 1
-    elif action == 'decrease' and item.quantity > 1:
-        item.quantity -= 1
-
-    item.save()
+    delta = {'increase': 1, 'decrease': -1}.get(action, 0)
+    status = change_quantity(request.user.id, item_id, delta)
+    if status is None:
+        raise Http404("No CartItem matches the given query.")
 
-    if item.quantity < 1:
-        item.delete()
-        return JsonResponse({'status': 'removed'})
+    if status == 'removed':
+        return JsonResponse({
+            'status': 'removed',
+            'new_quantity': 0,
+            'cart_total': cart_totals(request.user)['subtotal'],
+        })
 
+    totals = cart_totals(request.user, line_id=item_id)
     return JsonResponse({
         'status': 'updated',
-        'new_quantity': item.quantity,
-        'new_subtotal': item.subtotal,
-        'cart_total': sum(i.subtotal for i in CartItem.objects.filter(user=request.user))
+        'new_quantity': totals['line_quantity'],
+        'new_subtotal': totals['line_total'],
+        'cart_total': totals['subtotal'],
     })
 
 
@@ -227,34 +283,45 @@ def remove_from_cart(request, item_id):
     item.delete()
     return JsonResponse({
         'status': 'success',
-        'cart_total': sum(i.subtotal for i in CartItem.objects.filter(user=request.user))
+        'cart_total': cart_totals(request.user)['subtotal'],
     })
 
 
 @login_required
 def add_to_cart(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
+    product = get_product_or_404(product_id)
 
-    with transaction.atomic():
-        cart_item, created = CartItem.objects.get_or_create(
-            user=request.user,
-            product=product,
-            defaults={'quantity': 1}
-        )
+    try:
+        quantity = max(1, int(request.POST.get('quantity', 1)))
+    except ValueError:
+        quantity = 1
 
-        if not created:
-            cart_item.quantity += 1
-            cart_item.save()
+    add_quantity(request.user.id, product.id, quantity)
 
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({
             'status': 'success',
-            'cart_count': CartItem.objects.filter(user=request.user).count(),
+            'cart_count': get_count('cart', request.user.id),
             'message': f"{product.name} added to cart"
         })
 
     messages.success(request, f"{product.name} added to cart")
-    return redirect(request.META.get('HTTP_REFERER', 'cart_view'))
+    return redirect(request.META.get('HTTP_REFERER', 'cart'))
+
+
+@login_required
+@require_POST
+def batch_update(request):
+    try:
+        payload = json.loads(request.body or b'{}')
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({'status': 'error', 'errors': ["Body must be valid JSON."]}, status=400)
+    try:
+        state = apply_batch(request.user, payload)
+    except BatchError as e:
+        return JsonResponse({'status': 'error', 'errors': e.errors}, status=400)
+
+    return JsonResponse({'status': 'success', **state})
 
 
 # =======================
@@ -263,7 +330,12 @@ def add_to_cart(request, product_id):
 
 @login_required
 def product_detail(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
+    product = get_product_or_404(product_id)
+
+    etag, last_modified = page_validators(request, [product])
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
 
     is_in_wishlist = Wishlist.objects.filter(
         user=request.user,
@@ -274,25 +346,12 @@ def product_detail(request, product_id):
         'product': product,
         'is_in_wishlist': is_in_wishlist,
     }
-    return render(request, 'users/product_detail.html', context)
+    return set_validators(render(request, 'users/product_detail.html', context), etag, last_modified)
 
 
 @login_required
 def checkout_view(request):
     if request.method == 'POST':
-        print("POST request received")
-
-        # Process the form data
-        full_name = request.POST.get('full_name')
-        address_line1 = request.POST.get('address_line1')
-        address_line2 = request.POST.get('address_line2')
-        city = request.POST.get('city')
-        state = request.POST.get('state')
-        postal_code = request.POST.get('postal_code')
-        country = request.POST.get('country')
-        phone = request.POST.get('phone')
-        payment_method = request.POST.get('payment_method')
-
         # Validate required fields
         required_fields = ['full_name', 'address_line1', 'city', 'state', 'postal_code', 'country', 'phone',
                            'payment_method']
@@ -301,109 +360,61 @@ def checkout_view(request):
                 messages.error(request, f"Please fill in the {field.replace('_', ' ')} field.")
                 return redirect('checkout')
 
-        # Get cart items
-        cart_items = CartItem.objects.filter(user=request.user)
-
-        if not cart_items.exists():
-            messages.error(request, "Your cart is empty!")
-            return redirect('cart_view')
-
-        # Calculate totals
-        subtotal = sum(item.subtotal for item in cart_items)
-        tax = subtotal * Decimal('0.18')
-        shipping = Decimal('50.00') if subtotal > 0 else Decimal('0.00')
-        grand_total = subtotal + tax + shipping
-
-        # Create order with transaction
+        # Lock the cart, reserve stock and write the order in a fixed number of queries
         try:
-            with transaction.atomic():
-                # First create the order
-                order = Order.objects.create(
-                    user=request.user,
-                    order_number=f"ORD-{timezone.now().strftime('%Y%m%d%H%M%S')}-{request.user.id}",  # Generate unique order number
-                    subtotal=subtotal,
-                    tax_amount=tax,
-                    shipping_cost=shipping,
-                    grand_total=grand_total,
-                    payment_method=payment_method,
-                    status='pending',
-                    payment_status='pending'
-                )
-
-                # Then create shipping address with the order reference
-                shipping_address = ShippingAddress.objects.create(
-                    user=request.user,
-                    order=order,  # This is the key fix - pass the created order
-                    full_name=full_name,
-                    address_line1=address_line1,
-                    address_line2=address_line2,
-                    city=city,
-                    state=state,
-                    postal_code=postal_code,
-                    country=country,
-                    phone=phone
-                )
-
-                # Create order items
-                for item in cart_items:
-                    OrderItem.objects.create(
-                        order=order,
-                        product_id=item.product.id,
-                        product_name=item.product.name,
-                        quantity=item.quantity,
-                        unit_price=item.product.price,
-                        total_price=item.subtotal,
-                        image_url=item.product.image.url if item.product.image else None
-                    )
-
-                # Clear the cart
-                cart_items.delete()
-
-                print(f"Order created successfully: {order.id}")
-                messages.success(request, "Order placed successfully!")
-                return redirect('order_success', order_id=order.id)
-
+            order = place_order(request.user, request.POST, request.POST.get('payment_method'))
+        except (EmptyCart, OutOfStock) as e:
+            messages.error(request, str(e))
+            return redirect('cart')
         except Exception as e:
-            print(f"Error creating order: {str(e)}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
+            logger.exception("Error creating order")
             messages.error(request, f"Error processing order: {str(e)}")
             return redirect('checkout')
 
+        messages.success(request, "Order placed successfully!")
+        return redirect('order_success', order_id=order.id)
+
     # GET request - show checkout form
-    cart_items = CartItem.objects.filter(user=request.user)
+    cart_items, cart_summary = load_cart(request.user)
 
-    if not cart_items.exists():
+    if not cart_items:
         messages.warning(request, "Your cart is empty!")
-        return redirect('cart_view')
+        return redirect('cart')
 
-    subtotal = sum(item.subtotal for item in cart_items)
-    tax = subtotal * Decimal('0.18')
-    shipping = Decimal('50.00') if subtotal > 0 else Decimal('0.00')
-    grand_total = subtotal + tax + shipping
+    # Hold the cart's stock while the shopper fills in the form
+    short = set(hold_cart(request.user, cart_items))
+    if short:
+        names = ', '.join(item.product.name for item in cart_items if item.product_id in short)
+        messages.warning(request, f"Only limited stock is left for: {names}. It could not be held for you.")
 
     context = {
         'cart_items': cart_items,
-        'subtotal': subtotal,
-        'tax': tax,
-        'shipping': shipping,
-        'grand_total': grand_total
+        'hold_minutes': int(HOLD_TTL.total_seconds() // 60),
+        # A double-submitted form replays the first order instead of placing a second one
+        'idempotency_key': uuid.uuid4().hex,
+        **checkout_totals(cart_summary['subtotal']),
     }
     return render(request, 'users/checkout.html', context)
 
 
 @login_required
 def order_success(request, order_id):
-    try:
-        order = Order.objects.get(id=order_id, user=request.user)
-        return render(request, 'users/order_success.html', {'order': order})
-    except Order.DoesNotExist:
+    order = get_order(request.user, order_id)
+    if order is None:
         messages.error(request, "Order not found.")
         return redirect('users_dashboard')
+    return render(request, 'users/order_success.html', {'order': order})
+
 
+@login_required
 def order_history(request):
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'users/order_history.html', {'orders': orders})
+    orders, next_cursor = get_order_page(request.user, request.GET.get('cursor'))
+    return render(request, 'users/order_history.html', {
+        'orders': orders,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
+    })
+
 
 def user_logout(request):
     auth_logout(request)